@@ -1,15 +1,21 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import logging
-import shutil
+import os
 import sys
 import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Awaitable, Callable, Optional
 
 from fastapi import UploadFile
 
 from . import mock_data, schemas
+from .jobs import JobStore
 
 logger = logging.getLogger(__name__)
 
@@ -17,12 +23,39 @@ REPO_ROOT = Path(__file__).resolve().parents[2]
 AI_DIR = REPO_ROOT / "lib" / "ai"
 AI_MEDIA_ROOT = AI_DIR / "runs"
 MEDIA_URL_PREFIX = "/media/ai"
+# 推理工作进程数，0 表示在当前进程内直接推理；未设置时按 CPU 核数自动推算
+AI_WORKERS = os.environ.get("SPERMBATTLE_AI_WORKERS")
+AI_THREADS_PER_WORKER = int(os.environ.get("SPERMBATTLE_AI_THREADS_PER_WORKER", "4"))
+# 工作进程启动方式，默认 spawn；fork 可写时复制共享权重，但在多线程的服务进程中 fork 可能死锁
+AI_START_METHOD = os.environ.get("SPERMBATTLE_AI_START_METHOD", "spawn")
+# 进程内推理时跨视频合批的最大帧数，>1 时同时分析这么多个视频并合批前向
+AI_DYNAMIC_BATCH = int(os.environ.get("SPERMBATTLE_AI_DYNAMIC_BATCH", "1"))
+AI_BATCH_MAX_WAIT_MS = float(os.environ.get("SPERMBATTLE_AI_BATCH_MAX_WAIT_MS", "5"))
+# 按视频内容寻址的结果缓存位置与容量
+AI_CACHE_DIR = Path(os.environ.get("SPERMBATTLE_AI_CACHE_DIR", AI_DIR / ".cache" / "results"))
+AI_CACHE_MB = int(os.environ.get("SPERMBATTLE_AI_CACHE_MB", "512"))
+# 分析帧率上限 (帧/秒)，高帧率视频按步长跳帧分析；未设置时分析每一帧
+AI_TARGET_FPS = os.environ.get("SPERMBATTLE_AI_TARGET_FPS")
+# 速度与类别比例收敛后提前结束分析；可选的单个视频墙钟预算 (秒)
+AI_EARLY_STOP = os.environ.get("SPERMBATTLE_AI_EARLY_STOP", "0") == "1"
+AI_MAX_SECONDS = os.environ.get("SPERMBATTLE_AI_MAX_SECONDS")
+# 与上次推理帧的平均灰度差低于该值时跳过推理 (0-255)；未设置时每个分析帧都推理
+AI_STATIC_THRESHOLD = os.environ.get("SPERMBATTLE_AI_STATIC_THRESHOLD")
+UPLOAD_CHUNK_SIZE = 1 << 20
+# 排队 + 运行中的分析任务上限，超出时上传接口直接拒绝
+AI_MAX_JOBS = int(os.environ.get("SPERMBATTLE_AI_MAX_JOBS", "16"))
+# 保留可查询的已结束任务数，超出后最早结束的任务被移除
+AI_MAX_FINISHED_JOBS = int(os.environ.get("SPERMBATTLE_AI_MAX_FINISHED_JOBS", "256"))
+# 为更换 pixel_size 保留的分析器输出条数，超出后淘汰最久未使用的
+AI_MAX_PAYLOADS = int(os.environ.get("SPERMBATTLE_AI_MAX_PAYLOADS", "128"))
 
 if AI_DIR.exists() and str(AI_DIR) not in sys.path:
   sys.path.insert(0, str(AI_DIR))
 
 try:
-  from backend_speed_service import SpeedAnalyzer  # type: ignore[attr-defined]
+  from backend_speed_service import SpeedAnalyzer, SpeedWorkerPool  # type: ignore[attr-defined]
+  from early_stop import TIME_BUDGET, EarlyStop  # type: ignore[attr-defined]
+  from result_cache import ResultCache  # type: ignore[attr-defined]
 except ModuleNotFoundError as exc:  # pragma: no cover - ensures clearer error at runtime
   missing = getattr(exc, "name", "unknown dependency")
   raise RuntimeError(
@@ -31,6 +64,100 @@ except ModuleNotFoundError as exc:  # pragma: no cover - ensures clearer error a
   ) from exc
 
 _analyzer: SpeedAnalyzer | None = None
+_pool: SpeedWorkerPool | None = None
+_pool_disabled = False
+_pool_lock = threading.Lock()
+_jobs = JobStore(max_in_flight=AI_MAX_JOBS, max_finished=AI_MAX_FINISHED_JOBS)
+# 未启用进程池时在单独线程中推理，避免阻塞事件循环
+_local_executor = ThreadPoolExecutor(
+  max_workers=max(1, AI_DYNAMIC_BATCH), thread_name_prefix="ai-analysis"
+)
+_background_tasks: set[asyncio.Task[None]] = set()
+_result_cache = ResultCache(AI_CACHE_DIR, max_bytes=AI_CACHE_MB * 1024 * 1024)
+# 相同缓存键的并发分析共享同一次计算及其进度
+_inflight: dict[str, tuple[asyncio.Future[dict[str, Any]], _ProgressRelay]] = {}
+
+
+class _ProgressRelay:
+  """
+  Fans the progress of one computation out to every job awaiting it.
+
+  Jobs can join a computation that is already running, so the relay keeps
+  whether it has started and the latest frame counts and replays them to
+  late subscribers. Progress arrives from worker threads.
+  """
+
+  def __init__(self) -> None:
+    self._lock = threading.Lock()
+    self._job_ids: list[str] = []
+    self._started = False
+    self._last: Optional[tuple[int, int]] = None
+
+  def subscribe(self, job_id: str) -> None:
+    with self._lock:
+      self._job_ids.append(job_id)
+      if self._last is not None:
+        _jobs.update_progress(job_id, *self._last)
+      elif self._started:
+        _jobs.mark_running(job_id)
+
+  def unsubscribe(self, job_id: str) -> None:
+    with self._lock:
+      self._job_ids.remove(job_id)
+
+  def start(self) -> None:
+    with self._lock:
+      self._started = True
+      for job_id in self._job_ids:
+        _jobs.mark_running(job_id)
+
+  def __call__(self, done: int, total: int) -> None:
+    with self._lock:
+      self._started = True
+      self._last = (done, total)
+      for job_id in self._job_ids:
+        _jobs.update_progress(job_id, done, total)
+
+
+class _PayloadLRU:
+  """
+  Analyzer payloads by analysis id, bounded to ``max_items`` entries.
+
+  Accessed from the event loop and from sync endpoints running in the
+  threadpool, so every operation takes the lock.
+  """
+
+  def __init__(self, max_items: int) -> None:
+    self.max_items = max(1, max_items)
+    self._items: OrderedDict[int, dict[str, Any]] = OrderedDict()
+    self._lock = threading.Lock()
+
+  def get(self, analysis_id: int) -> Optional[dict[str, Any]]:
+    with self._lock:
+      payload = self._items.get(analysis_id)
+      if payload is not None:
+        self._items.move_to_end(analysis_id)
+      return payload
+
+  def put(self, analysis_id: int, payload: dict[str, Any]) -> None:
+    with self._lock:
+      self._items[analysis_id] = payload
+      self._items.move_to_end(analysis_id)
+      while len(self._items) > self.max_items:
+        self._items.popitem(last=False)
+
+
+# 每个分析对应的分析器输出，用于更换 pixel_size 时免推理重新计分
+_payloads = _PayloadLRU(AI_MAX_PAYLOADS)
+
+
+def _early_stop_config() -> Optional[EarlyStop]:
+  if not AI_EARLY_STOP and not AI_MAX_SECONDS:
+    return None
+  return EarlyStop(
+    converge=AI_EARLY_STOP,
+    max_seconds=float(AI_MAX_SECONDS) if AI_MAX_SECONDS else None,
+  )
 
 
 def _get_analyzer() -> SpeedAnalyzer:
@@ -39,46 +166,253 @@ def _get_analyzer() -> SpeedAnalyzer:
     weights = (AI_DIR / "best.pt").resolve()
     output_dir = (AI_DIR / "runs" / "speed").resolve()
     preview_dir = output_dir / "previews"
-    _analyzer = SpeedAnalyzer(weights=weights, output_dir=output_dir, preview_dir=preview_dir)
+    _analyzer = SpeedAnalyzer(
+      weights=weights,
+      output_dir=output_dir,
+      preview_dir=preview_dir,
+      dynamic_batch_size=AI_DYNAMIC_BATCH,
+      batch_max_wait_ms=AI_BATCH_MAX_WAIT_MS,
+      target_fps=float(AI_TARGET_FPS) if AI_TARGET_FPS else None,
+      early_stop=_early_stop_config(),
+      static_threshold=float(AI_STATIC_THRESHOLD) if AI_STATIC_THRESHOLD else None,
+    )
   return _analyzer
 
 
-async def analyze_upload(
+def get_batch_stats() -> dict[str, Any]:
+  """Batch-size / latency histograms of the in-process dynamic batcher."""
+  if _analyzer is None:
+    return {}
+  return _analyzer.batch_stats()
+
+
+def _get_pool() -> Optional[SpeedWorkerPool]:
+  global _pool, _pool_disabled
+  with _pool_lock:
+    if _pool is None and not _pool_disabled:
+      workers = int(AI_WORKERS) if AI_WORKERS is not None else None
+      if workers == 0:
+        _pool_disabled = True
+        return None
+      _pool = SpeedWorkerPool(
+        _get_analyzer(),
+        workers=workers,
+        threads_per_worker=AI_THREADS_PER_WORKER,
+        start_method=AI_START_METHOD,
+      )
+      logger.info(
+        "Started AI worker pool: %d workers x %d threads (%s)",
+        _pool.workers,
+        _pool.threads_per_worker,
+        _pool.start_method,
+      )
+    return _pool
+
+
+def recalibrate_analysis(
+  analysis_id: int, pixel_size: float
+) -> Optional[schemas.Analysis]:
+  """Re-derive speeds and scores of an AI analysis for a new pixel size."""
+  payload = _payloads.get(analysis_id)
+  if payload is None:
+    return None
+  payload = SpeedAnalyzer.recalibrate(payload, pixel_size)
+  _payloads.put(analysis_id, payload)
+  return mock_data.register_ai_analysis(
+    file_name=Path(payload.get("video") or "").name,
+    ai_payload=payload,
+    pixel_size=pixel_size,
+    replace_id=analysis_id,
+  )
+
+
+def get_job(job_id: str) -> Optional[schemas.AnalysisJob]:
+  return _jobs.get(job_id)
+
+
+async def submit_upload(
   file: UploadFile, pixel_size: float = 1.0
-) -> schemas.Analysis:
-  temp_path = await _persist_upload(file)
+) -> schemas.AnalysisJob:
+  """Persist the upload, queue its analysis in the background and return the job."""
+  job = _jobs.create()
   try:
-    logger.info("Starting AI analysis for %s", file.filename or temp_path.name)
-    payload: dict[str, Any] = _get_analyzer().run(
-      video_path=temp_path, pixel_size=pixel_size
+    temp_path, video_digest = await _persist_upload(file)
+  except Exception as exc:
+    _jobs.fail(job.id, str(exc))
+    raise
+
+  task = asyncio.create_task(
+    _run_job(job.id, file.filename or temp_path.name, temp_path, video_digest, pixel_size)
+  )
+  _background_tasks.add(task)
+  task.add_done_callback(_background_tasks.discard)
+  return _jobs.get(job.id) or job
+
+
+async def _run_job(
+  job_id: str,
+  file_name: str,
+  temp_path: Path,
+  video_digest: str,
+  pixel_size: float,
+) -> None:
+  try:
+    analysis = await _analyze_path(
+      temp_path, video_digest, file_name, pixel_size, job_id
     )
+  except Exception as exc:
+    logger.exception("Video analysis failed: %s", file_name)
+    _jobs.fail(job_id, str(exc) or "Failed to analyze video")
+  else:
+    _jobs.complete(job_id, analysis)
   finally:
-    try:
-      temp_path.unlink(missing_ok=True)
-    except FileNotFoundError:
-      pass
+    _remove_upload(temp_path)
 
-  return mock_data.register_ai_analysis(
-    file_name=file.filename or temp_path.name,
+
+async def _analyze_path(
+  temp_path: Path,
+  video_digest: str,
+  file_name: str,
+  pixel_size: float,
+  job_id: str,
+) -> schemas.Analysis:
+  analyzer = _get_analyzer()
+  key = await asyncio.to_thread(analyzer.cache_key, video_digest)
+  payload = await asyncio.to_thread(_cached_payload, key)
+  if payload is not None:
+    logger.info("Result cache hit for %s", file_name)
+    _jobs.mark_running(job_id)
+  else:
+    payload = await _compute_once(
+      key,
+      lambda relay: _run_analyzer(temp_path, file_name, pixel_size, relay),
+      job_id,
+    )
+  if payload.get("pixel_size") != pixel_size:
+    payload = SpeedAnalyzer.recalibrate(payload, pixel_size)
+
+  analysis = mock_data.register_ai_analysis(
+    file_name=file_name,
     ai_payload=payload,
     pixel_size=pixel_size,
     annotated_image_url=_to_media_url(payload.get("preview_image")),
   )
+  _payloads.put(analysis.id, payload)
+  return analysis
+
+
+async def _compute_once(
+  key: str,
+  compute: Callable[[_ProgressRelay], Awaitable[dict[str, Any]]],
+  job_id: str,
+) -> dict[str, Any]:
+  """
+  Run ``compute`` once per cache key; concurrent callers await the same result.
+
+  The result cache is checked again after taking ownership of the key, so a
+  caller that missed just as an identical computation finished reuses it.
+  Runs cut short by the wall-clock budget are not cached.
+
+  ``job_id`` follows the shared computation's start and progress.
+  """
+  inflight = _inflight.get(key)
+  if inflight is not None:
+    shared, relay = inflight
+    relay.subscribe(job_id)
+    try:
+      return await asyncio.shield(shared)
+    finally:
+      relay.unsubscribe(job_id)
+
+  future: asyncio.Future[dict[str, Any]] = asyncio.get_running_loop().create_future()
+  relay = _ProgressRelay()
+  relay.subscribe(job_id)
+  _inflight[key] = (future, relay)
+  try:
+    # 调用方查询缓存未命中之后，同键的上一次计算可能刚好完成并写入缓存
+    payload = await asyncio.to_thread(_cached_payload, key)
+    if payload is not None:
+      relay.start()
+    else:
+      payload = await compute(relay)
+      # 墙钟预算截断的结果取决于当时的机器负载，不写入缓存，重新提交时完整计算
+      if payload.get("stop_reason") != TIME_BUDGET:
+        await asyncio.to_thread(_result_cache.put, key, payload)
+  except Exception as exc:
+    future.set_exception(exc)
+    future.exception()  # mark retrieved so unattended failures do not warn
+    raise
+  except BaseException:
+    future.cancel()
+    raise
+  else:
+    future.set_result(payload)
+    return payload
+  finally:
+    _inflight.pop(key, None)
+
+
+async def _run_analyzer(
+  temp_path: Path,
+  file_name: str,
+  pixel_size: float,
+  relay: _ProgressRelay,
+) -> dict[str, Any]:
+  logger.info("Starting AI analysis for %s", file_name)
+  pool = await asyncio.to_thread(_get_pool)
+  if pool is not None:
+    # 工作进程开始处理时以 (0, 总帧数) 报告一次进度，由 relay 标记为运行中
+    return await asyncio.wrap_future(
+      pool.submit(video_path=temp_path, pixel_size=pixel_size, progress=relay)
+    )
+
+  def _run() -> dict[str, Any]:
+    relay.start()
+    return _get_analyzer().run(
+      video_path=temp_path, pixel_size=pixel_size, progress=relay
+    )
+
+  loop = asyncio.get_running_loop()
+  return await loop.run_in_executor(_local_executor, _run)
+
+
+def _cached_payload(key: str) -> Optional[dict[str, Any]]:
+  """Cached analyzer output for ``key``; entries whose preview image is gone count as misses."""
+  payload = _result_cache.get(key)
+  if payload is not None and _preview_missing(payload):
+    return None
+  return payload
+
+
+def _preview_missing(payload: dict[str, Any]) -> bool:
+  preview = payload.get("preview_image")
+  return bool(preview) and not Path(preview).exists()
+
+
+def _remove_upload(temp_path: Path) -> None:
+  try:
+    temp_path.unlink(missing_ok=True)
+  except FileNotFoundError:
+    pass
 
 
-async def _persist_upload(file: UploadFile) -> Path:
+async def _persist_upload(file: UploadFile) -> tuple[Path, str]:
+  """Stream the upload to a temp file, hashing the bytes on the way through."""
   suffix = Path(file.filename or "").suffix or ".bin"
   temp_dir = Path(tempfile.gettempdir()) / "spermbattle_uploads"
   temp_dir.mkdir(parents=True, exist_ok=True)
 
+  digest = hashlib.sha256()
   await file.seek(0)
   with tempfile.NamedTemporaryFile(
     delete=False, suffix=suffix, dir=temp_dir
   ) as tmp_file:
-    shutil.copyfileobj(file.file, tmp_file)
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+      digest.update(chunk)
+      tmp_file.write(chunk)
     temp_path = Path(tmp_file.name)
 
-  return temp_path
+  return temp_path, digest.hexdigest()
 
 
 def _to_media_url(path: Optional[str | Path]) -> Optional[str]:
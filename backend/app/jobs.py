@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import threading
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, Optional
+
+from . import schemas
+
+
+class JobQueueFull(RuntimeError):
+  """Raised when the number of queued + running jobs has hit the limit."""
+
+
+class JobStore:
+  """
+  In-memory registry of analysis jobs.
+
+  Progress updates may arrive from worker threads, so every mutation goes
+  through a lock. Only jobs that are queued or running count towards
+  ``max_in_flight``. Finished (done / failed) jobs stay readable until
+  ``max_finished`` newer jobs have finished, then the oldest are evicted.
+  """
+
+  def __init__(self, max_in_flight: int, max_finished: int = 256) -> None:
+    self.max_in_flight = max(1, max_in_flight)
+    self.max_finished = max(1, max_finished)
+    self._jobs: Dict[str, schemas.AnalysisJob] = {}
+    self._finished: Deque[str] = deque()
+    self._in_flight = 0
+    self._lock = threading.Lock()
+
+  def create(self) -> schemas.AnalysisJob:
+    with self._lock:
+      if self._in_flight >= self.max_in_flight:
+        raise JobQueueFull(
+          "Too many analyses in progress ({0}), try again later".format(
+            self._in_flight
+          )
+        )
+      now = datetime.utcnow()
+      job = schemas.AnalysisJob(
+        id=uuid.uuid4().hex, state="queued", created_at=now, updated_at=now
+      )
+      self._jobs[job.id] = job
+      self._in_flight += 1
+      return job.model_copy()
+
+  def get(self, job_id: str) -> Optional[schemas.AnalysisJob]:
+    with self._lock:
+      job = self._jobs.get(job_id)
+      return job.model_copy() if job else None
+
+  def mark_running(self, job_id: str) -> None:
+    self._update(job_id, state="running")
+
+  def update_progress(self, job_id: str, frames_processed: int, total_frames: int) -> None:
+    self._update(
+      job_id,
+      state="running",
+      frames_processed=frames_processed,
+      total_frames=total_frames if total_frames > 0 else None,
+    )
+
+  def complete(self, job_id: str, analysis: schemas.Analysis) -> None:
+    with self._lock:
+      job = self._jobs[job_id]
+      if job.total_frames:
+        job.frames_processed = job.total_frames
+      self._finish(job, state="done", analysis=analysis)
+
+  def fail(self, job_id: str, error: str) -> None:
+    with self._lock:
+      self._finish(self._jobs[job_id], state="failed", error=error)
+
+  def _finish(self, job: schemas.AnalysisJob, **fields: object) -> None:
+    if job.state in ("done", "failed"):
+      return
+    for name, value in fields.items():
+      setattr(job, name, value)
+    job.updated_at = datetime.utcnow()
+    self._in_flight -= 1
+    self._finished.append(job.id)
+    while len(self._finished) > self.max_finished:
+      self._jobs.pop(self._finished.popleft(), None)
+
+  def _update(self, job_id: str, **fields: object) -> None:
+    with self._lock:
+      job = self._jobs.get(job_id)
+      if job is None or job.state in ("done", "failed"):
+        return
+      for name, value in fields.items():
+        setattr(job, name, value)
+      job.updated_at = datetime.utcnow()
@@ -2,13 +2,14 @@ from __future__ import annotations
 
 import logging
 from pathlib import Path
-from typing import Literal, Optional
+from typing import Any, Literal, Optional
 
 from fastapi import FastAPI, File, HTTPException, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
 from . import ai_service, mock_data, schemas
+from .jobs import JobQueueFull
 
 app = FastAPI(title="SpermBattle API", version="0.1.0")
 logger = logging.getLogger(__name__)
@@ -54,19 +55,51 @@ def read_analysis(analysis_id: int) -> schemas.Analysis:
 
 
 @app.post(
-  "/api/analysis/upload",
+  "/api/analysis/{analysis_id}/pixel-size",
   response_model=schemas.Analysis,
 )
-async def upload_analysis(file: UploadFile = File(...)) -> schemas.Analysis:
+def recalibrate_analysis(
+  analysis_id: int, payload: schemas.PixelSizeRequest
+) -> schemas.Analysis:
+  analysis = ai_service.recalibrate_analysis(analysis_id, payload.pixel_size)
+  if not analysis:
+    raise HTTPException(status_code=404, detail="No tracking data for this analysis")
+  return analysis
+
+
+@app.post(
+  "/api/analysis/upload",
+  response_model=schemas.AnalysisJob,
+  status_code=202,
+)
+async def upload_analysis(file: UploadFile = File(...)) -> schemas.AnalysisJob:
   if not file:
     raise HTTPException(status_code=400, detail="File upload required")
   try:
-    return await ai_service.analyze_upload(file)
+    return await ai_service.submit_upload(file)
+  except JobQueueFull as exc:
+    raise HTTPException(status_code=429, detail=str(exc)) from exc
   except (RuntimeError, FileNotFoundError) as exc:
     raise HTTPException(status_code=500, detail=str(exc)) from exc
   except Exception as exc:  # pragma: no cover - defensive
-    logger.exception("Video analysis failed: {0}".format(file.filename))
-    raise HTTPException(status_code=500, detail="Failed to analyze video") from exc
+    logger.exception("Video upload failed: {0}".format(file.filename))
+    raise HTTPException(status_code=500, detail="Failed to queue video analysis") from exc
+
+
+@app.get(
+  "/api/analysis/jobs/{job_id}",
+  response_model=schemas.AnalysisJob,
+)
+def read_analysis_job(job_id: str) -> schemas.AnalysisJob:
+  job = ai_service.get_job(job_id)
+  if not job:
+    raise HTTPException(status_code=404, detail="Job not found")
+  return job
+
+
+@app.get("/api/ai/batching")
+def read_batching_stats() -> dict[str, Any]:
+  return ai_service.get_batch_stats()
 
 
 @app.post(
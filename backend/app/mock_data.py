@@ -275,13 +275,35 @@ def get_leaderboard(
   return result
 
 
+def _coverage_scale(ai_payload: Dict[str, Any]) -> float:
+  """
+  Factor extrapolating count-based metrics of an early-stopped run to the whole video.
+
+  Only runs the analyzer flags as ``stopped_early`` are scaled; a run that reached the
+  end of the video (frames_used can still trail total_frames when the frame stride does
+  not divide the frame count or the container overstates its length) counts as complete.
+  """
+  if not ai_payload.get("stopped_early"):
+    return 1.0
+  frames_used = ai_payload.get("frames_used") or 0
+  total_frames = ai_payload.get("total_frames") or 0
+  return total_frames / frames_used if 0 < frames_used < total_frames else 1.0
+
+
 def register_ai_analysis(
   file_name: str,
   ai_payload: Dict[str, Any],
   pixel_size: float = 1.0,
   annotated_image_url: Optional[str] = None,
+  replace_id: Optional[int] = None,
 ) -> schemas.Analysis:
-  global analysis_counter
+  """
+  Score an analyzer payload and store it as an analysis.
+
+  With ``replace_id`` the existing analysis is re-scored in place (same id,
+  owner and creation time) instead of registering a new one.
+  """
+  global analysis_counter, mock_analyses
   summary = (ai_payload or {}).get("summary") or {}
   speed_stats = summary.get("physical_speed_stats") or summary.get(
     "pixel_speed_stats"
@@ -300,6 +322,7 @@ def register_ai_analysis(
 
   tracks = ai_payload.get("tracks") or []
   track_count = len(tracks)
+  coverage_scale = _coverage_scale(ai_payload)
   active_tracks = 0
   
   # 基于真实的 class_name 统计
@@ -403,7 +426,7 @@ def register_ai_analysis(
   coverage_component = _clamp(normal_ratio * 25, 0, 25)
   quality_score = _clamp(20 + speed_component + burst_component + coverage_component)
 
-  quantity_score = _clamp(15 + track_count * 4 + sample_count / 150, 10, 100)
+  quantity_score = _clamp(15 + (track_count * 4 + sample_count / 150) * coverage_scale, 10, 100)
   morphology_score = _clamp(30 + normal_ratio * 50 + min(track_count, 20), 10, 100)
   motility_score = _clamp(quality_score * 0.85 + speed_component * 0.2, 15, 100)
 
@@ -417,8 +440,14 @@ def register_ai_analysis(
   losses = max(0, total_games - wins)
   win_rate = round(win_rate_fraction * 100, 1)
 
-  analysis_counter += 1
-  analysis_id = analysis_counter
+  previous = get_analysis_by_id(replace_id) if replace_id is not None else None
+  if replace_id is not None and previous is None:
+    raise ValueError("Analysis not found")
+  if previous is None:
+    analysis_counter += 1
+    analysis_id = analysis_counter
+  else:
+    analysis_id = previous.id
   analysis = schemas.Analysis(
     id=analysis_id,
     user_id=10_000 + analysis_id,
@@ -434,15 +463,19 @@ def register_ai_analysis(
     motility_score=round(motility_score, 1),
     title=title,
     title_category=category,
-    annotated_image_url=annotated_image_url or "/placeholder-sperm.svg",
+    annotated_image_url=annotated_image_url
+    or (previous.annotated_image_url if previous else "/placeholder-sperm.svg"),
     global_rank=0,
     percentile=0,
-    created_at=datetime.utcnow(),
+    created_at=previous.created_at if previous else datetime.utcnow(),
     wins=wins,
     losses=losses,
     win_rate=win_rate,
   )
-  mock_analyses.append(analysis)
+  if previous is None:
+    mock_analyses.append(analysis)
+  else:
+    mock_analyses = [analysis if a.id == analysis_id else a for a in mock_analyses]
   _recalculate_ranks()
   return get_analysis_by_id(analysis.id) or analysis
 
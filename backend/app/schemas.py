@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Literal, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 TitleCategory = Literal["GOD", "MID", "TRASH", "OMEGA"]
 
@@ -70,3 +70,21 @@ class Battle(BaseModel):
 
 class BattleRequest(BaseModel):
   analysis_id: int
+
+
+class PixelSizeRequest(BaseModel):
+  pixel_size: float = Field(gt=0)
+
+
+JobState = Literal["queued", "running", "done", "failed"]
+
+
+class AnalysisJob(BaseModel):
+  id: str
+  state: JobState
+  frames_processed: int = 0
+  total_frames: Optional[int] = None
+  analysis: Optional[Analysis] = None
+  error: Optional[str] = None
+  created_at: datetime
+  updated_at: datetime
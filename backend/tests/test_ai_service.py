@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("torch")
+
+from app import ai_service  # noqa: E402
+from result_cache import ResultCache  # noqa: E402
+
+
+def test_time_budget_result_is_recomputed(tmp_path, monkeypatch):
+  monkeypatch.setattr(ai_service, "_result_cache", ResultCache(tmp_path))
+  runs = []
+
+  async def compute(relay):
+    relay.start()
+    runs.append(len(runs))
+    if len(runs) == 1:
+      return {"stop_reason": "time_budget", "stopped_early": True, "frames_used": 40}
+    return {"stop_reason": "end_of_video", "stopped_early": False, "frames_used": 400}
+
+  async def submit():
+    job = ai_service._jobs.create()
+    return await ai_service._compute_once("video-key", compute, job.id)
+
+  first = asyncio.run(submit())
+  assert first["stop_reason"] == "time_budget"
+  assert ai_service._cached_payload("video-key") is None
+
+  # 重新提交时完整计算，完整结果写入缓存后不再计算
+  second = asyncio.run(submit())
+  assert second["stop_reason"] == "end_of_video"
+  assert ai_service._cached_payload("video-key") == second
+  assert len(runs) == 2
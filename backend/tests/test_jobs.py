@@ -0,0 +1,34 @@
+import pytest
+
+pytest.importorskip("pydantic")
+
+from app.jobs import JobQueueFull, JobStore  # noqa: E402
+
+
+def test_finished_jobs_are_evicted_oldest_first():
+  store = JobStore(max_in_flight=8, max_finished=2)
+  jobs = [store.create() for _ in range(3)]
+  running = store.create()
+  for job in jobs:
+    store.fail(job.id, "boom")
+
+  assert store.get(jobs[0].id) is None
+  assert store.get(jobs[1].id).state == "failed"
+  assert store.get(jobs[2].id).state == "failed"
+  assert store.get(running.id).state == "queued"
+
+
+def test_mark_running_and_progress():
+  store = JobStore(max_in_flight=1)
+  job = store.create()
+  with pytest.raises(JobQueueFull):
+    store.create()
+
+  store.mark_running(job.id)
+  assert store.get(job.id).state == "running"
+  store.update_progress(job.id, 0, 120)
+  assert store.get(job.id).total_frames == 120
+  store.fail(job.id, "boom")
+  store.mark_running(job.id)
+  assert store.get(job.id).state == "failed"
+  store.create()  # the finished job no longer counts towards max_in_flight
@@ -0,0 +1,43 @@
+import pytest
+
+pytest.importorskip("pydantic")
+
+from app import mock_data  # noqa: E402
+
+
+def _payload(**extra):
+  stats = {"count": 400, "min": 0.0, "max": 40.0, "mean": 12.0, "median": 10.0}
+  tracks = [
+    {"id": i, "class_id": 0, "class_name": "sperm", "speed_px_stats": stats}
+    for i in range(12)
+  ]
+  payload = {"summary": {"pixel_speed_stats": stats}, "tracks": tracks}
+  payload.update(extra)
+  return payload
+
+
+def test_stride_not_dividing_frame_count_keeps_quantity_score():
+  baseline = mock_data.register_ai_analysis("clip.mp4", _payload())
+  # stride 4 over 100 frames: the last analysed frame is 96, so frames_used = 97
+  strided = mock_data.register_ai_analysis(
+    "clip.mp4",
+    _payload(frame_stride=4, total_frames=100, frames_used=97, stopped_early=False),
+  )
+  assert strided.quantity_score == baseline.quantity_score
+
+
+def test_overstated_frame_count_keeps_quantity_score():
+  baseline = mock_data.register_ai_analysis("clip.mp4", _payload())
+  short = mock_data.register_ai_analysis(
+    "clip.mp4", _payload(total_frames=300, frames_used=240, stopped_early=False)
+  )
+  assert short.quantity_score == baseline.quantity_score
+
+
+def test_early_stop_extrapolates_quantity_score():
+  baseline = mock_data.register_ai_analysis("clip.mp4", _payload())
+  stopped = mock_data.register_ai_analysis(
+    "clip.mp4",
+    _payload(total_frames=400, frames_used=100, stop_reason="converged", stopped_early=True),
+  )
+  assert stopped.quantity_score > baseline.quantity_score
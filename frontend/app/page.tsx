@@ -1,6 +1,6 @@
 'use client';
 
-import React, { useState, useCallback, useEffect } from 'react';
+import React, { useState, useCallback, useEffect, useRef } from 'react';
 import { Upload, Loader2 } from 'lucide-react';
 import { motion } from 'motion/react';
 import { useRouter } from 'next/navigation';
@@ -8,6 +8,7 @@ import { FloatingSperm } from '@/components/FloatingSperm';
 import { SpermSettings } from '@/components/SpermSettings';
 import { useAppStore } from '@/lib/store';
 import { api } from '@/lib/api';
+import type { AnalysisJob } from '@/types';
 
 const PROGRESS_STEPS = [
   'Calibrating battle arena',
@@ -25,6 +26,8 @@ export default function Home() {
   const [spermSpeed, setSpermSpeed] = useState(1);
   const [analyzeProgress, setAnalyzeProgress] = useState(0);
   const [progressStage, setProgressStage] = useState(0);
+  // Set once the backend reports real frame progress; stops the simulated ticker
+  const hasJobProgress = useRef(false);
   const router = useRouter();
   const setCurrentAnalysis = useAppStore(state => state.setCurrentAnalysis);
 
@@ -38,6 +41,15 @@ export default function Home() {
     setIsDragging(false);
   }, []);
 
+  const handleJobProgress = useCallback((job: AnalysisJob) => {
+    if (job.state !== 'running' || !job.total_frames) {
+      return;
+    }
+    hasJobProgress.current = true;
+    const fraction = Math.min(1, job.frames_processed / job.total_frames);
+    setAnalyzeProgress(prev => Math.max(prev, 6 + fraction * 90));
+  }, []);
+
   const handleFile = useCallback(async (file: File) => {
     const validTypes = [
       'image/jpeg',
@@ -55,7 +67,7 @@ export default function Home() {
     setIsUploading(true);
 
     try {
-      const analysis = await api.uploadFile(file);
+      const analysis = await api.uploadFile(file, handleJobProgress);
       setCurrentAnalysis(analysis);
       router.push(`/report/${analysis.id}`);
     } catch (error) {
@@ -64,7 +76,7 @@ export default function Home() {
     } finally {
       setIsUploading(false);
     }
-  }, [router, setCurrentAnalysis]);
+  }, [router, setCurrentAnalysis, handleJobProgress]);
 
   const handleDrop = useCallback(
     async (e: React.DragEvent) => {
@@ -81,12 +93,13 @@ export default function Home() {
 
   useEffect(() => {
     if (isUploading) {
+      hasJobProgress.current = false;
       setAnalyzeProgress(6);
       setProgressStage(0);
 
       const progressInterval = setInterval(() => {
         setAnalyzeProgress(prev => {
-          if (prev >= 96) {
+          if (hasJobProgress.current || prev >= 96) {
             return prev;
           }
           const next = prev + Math.random() * 7;
@@ -1,7 +1,8 @@
-import type { Analysis, Battle, LeaderboardEntry } from "@/types";
+import type { Analysis, AnalysisJob, Battle, LeaderboardEntry } from "@/types";
 
 const API_BASE_URL =
   process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
+const JOB_POLL_INTERVAL_MS = 1000;
 
 async function apiClient<T>(
   endpoint: string,
@@ -30,14 +31,30 @@ async function apiClient<T>(
 export type LeaderboardCategory = "global" | "shame" | "gaming";
 
 export const api = {
-  uploadFile: async (file: File): Promise<Analysis> => {
+  uploadFile: async (
+    file: File,
+    onProgress?: (job: AnalysisJob) => void,
+  ): Promise<Analysis> => {
     const formData = new FormData();
     formData.append("file", file);
 
-    return apiClient<Analysis>("/api/analysis/upload", {
+    let job = await apiClient<AnalysisJob>("/api/analysis/upload", {
       method: "POST",
       body: formData,
     });
+    while (job.state === "queued" || job.state === "running") {
+      onProgress?.(job);
+      await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+      job = await api.getAnalysisJob(job.id);
+    }
+    if (job.state === "failed" || !job.analysis) {
+      throw new Error(job.error || "Failed to analyze video");
+    }
+    return job.analysis;
+  },
+
+  getAnalysisJob: async (jobId: string): Promise<AnalysisJob> => {
+    return apiClient<AnalysisJob>(`/api/analysis/jobs/${jobId}`);
   },
 
   getAnalysis: async (id: number): Promise<Analysis> => {
@@ -65,4 +82,4 @@ export const api = {
 };
 
 export { apiClient };
-
+
@@ -75,6 +75,19 @@ export interface Battle {
   created_at: string;
 }
 
+export type AnalysisJobState = "queued" | "running" | "done" | "failed";
+
+export interface AnalysisJob {
+  id: string;
+  state: AnalysisJobState;
+  frames_processed: number;
+  total_frames: number | null;
+  analysis: Analysis | null;
+  error: string | null;
+  created_at: string;
+  updated_at: string;
+}
+
 export interface UploadResponse {
   success: boolean;
   analysis_id: number;
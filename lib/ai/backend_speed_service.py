@@ -6,17 +6,87 @@
     analyzer = SpeedAnalyzer()
     result = analyzer.run(video_path="path/to/video.mp4", pixel_size=0.32)
 
-返回值为字典，可直接返回给 REST 接口或写入数据库。
+返回值为字典，可直接返回给 REST 接口或写入数据库。结果同时写入 output_dir 下的 JSON，
+run() 直接返回内存中的字典，不再回读该文件。
+
+emit_segments=True 时逐段速度默认内嵌在 JSON 中；长视频可设置 segments_format="npz"，
+逐段速度写入结果 JSON 旁的 *.segments.npz (列式，track_store.load_segments 可内存映射读取)，
+字典中只保留 segments_file 路径：
+    analyzer = SpeedAnalyzer(emit_segments=True, segments_format="npz")
+
+多核机器上可改用 SpeedWorkerPool 并行处理多个视频：
+    pool = SpeedWorkerPool(SpeedAnalyzer(), workers=8, threads_per_worker=4)
+    result = pool.submit(video_path="path/to/video.mp4").result()
+
+同一进程内多线程并发调用 run() 时，可设置 dynamic_batch_size > 1，
+让各视频的帧合批推理 (见 frame_batcher.FrameBatcher)：
+    analyzer = SpeedAnalyzer(dynamic_batch_size=16, batch_max_wait_ms=5)
 """
 
 from __future__ import annotations
 
+import contextlib
+import dataclasses
+import hashlib
 import json
+import multiprocessing as mp
+import os
 import threading
+from concurrent.futures import Future, ProcessPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
+
+import torch
+
+from early_stop import EarlyStop
+from frame_batcher import FrameBatcher
+from result_cache import file_digest
+from video_speed_tracking import LoadedModel, detect_and_track, load_model, rescale_payload
+
+# 输出结构或统计口径变化时递增，使旧的缓存结果失效
+RESULT_FORMAT = 4
+
+
+class ModelRegistry:
+    """
+    进程内常驻模型表，按 (权重路径, mtime, device, imgsz, fold_input, candidate_conf) 缓存已加载的模型。
+
+    权重文件被替换 (mtime 变化) 时自动重新加载，并丢弃同一路径的旧模型。
+    """
 
-from video_speed_tracking import detect_and_track
+    def __init__(self) -> None:
+        self._models: dict[tuple, LoadedModel] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(
+        weights: Path, device: str, imgsz: int, fold_input: bool, candidate_conf: Optional[float]
+    ) -> tuple:
+        mtime = weights.stat().st_mtime_ns if weights.exists() else None
+        return str(weights), mtime, device, imgsz, fold_input, candidate_conf
+
+    def get(
+        self,
+        weights: Path | str,
+        device: str,
+        imgsz: int,
+        fold_input: bool = False,
+        candidate_conf: Optional[float] = None,
+    ) -> LoadedModel:
+        weights = Path(weights).resolve()
+        key = self._key(weights, device, imgsz, fold_input, candidate_conf)
+        with self._lock:
+            loaded = self._models.get(key)
+            if loaded is None:
+                for stale in [k for k in self._models if k[0] == key[0] and k[1] != key[1]]:
+                    del self._models[stale]
+                loaded = load_model(weights, device, imgsz, fold_input=fold_input, candidate_conf=candidate_conf)
+                self._models[key] = loaded
+            return loaded
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
 
 
 class SpeedAnalyzer:
@@ -38,7 +108,30 @@ class SpeedAnalyzer:
         output_dir: Path | str = Path("runs/speed"),
         emit_segments: bool = False,
         preview_dir: Optional[Path | str] = None,
+        dynamic_batch_size: int = 1,
+        batch_max_wait_ms: float = 5.0,
+        batch_size: int = 1,
+        pipeline: bool = False,
+        preprocess_workers: int = 2,
+        preallocate: bool = False,
+        fold_input: bool = False,
+        early_filter: bool = False,
+        frame_stride: int = 1,
+        target_fps: Optional[float] = None,
+        early_stop: Optional[EarlyStop] = None,
+        static_threshold: Optional[float] = None,
+        keyframe_interval: Optional[int] = None,
+        motion_roi: bool = False,
+        roi_tile: Optional[int] = None,
+        roi_native: bool = False,
+        tiled: bool = False,
+        tile_overlap: int = 128,
+        spill_after: Optional[int] = None,
+        spill_dir: Optional[Path | str] = None,
+        segments_format: str = "json",
     ) -> None:
+        if segments_format not in ("json", "npz"):
+            raise ValueError(f"segments_format 只能为 'json' 或 'npz'，当前为 {segments_format!r}")
         self.weights = Path(weights)
         self.imgsz = imgsz
         self.conf_thres = conf_thres
@@ -49,7 +142,171 @@ class SpeedAnalyzer:
         self.output_dir = Path(output_dir)
         self.emit_segments = emit_segments
         self.preview_dir = Path(preview_dir) if preview_dir else (self.output_dir / "previews")
+        self.dynamic_batch_size = dynamic_batch_size
+        self.batch_max_wait_ms = batch_max_wait_ms
+        self.batch_size = batch_size
+        self.pipeline = pipeline
+        self.preprocess_workers = preprocess_workers
+        self.preallocate = preallocate
+        self.fold_input = fold_input
+        self.early_filter = early_filter
+        self.frame_stride = frame_stride
+        self.target_fps = target_fps
+        self.early_stop = early_stop
+        self.static_threshold = static_threshold
+        self.keyframe_interval = keyframe_interval
+        self.motion_roi = motion_roi
+        self.roi_tile = roi_tile
+        self.roi_native = roi_native
+        self.tiled = tiled
+        self.tile_overlap = tile_overlap
+        self.spill_after = spill_after
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        self.segments_format = segments_format
         self._lock = threading.Lock()
+        self.models = ModelRegistry()
+        self._batcher: Optional[FrameBatcher] = None
+        # 正在使用各 batcher 的视频数；被替换的 batcher 在最后一个使用者结束后才关闭
+        self._batcher_users: dict[FrameBatcher, int] = {}
+        self._weights_digest: Optional[tuple[int, str]] = None
+
+    def config(self) -> dict:
+        """返回可用于重建同配置 SpeedAnalyzer 的构造参数。"""
+        return {
+            "weights": self.weights,
+            "imgsz": self.imgsz,
+            "conf_thres": self.conf_thres,
+            "iou_thres": self.iou_thres,
+            "device": self.device,
+            "max_distance": self.max_distance,
+            "max_age": self.max_age,
+            "output_dir": self.output_dir,
+            "emit_segments": self.emit_segments,
+            "preview_dir": self.preview_dir,
+            "dynamic_batch_size": self.dynamic_batch_size,
+            "batch_max_wait_ms": self.batch_max_wait_ms,
+            "batch_size": self.batch_size,
+            "pipeline": self.pipeline,
+            "preprocess_workers": self.preprocess_workers,
+            "preallocate": self.preallocate,
+            "fold_input": self.fold_input,
+            "early_filter": self.early_filter,
+            "frame_stride": self.frame_stride,
+            "target_fps": self.target_fps,
+            "early_stop": self.early_stop,
+            "static_threshold": self.static_threshold,
+            "keyframe_interval": self.keyframe_interval,
+            "motion_roi": self.motion_roi,
+            "roi_tile": self.roi_tile,
+            "roi_native": self.roi_native,
+            "tiled": self.tiled,
+            "tile_overlap": self.tile_overlap,
+            "spill_after": self.spill_after,
+            "spill_dir": self.spill_dir,
+            "segments_format": self.segments_format,
+        }
+
+    def load_model(self) -> LoadedModel:
+        """返回常驻模型，首次调用时加载。"""
+        return self.models.get(
+            self.weights,
+            self.device,
+            self.imgsz,
+            fold_input=self.fold_input,
+            candidate_conf=self.conf_thres if self.early_filter else None,
+        )
+
+    def weights_digest(self) -> str:
+        """权重文件内容哈希，按 mtime 缓存，权重替换后自动失效。"""
+        mtime = self.weights.stat().st_mtime_ns
+        if self._weights_digest is None or self._weights_digest[0] != mtime:
+            self._weights_digest = (mtime, file_digest(self.weights))
+        return self._weights_digest[1]
+
+    def cache_key(
+        self,
+        video_digest: str,
+        class_filter: Optional[list[int]] = None,
+    ) -> str:
+        """
+        结果缓存键：视频内容哈希 + 权重哈希 + 所有影响检测与跟踪的分析参数。
+
+        batch_size / pipeline / preprocess_workers / preallocate 与 batch_max_wait_ms 只改变执行方式，
+        网络输入与检测结果不变，不参与计算；dynamic_batch_size 决定是否经 FrameBatcher 合批，
+        合批时 letterbox 关闭最小填充 (auto=False)，网络输入尺寸随之改变，因此以 letterbox_auto 计入。
+        pixel_size 只缩放物理速度，命中后用 recalibrate() 换算即可，同样不参与。
+        """
+        params = {
+            "format": RESULT_FORMAT,
+            "video": video_digest,
+            "weights": self.weights_digest(),
+            "imgsz": self.imgsz,
+            # 与 detect_and_track 中 auto = pt and batcher is None 一致 (pt 由权重决定)
+            "letterbox_auto": self.dynamic_batch_size <= 1,
+            "conf_thres": self.conf_thres,
+            "iou_thres": self.iou_thres,
+            "max_distance": self.max_distance,
+            "max_age": self.max_age,
+            "frame_stride": self.frame_stride,
+            "target_fps": self.target_fps,
+            "early_stop": dataclasses.asdict(self.early_stop) if self.early_stop else None,
+            "static_threshold": self.static_threshold,
+            "keyframe_interval": self.keyframe_interval,
+            "motion_roi": self.motion_roi,
+            "roi_tile": self.roi_tile,
+            "roi_native": self.roi_native,
+            "tiled": self.tiled,
+            "tile_overlap": self.tile_overlap,
+            "emit_segments": self.emit_segments,
+            "segments_format": self.segments_format,
+            "classes": sorted(class_filter) if class_filter is not None else None,
+        }
+        return hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def recalibrate(payload: dict, pixel_size: float) -> dict:
+        """用新的 pixel_size 由像素空间结果重新推导物理速度统计，不做任何推理。"""
+        return rescale_payload(payload, pixel_size)
+
+    def _acquire_batcher(self, loaded: LoadedModel) -> Optional[FrameBatcher]:
+        """取得当前模型的 batcher 并登记一个使用者，用完须调用 _release_batcher。"""
+        if self.dynamic_batch_size <= 1:
+            return None
+        retired = None
+        with self._lock:
+            if self._batcher is None or self._batcher.model is not loaded.model:
+                if self._batcher is not None and not self._batcher_users.get(self._batcher):
+                    retired = self._batcher
+                self._batcher = FrameBatcher(
+                    loaded.model,
+                    conf_thres=self.conf_thres,
+                    iou_thres=self.iou_thres,
+                    max_batch_size=self.dynamic_batch_size,
+                    max_wait_ms=self.batch_max_wait_ms,
+                )
+            batcher = self._batcher
+            self._batcher_users[batcher] = self._batcher_users.get(batcher, 0) + 1
+        if retired is not None:
+            retired.close()
+        return batcher
+
+    def _release_batcher(self, batcher: Optional[FrameBatcher]) -> None:
+        """注销一个使用者；已被替换且不再有使用者的 batcher 在此关闭。"""
+        if batcher is None:
+            return
+        with self._lock:
+            users = self._batcher_users[batcher] - 1
+            if users:
+                self._batcher_users[batcher] = users
+                return
+            del self._batcher_users[batcher]
+            if batcher is self._batcher:
+                return
+        batcher.close()
+
+    def batch_stats(self) -> dict:
+        """返回动态批处理的批大小与延迟直方图；未启用时为空字典。"""
+        return self._batcher.stats.snapshot() if self._batcher else {}
 
     def run(
         self,
@@ -57,6 +314,7 @@ class SpeedAnalyzer:
         pixel_size: float = 1.0,
         output_path: Optional[Path | str] = None,
         class_filter: Optional[list[int]] = None,
+        progress: Optional[Callable[[int, int], None]] = None,
     ) -> dict:
         """
         执行速度分析并返回字典结果。
@@ -65,6 +323,7 @@ class SpeedAnalyzer:
         :param pixel_size: 像素到物理距离换算（单位自定义）
         :param output_path: 可选，自定义结果 JSON 保存位置；默认保存在 output_dir
         :param class_filter: 可选，只关注指定类别 id
+        :param progress: 可选，进度回调，参数为 (已处理帧数, 总帧数)
         """
         video_path = Path(video_path).resolve()
         if not video_path.exists():
@@ -82,31 +341,246 @@ class SpeedAnalyzer:
             preview_path.parent.mkdir(parents=True, exist_ok=True)
 
         output_path.parent.mkdir(parents=True, exist_ok=True)
+        segments_path: Optional[Path] = None
+        if self.emit_segments and self.segments_format == "npz":
+            segments_path = output_path.with_suffix(".segments.npz")
+        model = self.load_model()
+        batcher = self._acquire_batcher(model)
+
+        try:
+            # YOLOv5 DetectMultiBackend 会在 GPU/CPU 间初始化全局状态，串行执行以避免冲突；
+            # 合批模式下模型只在 batcher 线程中调用，各视频可并发解码与跟踪
+            with self._lock if batcher is None else contextlib.nullcontext():
+                payload = detect_and_track(
+                    weights=self.weights,
+                    source=video_path,
+                    imgsz=self.imgsz,
+                    conf_thres=self.conf_thres,
+                    iou_thres=self.iou_thres,
+                    device=self.device,
+                    pixel_size=pixel_size,
+                    max_distance=self.max_distance,
+                    max_age=self.max_age,
+                    class_filter=class_filter,
+                    output=output_path,
+                    emit_segments=self.emit_segments,
+                    preview_path=preview_path,
+                    model=model,
+                    progress=progress,
+                    batcher=batcher,
+                    batch_size=self.batch_size,
+                    pipeline=self.pipeline,
+                    preprocess_workers=self.preprocess_workers,
+                    preallocate=self.preallocate,
+                    frame_stride=self.frame_stride,
+                    target_fps=self.target_fps,
+                    early_stop=self.early_stop,
+                    static_threshold=self.static_threshold,
+                    keyframe_interval=self.keyframe_interval,
+                    motion_roi=self.motion_roi,
+                    roi_tile=self.roi_tile,
+                    roi_native=self.roi_native,
+                    tiled=self.tiled,
+                    tile_overlap=self.tile_overlap,
+                    spill_after=self.spill_after,
+                    spill_dir=self.spill_dir,
+                    segments_path=segments_path,
+                )
+        finally:
+            self._release_batcher(batcher)
 
-        # YOLOv5 DetectMultiBackend 会在 GPU/CPU 间初始化全局状态，串行执行以避免冲突
-        with self._lock:
-            detect_and_track(
-                weights=self.weights,
-                source=video_path,
-                imgsz=self.imgsz,
-                conf_thres=self.conf_thres,
-                iou_thres=self.iou_thres,
-                device=self.device,
-                pixel_size=pixel_size,
-                max_distance=self.max_distance,
-                max_age=self.max_age,
-                class_filter=class_filter,
-                output=output_path,
-                emit_segments=self.emit_segments,
-                preview_path=preview_path,
-            )
-
-        payload = json.loads(output_path.read_text(encoding="utf-8"))
         if preview_path and preview_path.exists():
             payload.setdefault("preview_image", str(preview_path))
         return payload
 
 
+_worker_analyzer: Optional[SpeedAnalyzer] = None
+_worker_progress_queue: Optional[mp.Queue] = None
+# 工作进程每分析这么多步回报一次进度，避免逐帧跨进程通信
+_PROGRESS_INTERVAL = 10
+
+
+def _throttle_progress(
+    send: Callable[[int, int], None], interval: int = _PROGRESS_INTERVAL
+) -> Callable[[int, int], None]:
+    """
+    包装进度回调：第一次调用、此后每 interval 次调用以及到达末帧时转发给 send。
+
+    按调用次数 (即分析步数) 而不是帧号节流：跳帧分析时回报的帧号为 k * frame_stride + 1，
+    不一定出现 interval 的倍数。
+    """
+    calls = 0
+
+    def progress(done: int, total: int) -> None:
+        nonlocal calls
+        if calls % interval == 0 or done >= total:
+            send(done, total)
+        calls += 1
+
+    return progress
+
+
+def _init_worker(
+    source: SpeedAnalyzer | dict,
+    num_threads: int,
+    progress_queue: Optional[mp.Queue] = None,
+) -> None:
+    """
+    工作进程初始化：限制 torch 线程数，并准备本进程的 SpeedAnalyzer。
+
+    fork 模式下 source 为父进程中已加载模型的 analyzer（写时复制共享权重）；
+    spawn / forkserver 模式下 source 为构造参数，由子进程自行加载模型。
+    """
+    global _worker_analyzer, _worker_progress_queue
+    torch.set_num_threads(num_threads)
+    if isinstance(source, dict):
+        analyzer = SpeedAnalyzer(**source)
+    else:
+        analyzer = source
+        # fork 时父进程的锁状态会被原样复制，重新创建以免继承到已持有的锁
+        analyzer._lock = threading.Lock()
+        analyzer.models._lock = threading.Lock()
+        # batcher 的后台线程不会随 fork 复制，子进程按需重建
+        analyzer._batcher = None
+        analyzer._batcher_users = {}
+    analyzer.load_model()
+    _worker_analyzer = analyzer
+    _worker_progress_queue = progress_queue
+
+
+def _run_in_worker(
+    video_path: str,
+    pixel_size: float,
+    output_path: Optional[str],
+    class_filter: Optional[list[int]],
+    task_id: Optional[int] = None,
+) -> dict:
+    assert _worker_analyzer is not None, "worker not initialized"
+    progress = None
+    if task_id is not None and _worker_progress_queue is not None:
+        queue = _worker_progress_queue
+        progress = _throttle_progress(lambda done, total: queue.put((task_id, done, total)))
+
+    return _worker_analyzer.run(
+        video_path=video_path,
+        pixel_size=pixel_size,
+        output_path=output_path,
+        class_filter=class_filter,
+        progress=progress,
+    )
+
+
+class SpeedWorkerPool:
+    """
+    多进程推理池：每个工作进程持有独立的模型实例，从任务队列取视频并行分析。
+
+    默认以 spawn 启动子进程，每个子进程按 analyzer.config() 各自加载一次模型。
+    start_method="fork" 时在创建子进程前加载模型，子进程以写时复制方式共享权重；
+    但父进程已启动线程 (如 Web 服务的工作线程、torch / OpenMP 线程池) 后再 fork，
+    子进程可能继承被其他线程持有的内部锁而死锁，只应在单线程的脚本中使用。
+    """
+
+    def __init__(
+        self,
+        analyzer: SpeedAnalyzer,
+        workers: Optional[int] = None,
+        threads_per_worker: int = 4,
+        start_method: str = "spawn",
+    ) -> None:
+        if start_method not in mp.get_all_start_methods():
+            raise ValueError(f"当前平台不支持的进程启动方式: {start_method}")
+        cpu_count = os.cpu_count() or 1
+        self.threads_per_worker = max(1, threads_per_worker)
+        self.workers = workers or max(1, cpu_count // self.threads_per_worker)
+        self.analyzer = analyzer
+        self.start_method = start_method
+
+        ctx = mp.get_context(start_method)
+        if start_method == "fork":
+            analyzer.load_model()
+            source: SpeedAnalyzer | dict = analyzer
+        else:
+            source = analyzer.config()
+
+        self._progress_queue = ctx.Queue()
+        self._progress_callbacks: dict[int, Callable[[int, int], None]] = {}
+        self._progress_lock = threading.Lock()
+        self._next_task_id = 0
+        self._progress_thread = threading.Thread(
+            target=self._drain_progress, name="speed-pool-progress", daemon=True
+        )
+        self._progress_thread.start()
+
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(source, self.threads_per_worker, self._progress_queue),
+        )
+
+    def _drain_progress(self) -> None:
+        while True:
+            item = self._progress_queue.get()
+            if item is None:
+                return
+            task_id, done, total = item
+            with self._progress_lock:
+                callback = self._progress_callbacks.get(task_id)
+            if callback is not None:
+                callback(done, total)
+
+    def submit(
+        self,
+        video_path: Path | str,
+        pixel_size: float = 1.0,
+        output_path: Optional[Path | str] = None,
+        class_filter: Optional[list[int]] = None,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> Future:
+        """
+        提交分析任务，返回结果为 SpeedAnalyzer.run 字典的 Future。
+
+        progress 在父进程的进度线程中调用，参数为 (已处理帧数, 总帧数)。
+        """
+        task_id = None
+        if progress is not None:
+            with self._progress_lock:
+                task_id = self._next_task_id
+                self._next_task_id += 1
+                self._progress_callbacks[task_id] = progress
+
+        future = self._executor.submit(
+            _run_in_worker,
+            str(video_path),
+            pixel_size,
+            str(output_path) if output_path else None,
+            class_filter,
+            task_id,
+        )
+        if task_id is not None:
+            future.add_done_callback(lambda _: self._forget_task(task_id))
+        return future
+
+    def _forget_task(self, task_id: int) -> None:
+        with self._progress_lock:
+            self._progress_callbacks.pop(task_id, None)
+
+    def run(
+        self,
+        video_path: Path | str,
+        pixel_size: float = 1.0,
+        output_path: Optional[Path | str] = None,
+        class_filter: Optional[list[int]] = None,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> dict:
+        """与 SpeedAnalyzer.run 相同的阻塞接口，但在工作进程中执行。"""
+        return self.submit(video_path, pixel_size, output_path, class_filter, progress).result()
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+        self._progress_queue.put(None)
+
+
 if __name__ == "__main__":
     analyzer = SpeedAnalyzer()
     result = analyzer.run(video_path="../sample_video/11.mp4", pixel_size=0.32)
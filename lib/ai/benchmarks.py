@@ -0,0 +1,511 @@
+"""
+跟踪与推理热点的微基准。
+
+用法：
+    python benchmarks.py association           # 代价矩阵构建：逐元素循环 vs 广播
+    python benchmarks.py association --sizes 50 200 500 --repeat 20
+    python benchmarks.py assignment            # 线性指派：精确最短增广路 vs 贪心
+    python benchmarks.py gating                # 轨迹关联：稠密代价矩阵 vs 屏蔽超距配对的单次求解 vs 网格门控 + 连通分量
+    python benchmarks.py preprocess            # 帧预处理：逐帧分配 vs 预分配缓冲区
+    python benchmarks.py detect-head           # 检测头后处理：全量解码 + NMS vs 先按置信度过滤再解码
+    python benchmarks.py nms                   # NMS：逐图循环 vs 整批向量化 (逐图 NMS 或整批一次 NMS)
+    python benchmarks.py keyframe --weights best.pt --source clip.mp4  # 关键帧 + 光流 vs 逐帧检测
+
+每个基准都会先校验新旧实现结果一致，再输出各规模下的平均耗时与加速比。
+keyframe 为近似方法，不要求结果一致，而是输出与逐帧检测基线相比的耗时与速度统计偏差。
+"""
+
+from __future__ import annotations
+
+import argparse
+import inspect
+import itertools
+import math
+import time
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+
+from frame_preprocess import VideoPreprocessor
+from models.yolo import Detect
+from utils.augmentations import letterbox
+from utils.general import batched_non_max_suppression, non_max_suppression
+from utils.matching import greedy_assignment, linear_sum_assignment
+from video_speed_tracking import (
+    GATED_MIN_PAIRS,
+    _associate_dense,
+    _associate_gated,
+    _associate_masked,
+    detect_and_track,
+    detection_centers,
+    load_model,
+    pairwise_distances,
+)
+
+
+def _timeit(fn: Callable[[], object], repeat: int) -> float:
+    """返回 fn 的平均耗时（毫秒），先预热一次。"""
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1000.0
+
+
+def _print_table(title: str, rows: List[Dict[str, object]]) -> None:
+    print(f"\n=== {title} ===")
+    if not rows:
+        return
+    headers = list(rows[0].keys())
+    print("  ".join(f"{h:>12}" for h in headers))
+    for row in rows:
+        print("  ".join(f"{row[h]:>12.3f}" if isinstance(row[h], float) else f"{row[h]!s:>12}" for h in headers))
+
+
+def _random_scene(n: int, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+    """n 条轨迹中心与 n 个在其附近抖动的检测框 (xyxy)，模拟拥挤视野。"""
+    track_xy = rng.uniform(0, 1920, size=(n, 2))
+    moved = track_xy + rng.normal(0, 10, size=track_xy.shape)
+    boxes = np.concatenate([moved - 8, moved + 8], axis=1).astype(np.float32)
+    return track_xy, boxes[rng.permutation(n)]
+
+
+def _loop_cost(track_xy: np.ndarray, boxes: np.ndarray, max_distance: float) -> np.ndarray:
+    """原实现：逐元素 math.hypot 填充代价矩阵。"""
+    cost = np.full((len(track_xy), len(boxes)), fill_value=max_distance + 1, dtype=np.float32)
+    track_centers = [(float(x), float(y)) for x, y in track_xy]
+    det_centers = [((bbox[0] + bbox[2]) / 2.0, (bbox[1] + bbox[3]) / 2.0) for bbox in boxes]
+    for t_idx, last_center in enumerate(track_centers):
+        for d_idx, center in enumerate(det_centers):
+            cost[t_idx, d_idx] = math.hypot(center[0] - last_center[0], center[1] - last_center[1])
+    return cost
+
+
+def bench_association(sizes: Sequence[int], repeat: int) -> None:
+    rng = np.random.default_rng(0)
+    rows = []
+    for n in sizes:
+        track_xy, boxes = _random_scene(n, rng)
+        expected = _loop_cost(track_xy, boxes, 80.0)
+        actual = pairwise_distances(track_xy, detection_centers(boxes))
+        assert np.allclose(expected, actual, rtol=0, atol=1e-3), f"cost matrix mismatch at n={n}"
+
+        loop_ms = _timeit(lambda: _loop_cost(track_xy, boxes, 80.0), repeat)
+        vec_ms = _timeit(lambda: pairwise_distances(track_xy, detection_centers(boxes)), repeat)
+        rows.append({"objects": n, "loop_ms": loop_ms, "broadcast_ms": vec_ms, "speedup": loop_ms / vec_ms})
+    _print_table("cost matrix construction", rows)
+
+
+def _brute_force_assignment(cost: np.ndarray) -> Tuple[int, float]:
+    """枚举所有指派，返回 (允许配对的最大数量, 该数量下的最小总代价)。"""
+    if cost.shape[0] > cost.shape[1]:
+        cost = cost.T
+    rows, cols = cost.shape
+    best: Tuple[int, float] = (0, 0.0)
+    for perm in itertools.permutations(range(cols), rows):
+        values = cost[np.arange(rows), perm]
+        ok = np.isfinite(values)
+        key = (int(ok.sum()), float(values[ok].sum()))
+        if key[0] > best[0] or (key[0] == best[0] and key[1] < best[1]):
+            best = key
+    return best
+
+
+def check_assignment_against_brute_force(trials: int, rng: np.random.Generator) -> None:
+    """在小规模 (含矩形与 inf) 随机矩阵上，与穷举结果比较配对数与总代价。"""
+    for _ in range(trials):
+        rows, cols = rng.integers(1, 7, size=2)
+        cost = rng.integers(0, 10, size=(rows, cols)).astype(np.float64)
+        if rng.random() < 0.5:
+            cost[rng.random((rows, cols)) < 0.3] = np.inf
+        row_ind, col_ind = linear_sum_assignment(cost)
+        assert len(set(row_ind.tolist())) == len(row_ind) and len(set(col_ind.tolist())) == len(col_ind)
+        expected = _brute_force_assignment(cost)
+        actual = (len(row_ind), float(cost[row_ind, col_ind].sum()))
+        assert actual[0] == expected[0] and math.isclose(actual[1], expected[1]), (cost, actual, expected)
+    print(f"brute-force equivalence: {trials} random matrices OK")
+
+
+def bench_assignment(sizes: Sequence[int], repeat: int, greedy_max: int, trials: int) -> None:
+    rng = np.random.default_rng(0)
+    check_assignment_against_brute_force(trials, rng)
+    rows = []
+    for n in sizes:
+        track_xy, boxes = _random_scene(n, rng)
+        cost = pairwise_distances(track_xy, detection_centers(boxes))
+        exact_ms = _timeit(lambda: linear_sum_assignment(cost), repeat)
+        r, c = linear_sum_assignment(cost)
+        row: Dict[str, object] = {
+            "objects": n,
+            "exact_ms": exact_ms,
+            "greedy_ms": "-",
+            "speedup": "-",
+            "greedy_cost": "-",
+        }
+        if n <= greedy_max:
+            greedy_ms = _timeit(lambda: greedy_assignment(cost), max(1, repeat // 5))
+            gr, gc = greedy_assignment(cost)
+            row.update(
+                greedy_ms=greedy_ms,
+                speedup=greedy_ms / exact_ms,
+                greedy_cost=float(cost[gr, gc].sum() / cost[r, c].sum()),
+            )
+        rows.append(row)
+    _print_table("linear assignment (greedy_cost = greedy / optimal total cost)", rows)
+
+
+def _crowded_scene(n: int, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+    """与 _random_scene 相同，但目标平均间距约 40 px，max_distance=80 时全部目标连成一个分量。"""
+    extent = math.sqrt(n) * 40.0
+    track_xy = rng.uniform(0, extent, size=(n, 2))
+    moved = track_xy + rng.normal(0, 10, size=track_xy.shape)
+    boxes = np.concatenate([moved - 8, moved + 8], axis=1).astype(np.float32)
+    return track_xy, boxes[rng.permutation(n)]
+
+
+def bench_gating(sizes: Sequence[int], repeat: int, max_distance: float) -> None:
+    rng = np.random.default_rng(0)
+    rows = []
+    for (scene, make_scene), n in itertools.product((("sparse", _random_scene), ("crowded", _crowded_scene)), sizes):
+        track_xy, boxes = make_scene(n, rng)
+        det_xy = detection_centers(boxes)
+        dense = _associate_dense(track_xy, det_xy, max_distance)
+        masked = _associate_masked(track_xy, det_xy, max_distance)
+        gated = _associate_gated(track_xy, det_xy, max_distance)
+        assert len(masked[0]) == len(gated[0]), f"gated association mismatch at {n} objects"
+        rows.append(
+            {
+                "scene": scene,
+                "objects": n,
+                "dense_ms": _timeit(lambda: _associate_dense(track_xy, det_xy, max_distance), repeat),
+                "masked_ms": _timeit(lambda: _associate_masked(track_xy, det_xy, max_distance), repeat),
+                "gated_ms": _timeit(lambda: _associate_gated(track_xy, det_xy, max_distance), repeat),
+                "default": "masked" if n * n <= GATED_MIN_PAIRS else "gated",
+                "dense_match": len(dense[0]),
+                "gated_match": len(gated[0]),
+            }
+        )
+    _print_table(
+        f"track association (max_distance={max_distance}; masked = one solve with infeasible pairs, "
+        f"gated = grid + components, default switches at GATED_MIN_PAIRS={GATED_MIN_PAIRS})",
+        rows,
+    )
+
+
+def _alloc_per_frame(step: Callable[[], object], frames: int) -> float:
+    """
+    每帧预处理期间 Python 堆 (含 NumPy / OpenCV 返回的数组) 峰值高于帧前占用的平均 KB 数。
+
+    预热一帧后统计；为 0 说明该步骤没有新的数组分配。CPU 上 torch 张量不经过 tracemalloc，
+    其复用情况另由 tensor_reused 列给出。
+    """
+    step()
+    tracemalloc.start()
+    total = 0
+    try:
+        for _ in range(frames):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            step()
+            total += tracemalloc.get_traced_memory()[1] - current
+    finally:
+        tracemalloc.stop()
+    return total / frames / 1024.0
+
+
+def bench_preprocess(shapes: Sequence[Tuple[int, int]], imgsz: int, frames: int, repeat: int) -> None:
+    device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
+    rng = np.random.default_rng(0)
+    rows = []
+    for h, w in shapes:
+        decoded = rng.integers(0, 256, size=(h, w, 3), dtype=np.uint8)
+        preprocessor = VideoPreprocessor((h, w), imgsz, 32, True, device)
+        outputs: set = set()
+
+        def baseline() -> torch.Tensor:
+            frame = decoded.copy()  # 模拟 cap.read() 每帧返回新图像
+            im = letterbox(frame, imgsz, stride=32, auto=True)[0]
+            im = np.ascontiguousarray(im.transpose((2, 0, 1))[::-1])
+            im_tensor = torch.from_numpy(im).to(device).float()
+            im_tensor /= 255.0
+            return im_tensor.unsqueeze(0)
+
+        def preallocated() -> torch.Tensor:
+            np.copyto(preprocessor.frames[0], decoded)  # cap.read(buffer) 原地写入
+            preprocessor.load(0)
+            images = preprocessor.tensor(1)
+            outputs.add(images.data_ptr())
+            return images
+
+        expected = baseline()
+        actual = preallocated()
+        assert expected.shape == actual.shape, (expected.shape, actual.shape)
+        assert torch.allclose(expected, actual), f"preprocess mismatch at {h}x{w}"
+
+        base_ms = _timeit(baseline, repeat)
+        pre_ms = _timeit(preallocated, repeat)
+        rows.append(
+            {
+                "frame": f"{w}x{h}",
+                "base_ms": base_ms,
+                "prealloc_ms": pre_ms,
+                "speedup": base_ms / pre_ms,
+                "base_kb": _alloc_per_frame(baseline, frames),
+                "prealloc_kb": _alloc_per_frame(preallocated, frames),
+                "tensor_reused": len(outputs) == 1,
+            }
+        )
+    _print_table(f"frame preprocessing on {device} (*_kb = heap allocated per frame)", rows)
+
+
+def _detect_head(
+    nc: int, imgsz: int, batch: int, conf_thres: float, candidates: int
+) -> Tuple[Detect, List[torch.Tensor]]:
+    """
+    随机权重的 YOLOv5s 检测头与对应的三层特征图。
+
+    按 YOLOv5 先验初始化时随机特征几乎没有锚框越过 conf_thres，两种路径比较的都是空结果；
+    这里按各层目标置信度 logit 的分位数设置偏置，使每张图约有 candidates 个锚框越过阈值，
+    类别偏置设为 3 (置信度约 0.95)，候选大多能留到 NMS。
+    """
+    anchors = [[10, 13, 16, 30, 33, 23], [30, 61, 62, 45, 59, 119], [116, 90, 156, 198, 373, 326]]
+    channels, strides = (128, 256, 512), (8, 16, 32)
+    head = Detect(nc, anchors, channels).eval()
+    head.stride = torch.tensor(strides, dtype=torch.float32)
+    gen = torch.Generator().manual_seed(0)
+    features = [torch.randn(batch, c, imgsz // s, imgsz // s, generator=gen) * 0.5 for c, s in zip(channels, strides)]
+    frac = candidates / (sum((imgsz // s) ** 2 for s in strides) * head.na)
+    logit = math.log(conf_thres / (1 - conf_thres))
+    with torch.no_grad():
+        for conv, f in zip(head.m, features):
+            b = conv.bias.view(head.na, -1)
+            b.zero_()
+            b[:, 5:] = 3.0
+            obj = conv(f).view(batch, head.na, head.no, -1)[:, :, 4]
+            b[:, 4] = logit - torch.quantile(obj.flatten(), 1 - frac)
+    return head, features
+
+
+def bench_detect_head(
+    batches: Sequence[int], imgsz: int, nc: int, conf_thres: float, candidates: int, repeat: int
+) -> None:
+    rows = []
+    for batch in batches:
+        head, features = _detect_head(nc, imgsz, batch, conf_thres, candidates)
+
+        def dense() -> List[torch.Tensor]:
+            head.conf_thres = None
+            return non_max_suppression(head([f.clone() for f in features])[0], conf_thres, 0.45)
+
+        def filtered() -> List[torch.Tensor]:
+            head.conf_thres = conf_thres
+            return non_max_suppression(head([f.clone() for f in features])[0], conf_thres, 0.45)
+
+        with torch.no_grad():
+            expected, actual = dense(), filtered()
+            for e, a in zip(expected, actual):
+                assert e.shape == a.shape and torch.allclose(e, a, atol=1e-4), f"detect-head mismatch at batch {batch}"
+            head.conf_thres = conf_thres
+            kept = len(head([f.clone() for f in features])[0].rows)
+            assert kept and all(len(e) for e in expected), f"no candidates at batch {batch}, comparison is vacuous"
+            dense_ms = _timeit(dense, repeat)
+            filtered_ms = _timeit(filtered, repeat)
+        anchors = sum(f.shape[2] * f.shape[3] for f in features) * head.na * batch
+        rows.append(
+            {
+                "batch": batch,
+                "anchors": anchors,
+                "candidates": kept,
+                "dets/img": sum(len(e) for e in expected) / batch,
+                "dense_ms": dense_ms,
+                "filtered_ms": filtered_ms,
+                "speedup": dense_ms / filtered_ms,
+            }
+        )
+    _print_table(
+        f"Detect head + NMS at {imgsz}, conf_thres={conf_thres} (random head, ~{candidates} candidates/img)", rows
+    )
+
+
+def _random_predictions(batch: int, imgsz: int, nc: int, candidates: int, gen: torch.Generator) -> torch.Tensor:
+    """(batch, anchors, 5+nc) 的模拟检测头输出：框成簇分布，每张图 candidates 个锚框的目标置信度越过 0.3。"""
+    n = sum((imgsz // s) ** 2 for s in (8, 16, 32)) * 3
+    pred = torch.empty(batch, n, 5 + nc)
+    centers = torch.rand(batch, 64, 2, generator=gen) * imgsz  # 每张图 64 个目标簇
+    pick = torch.randint(0, 64, (batch, n), generator=gen)
+    pred[..., :2] = torch.gather(centers, 1, pick[..., None].expand(-1, -1, 2)) + torch.randn(batch, n, 2, generator=gen) * 4
+    pred[..., 2:4] = 12 + torch.rand(batch, n, 2, generator=gen) * 24
+    pred[..., 4] = torch.rand(batch, n, generator=gen) * 0.2
+    chosen = torch.rand(batch, n, generator=gen).argsort(1)[:, :candidates]
+    pred[..., 4].scatter_(1, chosen, 0.3 + 0.7 * torch.rand(batch, candidates, generator=gen))
+    pred[..., 5:] = 0.8 + 0.2 * torch.rand(batch, n, nc, generator=gen)
+    return pred
+
+
+def bench_nms(
+    batches: Sequence[int], candidates: Sequence[int], imgsz: int, nc: int, conf_thres: float, repeat: int
+) -> None:
+    gen = torch.Generator().manual_seed(0)
+    single_pairs = inspect.signature(batched_non_max_suppression).parameters["single_nms_pairs"].default
+    rows = []
+    for per_image, batch in itertools.product(candidates, batches):
+        pred = _random_predictions(batch, imgsz, nc, per_image, gen)
+        expected = non_max_suppression(pred, conf_thres, 0.45)
+        for pairs in (0, math.inf):
+            actual = batched_non_max_suppression(pred, conf_thres, 0.45, single_nms_pairs=pairs)
+            assert len(expected) == len(actual) == batch
+            for e, a in zip(expected, actual):
+                assert torch.equal(e, a), f"nms mismatch at batch {batch}"
+        loop_ms = _timeit(lambda: non_max_suppression(pred, conf_thres, 0.45), repeat)
+        per_image_ms = _timeit(lambda: batched_non_max_suppression(pred, conf_thres, 0.45, single_nms_pairs=0), repeat)
+        single_ms = _timeit(lambda: batched_non_max_suppression(pred, conf_thres, 0.45, single_nms_pairs=math.inf), repeat)
+        batched_ms = _timeit(lambda: batched_non_max_suppression(pred, conf_thres, 0.45), repeat)
+        rows.append(
+            {
+                "cand/img": per_image,
+                "batch": batch,
+                "boxes/img": sum(len(d) for d in expected) / batch,
+                "loop_ms": loop_ms,
+                "per_image_ms": per_image_ms,
+                "single_ms": single_ms,
+                "default": "loop" if batch == 1 else ("single" if per_image**2 * batch <= single_pairs else "per_image"),
+                "batched_ms": batched_ms,
+                "speedup": loop_ms / batched_ms,
+            }
+        )
+    _print_table(
+        f"non_max_suppression at {imgsz}, nc={nc}: per-image loop vs batched "
+        "(vectorized filter + per-image nms, or one offset nms for the batch)",
+        rows,
+    )
+
+
+def bench_keyframe(weights: Path, source: Path, imgsz: int, device: str, intervals: Sequence[int]) -> None:
+    model = load_model(weights, device, imgsz)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+
+        def run(interval: Optional[int]) -> Tuple[float, Dict]:
+            t0 = time.perf_counter()
+            payload = detect_and_track(
+                weights=weights,
+                source=source,
+                imgsz=imgsz,
+                conf_thres=0.25,
+                iou_thres=0.45,
+                device=device,
+                pixel_size=1.0,
+                max_distance=80.0,
+                max_age=5,
+                class_filter=None,
+                output=Path(tmp) / "speed.json",
+                emit_segments=False,
+                model=model,
+                keyframe_interval=interval,
+            )
+            return time.perf_counter() - t0, payload
+
+        base_s, base = run(None)
+        base_stats = base["summary"].get("pixel_speed_stats") or {}
+        for interval in intervals:
+            elapsed, payload = run(interval)
+            stats = payload["summary"].get("pixel_speed_stats") or {}
+            report = payload["keyframes"]
+
+            def rel_delta(name: str) -> float:
+                if not base_stats.get(name) or name not in stats:
+                    return math.nan
+                return (stats[name] - base_stats[name]) / base_stats[name]
+
+            rows.append(
+                {
+                    "max_k": interval,
+                    "base_s": base_s,
+                    "keyframe_s": elapsed,
+                    "speedup": base_s / elapsed,
+                    "key_ratio": report["keyframe_ratio"],
+                    "final_k": report["final_interval"],
+                    "drift_px": math.nan if report["mean_keyframe_drift_px"] is None else report["mean_keyframe_drift_px"],
+                    "mean_delta": rel_delta("mean"),
+                    "median_delta": rel_delta("median"),
+                    "tracks_delta": len(payload["tracks"]) - len(base["tracks"]),
+                }
+            )
+    _print_table(f"keyframe + optical flow vs per-frame detection ({source.name}, *_delta relative to baseline)", rows)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="跟踪 / 推理热点微基准")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    p = sub.add_parser("association", help="关联代价矩阵构建")
+    p.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 500], help="轨迹 / 检测数量")
+    p.add_argument("--repeat", type=int, default=10, help="每个规模的重复次数")
+
+    p = sub.add_parser("assignment", help="线性指派求解器")
+    p.add_argument("--sizes", type=int, nargs="+", default=[100, 300, 1000], help="轨迹 / 检测数量")
+    p.add_argument("--repeat", type=int, default=5, help="每个规模的重复次数")
+    p.add_argument("--greedy-max", type=int, default=300, help="超过该规模不再运行贪心基线 (O(n^3) 解释执行)")
+    p.add_argument("--trials", type=int, default=500, help="与穷举结果对比的随机小矩阵数量")
+
+    p = sub.add_parser("gating", help="轨迹关联的空间门控")
+    p.add_argument("--sizes", type=int, nargs="+", default=[25, 50, 100, 200, 400, 1000], help="轨迹 / 检测数量")
+    p.add_argument("--repeat", type=int, default=5, help="每个规模的重复次数")
+    p.add_argument("--max-distance", type=float, default=80.0, help="轨迹匹配允许的最大像素距离")
+
+    p = sub.add_parser("preprocess", help="视频帧预处理的内存分配")
+    p.add_argument("--shapes", type=str, nargs="+", default=["1080x1920", "720x1280", "640x640"], help="帧尺寸 HxW")
+    p.add_argument("--imgsz", type=int, default=640, help="推理输入尺寸")
+    p.add_argument("--frames", type=int, default=50, help="统计内存分配的帧数")
+    p.add_argument("--repeat", type=int, default=50, help="计时的重复次数")
+
+    p = sub.add_parser("detect-head", help="检测头解码与 NMS 的后处理开销")
+    p.add_argument("--batches", type=int, nargs="+", default=[1, 8], help="批大小")
+    p.add_argument("--imgsz", type=int, default=640, help="推理输入尺寸")
+    p.add_argument("--nc", type=int, default=3, help="类别数")
+    p.add_argument("--conf-thres", type=float, default=0.25, help="置信度阈值")
+    p.add_argument("--candidates", type=int, default=500, help="每张图越过置信度阈值的锚框数量")
+    p.add_argument("--repeat", type=int, default=20, help="每个批大小的重复次数")
+
+    p = sub.add_parser("nms", help="逐图循环 NMS 与整批向量化 NMS")
+    p.add_argument("--batches", type=int, nargs="+", default=[1, 4, 8, 16, 32], help="批大小")
+    p.add_argument("--candidates", type=int, nargs="+", default=[25, 100, 300, 1000], help="每张图的候选框数量")
+    p.add_argument("--imgsz", type=int, default=640, help="推理输入尺寸")
+    p.add_argument("--nc", type=int, default=3, help="类别数")
+    p.add_argument("--conf-thres", type=float, default=0.25, help="置信度阈值")
+    p.add_argument("--repeat", type=int, default=20, help="每个批大小的重复次数")
+
+    p = sub.add_parser("keyframe", help="关键帧检测 + 光流传播的耗时与精度")
+    p.add_argument("--weights", type=Path, default=Path("best.pt"), help="模型权重路径")
+    p.add_argument("--source", type=Path, required=True, help="视频文件路径")
+    p.add_argument("--imgsz", type=int, default=640, help="推理输入尺寸")
+    p.add_argument("--device", type=str, default="", help="推理设备，如 '0' 或 'cpu'")
+    p.add_argument("--intervals", type=int, nargs="+", default=[2, 4, 8], help="最大关键帧间隔")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.bench == "association":
+        bench_association(args.sizes, args.repeat)
+    elif args.bench == "assignment":
+        bench_assignment(args.sizes, args.repeat, args.greedy_max, args.trials)
+    elif args.bench == "gating":
+        bench_gating(args.sizes, args.repeat, args.max_distance)
+    elif args.bench == "preprocess":
+        shapes = [tuple(int(v) for v in shape.lower().split("x")) for shape in args.shapes]
+        bench_preprocess(shapes, args.imgsz, args.frames, args.repeat)
+    elif args.bench == "detect-head":
+        bench_detect_head(args.batches, args.imgsz, args.nc, args.conf_thres, args.candidates, args.repeat)
+    elif args.bench == "nms":
+        bench_nms(args.batches, args.candidates, args.imgsz, args.nc, args.conf_thres, args.repeat)
+    elif args.bench == "keyframe":
+        bench_keyframe(args.weights, args.source, args.imgsz, args.device, args.intervals)
+
+
+if __name__ == "__main__":
+    main()
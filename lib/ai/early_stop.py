@@ -0,0 +1,121 @@
+"""
+运动统计收敛后提前结束分析。
+
+计分只需要稳定的平均 / 中位速度与类别比例，不必处理完整视频。ConvergenceMonitor 在跟踪过程中
+累积速度样本的均值与方差 (Welford / Chan 合并) 以及各类别的轨迹数，每隔 check_every 个被分析帧
+检查一次：
+- 平均速度置信区间半宽 / |均值| <= speed_rtol；
+- 每个类别比例的 Wilson 置信区间半宽 <= class_atol；
+两者同时满足即判定收敛。帧数预算 (max_frames) 与墙钟预算 (max_seconds) 用尽时同样停止。
+
+同一轨迹相邻段的速度彼此相关，样本级置信区间偏窄，因此另设 min_frames / min_tracks 下限。
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import numpy as np
+
+# 停止原因
+END_OF_VIDEO = "end_of_video"
+CONVERGED = "converged"
+FRAME_BUDGET = "frame_budget"
+TIME_BUDGET = "time_budget"
+
+
+@dataclass
+class EarlyStop:
+    """提前停止的容差与预算，帧数均指被分析的帧；converge 为 False 时只按预算停止。"""
+
+    converge: bool = True
+    speed_rtol: float = 0.05
+    class_atol: float = 0.05
+    z: float = 1.96  # 95% 置信度
+    min_frames: int = 60
+    min_tracks: int = 20
+    check_every: int = 10
+    max_frames: Optional[int] = None
+    max_seconds: Optional[float] = None
+
+
+class ConvergenceMonitor:
+    """累积速度矩与类别计数，判断是否可以停止分析。"""
+
+    def __init__(self, config: EarlyStop) -> None:
+        self.config = config
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.class_counts = np.zeros(0, dtype=np.int64)
+        self.frames = 0
+        self.started = time.perf_counter()
+
+    def add_speeds(self, values: np.ndarray) -> None:
+        """并入一批速度样本 (Chan 等人的并行方差合并)。"""
+        n = len(values)
+        if not n:
+            return
+        batch_mean = float(values.mean())
+        batch_m2 = float(((values - batch_mean) ** 2).sum())
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += batch_m2 + delta * delta * self.count * n / total
+        self.count = total
+
+    def add_tracks(self, class_ids: np.ndarray) -> None:
+        """新建轨迹的类别计入类别比例。"""
+        if not len(class_ids):
+            return
+        counts = np.bincount(class_ids, minlength=len(self.class_counts))
+        if len(counts) > len(self.class_counts):
+            self.class_counts = np.pad(self.class_counts, (0, len(counts) - len(self.class_counts)))
+        self.class_counts += counts
+
+    def speed_rel_ci(self) -> float:
+        """平均速度置信区间半宽相对均值的比例；样本不足时为 inf。"""
+        if self.count < 2:
+            return math.inf
+        half = self.config.z * math.sqrt(self.m2 / (self.count - 1) / self.count)
+        if half == 0:
+            return 0.0
+        return half / abs(self.mean) if self.mean else math.inf
+
+    def class_ci(self) -> float:
+        """各类别比例 Wilson 置信区间半宽的最大值；没有轨迹时为 inf。"""
+        n = int(self.class_counts.sum())
+        if not n:
+            return math.inf
+        z2 = self.config.z ** 2
+        p = self.class_counts / n
+        half = self.config.z * np.sqrt(p * (1 - p) / n + z2 / (4 * n * n)) / (1 + z2 / n)
+        return float(half.max())
+
+    def step(self) -> Optional[str]:
+        """每分析完一帧调用一次，返回停止原因或 None。"""
+        self.frames += 1
+        cfg = self.config
+        if cfg.max_frames is not None and self.frames >= cfg.max_frames:
+            return FRAME_BUDGET
+        if cfg.max_seconds is not None and time.perf_counter() - self.started >= cfg.max_seconds:
+            return TIME_BUDGET
+        if not cfg.converge or self.frames < cfg.min_frames or self.frames % max(1, cfg.check_every):
+            return None
+        if int(self.class_counts.sum()) < cfg.min_tracks:
+            return None
+        if self.speed_rel_ci() <= cfg.speed_rtol and self.class_ci() <= cfg.class_atol:
+            return CONVERGED
+        return None
+
+    def report(self) -> Dict[str, float]:
+        speed_ci = self.speed_rel_ci()
+        class_ci = self.class_ci()
+        return {
+            "elapsed_s": round(time.perf_counter() - self.started, 3),
+            "speed_mean_rel_ci": speed_ci if math.isfinite(speed_ci) else None,
+            "class_ratio_ci": class_ci if math.isfinite(class_ci) else None,
+        }
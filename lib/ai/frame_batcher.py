@@ -0,0 +1,179 @@
+"""
+跨视频的动态帧批处理。
+
+多个视频同时分析时，每个视频逐帧调用模型都是 batch=1，单次前向的固定开销无法摊薄。
+FrameBatcher 在 DetectMultiBackend 前面排队：收集来自所有活跃视频的已 letterbox 帧，
+凑满 max_batch_size 或等待超过 max_wait_ms 后执行一次前向与一次整批的 batched_non_max_suppression，
+再把每帧的检测结果交还给对应视频的跟踪器。
+
+同一批内的帧必须形状一致，因此使用批处理时视频应按固定的 imgsz x imgsz 做 letterbox。
+"""
+
+from __future__ import annotations
+
+import bisect
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import torch
+
+from utils.general import batched_non_max_suppression
+
+# 延迟直方图的桶上界（毫秒），最后一个桶收纳所有更大的值
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+@dataclass
+class _FrameRequest:
+    image: torch.Tensor
+    classes: Optional[Tuple[int, ...]]
+    future: Future
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class BatchStats:
+    """记录批大小与单帧延迟（入队到拿到检测结果）的直方图。"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.batch_sizes: Dict[int, int] = {}
+        self.latency_counts: List[int] = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.frames = 0
+        self.batches = 0
+
+    def record(self, batch_size: int, latencies_ms: List[float]) -> None:
+        with self._lock:
+            self.batches += 1
+            self.frames += batch_size
+            self.batch_sizes[batch_size] = self.batch_sizes.get(batch_size, 0) + 1
+            for value in latencies_ms:
+                self.latency_counts[bisect.bisect_left(LATENCY_BUCKETS_MS, value)] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            labels = [f"<={b}ms" for b in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+            return {
+                "frames": self.frames,
+                "batches": self.batches,
+                "mean_batch_size": self.frames / self.batches if self.batches else 0.0,
+                "batch_size_histogram": dict(sorted(self.batch_sizes.items())),
+                "latency_histogram_ms": dict(zip(labels, self.latency_counts)),
+            }
+
+
+class FrameBatcher:
+    """
+    在单个模型前合并来自多个线程的推理请求。
+
+    infer() 可被任意线程并发调用并阻塞到该帧结果就绪；真正的前向只在后台线程中执行，
+    因此模型本身无需额外加锁。close() 之前提交的帧都会得到结果，之后的 infer() 抛出 RuntimeError。
+    """
+
+    def __init__(
+        self,
+        model,
+        conf_thres: float,
+        iou_thres: float,
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+    ) -> None:
+        self.model = model
+        self.conf_thres = conf_thres
+        self.iou_thres = iou_thres
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_ms = max(0.0, max_wait_ms)
+        self.stats = BatchStats()
+        self._queue: "queue.Queue[Optional[_FrameRequest]]" = queue.Queue()
+        self._closed = False
+        self._close_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._loop, name="frame-batcher", daemon=True)
+        self._thread.start()
+
+    def infer(self, image: torch.Tensor, classes: Optional[List[int]] = None) -> torch.Tensor:
+        """
+        提交一帧 (1, 3, H, W) 归一化输入，返回该帧 NMS 后的 (n, 6) 检测张量。
+        """
+        request = _FrameRequest(
+            image=image,
+            classes=tuple(classes) if classes is not None else None,
+            future=Future(),
+        )
+        with self._close_lock:
+            if self._closed:
+                raise RuntimeError("FrameBatcher 已关闭")
+            self._queue.put(request)
+        return request.future.result()
+
+    def close(self) -> None:
+        """处理完已提交的帧后停止后台线程；可重复调用。"""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            # 关闭标志与结束标记在同一把锁下设置，结束标记之后不会再有请求入队
+            self._queue.put(None)
+        self._thread.join()
+        # 后台线程异常退出时，剩余请求不会再被处理，直接失败而不是让调用方永久阻塞
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if request is not None:
+                request.future.set_exception(RuntimeError("FrameBatcher 已关闭"))
+
+    def _collect(self, first: _FrameRequest) -> Tuple[List[_FrameRequest], bool]:
+        batch = [first]
+        deadline = first.enqueued_at + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _loop(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch, stop = self._collect(first)
+
+            # 形状或类别过滤不同的帧不能合并到同一次前向 / NMS
+            groups: Dict[tuple, List[_FrameRequest]] = {}
+            for request in batch:
+                groups.setdefault((tuple(request.image.shape[1:]), request.classes), []).append(request)
+            for (_, classes), group in groups.items():
+                self._run(group, classes)
+
+            if stop:
+                return
+
+    def _run(self, group: List[_FrameRequest], classes: Optional[Tuple[int, ...]]) -> None:
+        try:
+            with torch.inference_mode():  # 后台线程，推理模式按线程生效
+                images = torch.cat([r.image for r in group], 0)
+                pred = self.model(images, augment=False, visualize=False)
+                dets = batched_non_max_suppression(
+                    pred,
+                    self.conf_thres,
+                    self.iou_thres,
+                    classes=list(classes) if classes is not None else None,
+                )
+        except Exception as exc:
+            for request in group:
+                request.future.set_exception(exc)
+            return
+
+        done = time.perf_counter()
+        for request, det in zip(group, dets):
+            request.future.set_result(det)
+        self.stats.record(len(group), [(done - r.enqueued_at) * 1000.0 for r in group])
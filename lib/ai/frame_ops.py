@@ -0,0 +1,46 @@
+"""
+各模块共用的帧级图像常量与灰度缩略图。
+
+StaticFrameGate、KeyframePropagator 与 MotionProposer 都在下采样的灰度图上工作：
+缩略图宽度固定，高度按首帧长宽比确定，缓冲区在首帧时按尺寸分配，之后每帧原地写入。
+"""
+
+from __future__ import annotations
+
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+# letterbox 与窗口裁剪的填充灰度，与 utils.augmentations.letterbox 的默认值一致
+PAD_COLOR = 114
+
+
+class GrayThumbnail:
+    """
+    固定宽度的灰度缩略图。
+
+    allocate 之后 size 为 cv2 约定的 (宽, 高)，shape 为数组的 (高, 宽)，scale 为原图到缩略图的缩放比例；
+    update 把 BGR 帧缩小并转为灰度写入 dst，不分配内存。
+    """
+
+    def __init__(self, width: int) -> None:
+        self.width = width
+        self.size: Optional[Tuple[int, int]] = None
+        self.shape: Optional[Tuple[int, int]] = None
+        self.scale = 1.0
+
+    def allocate(self, shape: Tuple[int, int]) -> None:
+        h, w = shape
+        self.size = (self.width, max(1, round(self.width * h / w)))
+        self.shape = (self.size[1], self.size[0])
+        self.scale = self.width / w
+        self._small = np.empty(self.shape + (3,), dtype=np.uint8)
+
+    def empty(self, dtype=np.uint8) -> np.ndarray:
+        """与缩略图同尺寸的未初始化缓冲。"""
+        return np.empty(self.shape, dtype=dtype)
+
+    def update(self, frame: np.ndarray, dst: np.ndarray) -> None:
+        cv2.resize(frame, self.size, dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=dst)
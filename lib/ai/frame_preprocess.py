@@ -0,0 +1,173 @@
+"""
+视频帧的预分配预处理。
+
+逐帧模式下每一帧都会分配：解码出的新图像、letterbox 的缩放图与 copyMakeBorder 的填充图、
+BGR->RGB / HWC->CHW 的连续副本，以及 float 转换与 /255 的输入张量。同一视频的帧尺寸不变，
+letterbox 的几何参数只需计算一次，因此 VideoPreprocessor 在首帧时按尺寸分配全部缓冲区：
+- 解码帧 (B, h, w, 3) uint8：cap.read 直接写入；
+- 缩放图与填充画布：画布边框只填充一次，每帧只覆盖中间的图像区域；
+- uint8 暂存 (B, 3, H, W)：CUDA 上为锁页内存，作为 H2D 拷贝源；
+- float 输入张量 (B, 3, H, W)：位于推理设备，原地 copy_ 与 mul_ 完成类型转换与归一化。
+通道顺序与是否除以 255 遵循模型的输入约定 (models.common.InputFormat)：若模型已把两者
+折叠进首层卷积，暂存区保持 BGR，输入张量只做类型转换。
+预热之后每帧不再有堆分配 (可用 benchmarks.py preprocess 验证)。
+
+StaticFrameGate 在推理前用下采样的帧差判断画面是否静止 (载物台暂停、录屏重复帧)，
+静止帧可跳过推理。
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+import torch
+
+from frame_ops import PAD_COLOR, GrayThumbnail
+from models.common import InputFormat
+
+
+@dataclass(frozen=True)
+class LetterboxGeometry:
+    """与 utils.augmentations.letterbox 完全一致的缩放与填充参数。"""
+
+    resized: Tuple[int, int]  # (w, h)，缩放后的图像尺寸
+    padded: Tuple[int, int]  # (h, w)，填充后的网络输入尺寸
+    top: int
+    left: int
+
+    @classmethod
+    def compute(cls, shape: Tuple[int, int], imgsz: int, stride: int, auto: bool) -> "LetterboxGeometry":
+        h, w = shape
+        r = min(imgsz / h, imgsz / w)
+        new_unpad = int(round(w * r)), int(round(h * r))
+        dw, dh = imgsz - new_unpad[0], imgsz - new_unpad[1]
+        if auto:  # minimum rectangle
+            dw, dh = np.mod(dw, stride), np.mod(dh, stride)
+        dw /= 2
+        dh /= 2
+        top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+        left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+        padded = (new_unpad[1] + top + bottom, new_unpad[0] + left + right)
+        return cls(resized=new_unpad, padded=padded, top=top, left=left)
+
+
+class VideoPreprocessor:
+    """
+    按固定帧尺寸预分配的预处理器，最多同时容纳 batch_size 帧。
+
+    用法：read(cap, slot) 把下一帧解码到第 slot 个帧缓冲，load(slot) 把它 letterbox 到暂存区，
+    攒够后 tensor(n) 返回前 n 帧归一化后的输入张量。返回的数组与张量在下一轮会被覆盖。
+    """
+
+    def __init__(
+        self,
+        frame_shape: Tuple[int, int],
+        imgsz: int,
+        stride: int,
+        auto: bool,
+        device: torch.device,
+        batch_size: int = 1,
+        input_format: InputFormat = InputFormat("RGB", True),
+    ) -> None:
+        self.geometry = LetterboxGeometry.compute(frame_shape, imgsz, stride, auto)
+        h, w = frame_shape
+        ph, pw = self.geometry.padded
+        rw, rh = self.geometry.resized
+        self.batch_size = max(1, batch_size)
+        self.frames = np.empty((self.batch_size, h, w, 3), dtype=np.uint8)
+        self._resize = (rw, rh) != (w, h)
+        self._resized = np.empty((rh, rw, 3), dtype=np.uint8)
+        self._canvas = np.full((ph, pw, 3), PAD_COLOR, dtype=np.uint8)
+        top, left = self.geometry.top, self.geometry.left
+        self._roi = self._canvas[top : top + rh, left : left + rw]
+        self._chw = self._canvas.transpose(2, 0, 1)  # HWC to CHW (视图)
+        if input_format.channels == "RGB":
+            self._chw = self._chw[::-1]  # BGR to RGB
+        self._normalize = input_format.normalized
+
+        self._non_blocking = device.type == "cuda"
+        self._staging = torch.empty((self.batch_size, 3, ph, pw), dtype=torch.uint8, pin_memory=self._non_blocking)
+        self._staging_np = self._staging.numpy()
+        self._input = torch.empty((self.batch_size, 3, ph, pw), dtype=torch.float32, device=device)
+
+    @property
+    def input_shape(self) -> torch.Size:
+        """网络输入的 (H, W)，用于 scale_coords。"""
+        return self._input.shape[2:]
+
+    def read(self, cap: cv2.VideoCapture, slot: int) -> Optional[np.ndarray]:
+        """解码下一帧到第 slot 个帧缓冲并返回它；视频结束时返回 None。"""
+        frame = self.frames[slot]
+        ok, decoded = cap.read(frame)
+        if not ok:
+            return None
+        if decoded is not frame and not np.shares_memory(decoded, frame):
+            # OpenCV 因尺寸不符重新分配了图像
+            raise ValueError(f"视频帧尺寸 {decoded.shape} 与首帧 {frame.shape} 不一致")
+        return frame
+
+    def load(self, slot: int, frame: Optional[np.ndarray] = None) -> None:
+        """把第 slot 帧 (或给定的 frame) letterbox 到暂存区的第 slot 个位置。"""
+        src = self.frames[slot] if frame is None else frame
+        if self._resize:
+            cv2.resize(src, self.geometry.resized, dst=self._resized, interpolation=cv2.INTER_LINEAR)
+            np.copyto(self._roi, self._resized)
+        else:
+            np.copyto(self._roi, src)
+        np.copyto(self._staging_np[slot], self._chw)
+
+    def tensor(self, n: int) -> torch.Tensor:
+        """前 n 帧的 float32 输入张量 (模型要求归一化时已除以 255)。"""
+        images = self._input[:n]
+        images.copy_(self._staging[:n], non_blocking=self._non_blocking)
+        if self._normalize:
+            images.mul_(1.0 / 255.0)
+        return images
+
+
+class StaticFrameGate:
+    """
+    静止帧门控：把帧缩小为灰度缩略图，与上一次推理的帧比较平均绝对差。
+
+    差值低于 threshold (0-255 灰度) 时判定为静止帧，可沿用上一次的检测结果、跳过推理；
+    否则以该帧作为新的参考帧。缩略图缓冲按首帧尺寸预分配，判定本身不分配内存。
+    """
+
+    def __init__(self, threshold: float, width: int = 64) -> None:
+        self.threshold = threshold
+        self.width = width
+        self.checked = 0
+        self.skipped = 0
+        self._thumb = GrayThumbnail(width)
+
+    def _allocate(self, shape: Tuple[int, int]) -> None:
+        self._thumb.allocate(shape)
+        self._gray = self._thumb.empty()
+        self._reference = self._thumb.empty()
+        self._diff = self._thumb.empty()
+        self._has_reference = False
+
+    def is_static(self, frame: np.ndarray) -> bool:
+        """判定 frame 是否与参考帧几乎相同；非静止帧成为新的参考帧。"""
+        if self._thumb.size is None:
+            self._allocate(frame.shape[:2])
+        self.checked += 1
+        self._thumb.update(frame, self._gray)
+        if self._has_reference:
+            cv2.absdiff(self._gray, self._reference, dst=self._diff)
+            if cv2.mean(self._diff)[0] < self.threshold:
+                self.skipped += 1
+                return True
+        np.copyto(self._reference, self._gray)
+        self._has_reference = True
+        return False
+
+    def report(self) -> dict:
+        return {
+            "threshold": self.threshold,
+            "frames_checked": self.checked,
+            "inferences_saved": self.skipped,
+        }
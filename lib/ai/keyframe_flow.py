@@ -0,0 +1,148 @@
+"""
+关键帧检测 + 光流传播。
+
+精子在相邻帧之间位移很小，没有必要每帧都跑完整的检测网络。KeyframePropagator 只在关键帧上
+使用检测结果，两个关键帧之间用金字塔 Lucas-Kanade 稀疏光流 (cv2.calcOpticalFlowPyrLK)
+在下采样的灰度图上把上一帧的检测中心推到当前帧，交给跟踪器代替检测。
+
+关键帧间隔 K 在 [1, max_interval] 内自适应 (加性增、乘性减)：
+- 每个点做前向-后向光流校验，跟踪失败或往返误差超过 max_error 的点视为丢失并丢弃；
+- 自上个关键帧以来累计的丢失比例超过 max_lost 时，下一帧强制为关键帧；
+- 关键帧上比较传播得到的中心与新检测中心的偏差 (drift)：偏差超过 max_error 或丢失过多时
+  K 减半，偏差小于其一半时 K 加一。
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from frame_ops import GrayThumbnail
+
+_LK_PARAMS = dict(
+    winSize=(15, 15),
+    maxLevel=2,
+    criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03),
+)
+
+
+class KeyframePropagator:
+    """
+    决定哪些帧需要检测，并在关键帧之间用光流传播检测中心。
+
+    用法：due() 为 True 时对该帧推理并以 keyframe(frame, centers, classes) 登记检测结果，
+    否则 propagate(frame) 返回传播后的 (centers, classes)。中心均为原图像素坐标。
+    """
+
+    def __init__(
+        self,
+        max_interval: int,
+        width: int = 320,
+        max_error: float = 2.0,
+        max_lost: float = 0.2,
+    ) -> None:
+        self.max_interval = max(1, max_interval)
+        self.interval = self.max_interval
+        self.width = width
+        self.max_error = max_error  # 原图像素
+        self.max_lost = max_lost
+        self.keyframes = 0
+        self.propagated = 0
+        self.forced = 0
+        self._since_key = 0
+        self._force = True
+        self._fb_sum = 0.0
+        self._fb_count = 0
+        self._drift_sum = 0.0
+        self._drift_count = 0
+        self._thumb = GrayThumbnail(width)
+        self._centers = np.empty((0, 2), dtype=np.float32)
+        self._classes = np.empty(0, dtype=np.int64)
+        self._tracked = 0  # 上个关键帧登记的点数，用于计算丢失比例
+
+    def _allocate(self, shape: Tuple[int, int]) -> None:
+        self._thumb.allocate(shape)
+        self._prev = self._thumb.empty()
+        self._gray = self._thumb.empty()
+
+    def _gray_into(self, frame: np.ndarray, name: str) -> None:
+        """把 frame 的灰度缩略图写入缓冲 name；首帧时先按尺寸分配全部缓冲。"""
+        if self._thumb.size is None:
+            self._allocate(frame.shape[:2])
+        self._thumb.update(frame, getattr(self, name))
+
+    def due(self) -> bool:
+        """下一帧是否需要检测。"""
+        return self._force or self._since_key >= self.interval
+
+    def keyframe(self, frame: np.ndarray, centers: np.ndarray, classes: np.ndarray) -> None:
+        """登记关键帧的检测中心与类别，并按传播偏差调整关键帧间隔。"""
+        centers = np.asarray(centers, dtype=np.float32).reshape(-1, 2)
+        if self.keyframes and self._since_key:
+            drift = self._drift(self._centers, centers)
+            lost = 1.0 - len(self._centers) / self._tracked if self._tracked else 0.0
+            if drift is not None:
+                self._drift_sum += drift
+                self._drift_count += 1
+            if (drift is not None and drift > self.max_error) or lost > self.max_lost:
+                self.interval = max(1, self.interval // 2)
+            elif drift is not None and drift < self.max_error / 2:
+                self.interval = min(self.max_interval, self.interval + 1)
+        self._gray_into(frame, "_prev")
+        self._centers = centers
+        self._classes = np.asarray(classes, dtype=np.int64)
+        self._tracked = len(centers)
+        self.keyframes += 1
+        self._since_key = 0
+        self._force = False
+
+    def skip(self) -> None:
+        """该帧未处理 (如静止帧)：不传播，但计入关键帧间隔。"""
+        self._since_key += 1
+
+    def propagate(self, frame: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """把上一帧的中心用光流推到 frame，返回保留下来的 (centers, classes)。"""
+        self._gray_into(frame, "_gray")
+        self.propagated += 1
+        self._since_key += 1
+        if len(self._centers):
+            p0 = (self._centers * self._thumb.scale).reshape(-1, 1, 2)
+            p1, status, _ = cv2.calcOpticalFlowPyrLK(self._prev, self._gray, p0, None, **_LK_PARAMS)
+            back, back_status, _ = cv2.calcOpticalFlowPyrLK(self._gray, self._prev, p1, None, **_LK_PARAMS)
+            fb_error = np.linalg.norm((back - p0).reshape(-1, 2), axis=1) / self._thumb.scale
+            ok = (status.ravel() == 1) & (back_status.ravel() == 1) & (fb_error <= self.max_error)
+            if ok.any():
+                self._fb_sum += float(fb_error[ok].sum())
+                self._fb_count += int(ok.sum())
+            self._centers = np.ascontiguousarray(p1.reshape(-1, 2)[ok] / self._thumb.scale)
+            self._classes = self._classes[ok]
+            if self._tracked and 1.0 - len(self._centers) / self._tracked > self.max_lost:
+                self._force = True
+                self.forced += 1
+        # 交换前后帧缓冲，避免复制
+        self._prev, self._gray = self._gray, self._prev
+        return self._centers, self._classes
+
+    @staticmethod
+    def _drift(propagated: np.ndarray, detected: np.ndarray) -> Optional[float]:
+        """传播中心到最近检测中心距离的中位数；任一为空时返回 None。"""
+        if not len(propagated) or not len(detected):
+            return None
+        diff = propagated[:, None, :].astype(np.float64) - detected[None, :, :]
+        nearest = np.hypot(diff[..., 0], diff[..., 1]).min(axis=1)
+        return float(np.median(nearest))
+
+    def report(self) -> Dict[str, Optional[float]]:
+        frames = self.keyframes + self.propagated
+        return {
+            "max_interval": self.max_interval,
+            "final_interval": self.interval,
+            "keyframes": self.keyframes,
+            "propagated_frames": self.propagated,
+            "forced_keyframes": self.forced,
+            "keyframe_ratio": self.keyframes / frames if frames else None,
+            "mean_fb_error_px": self._fb_sum / self._fb_count if self._fb_count else None,
+            "mean_keyframe_drift_px": self._drift_sum / self._drift_count if self._drift_count else None,
+        }
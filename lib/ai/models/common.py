@@ -27,6 +27,10 @@ from utils.general import (LOGGER, check_requirements, check_suffix, check_versi
 from utils.plots import Annotator, colors, save_one_box
 from utils.torch_utils import copy_attr, time_sync
 
+# Input contract of DetectMultiBackend: channel order of the BCHW input ('RGB' or 'BGR') and whether pixel values
+# are expected pre-scaled to 0-1 (True) or as raw 0-255 values, uint8 accepted (False)
+InputFormat = namedtuple('InputFormat', ('channels', 'normalized'))
+
 
 def autopad(k, p=None):  # kernel, padding
     # Pad to 'same'
@@ -277,7 +281,7 @@ class Concat(nn.Module):
 
 class DetectMultiBackend(nn.Module):
     # YOLOv5 MultiBackend class for python inference on various backends
-    def __init__(self, weights='yolov5s.pt', device=None, dnn=False, data=None):
+    def __init__(self, weights='yolov5s.pt', device=None, dnn=False, data=None, fold_input=False, candidate_conf=None):
         # Usage:
         #   PyTorch:      weights = *.pt
         #   TorchScript:            *.torchscript
@@ -389,10 +393,48 @@ class DetectMultiBackend(nn.Module):
                 input_details = interpreter.get_input_details()  # inputs
                 output_details = interpreter.get_output_details()  # outputs
         self.__dict__.update(locals())  # assign all variables to self
+        self.input_format = InputFormat('RGB', True)
+        if fold_input:
+            if pt:
+                self.fold_input_transform()
+            else:
+                LOGGER.warning(f'WARNING: fold_input is only supported for PyTorch models, ignoring for {w}')
+        self.candidate_conf = None
+        if candidate_conf is not None:
+            if pt:
+                self.set_candidate_conf(candidate_conf)
+            else:
+                LOGGER.warning(f'WARNING: candidate_conf is only supported for PyTorch models, ignoring for {w}')
+
+    def set_candidate_conf(self, conf_thres):
+        # Make the Detect head threshold the objectness logit before decoding and return compact Candidates rows,
+        # which non_max_suppression() accepts directly; use a conf_thres <= the NMS conf_thres. None disables it
+        detect = self.model.model[-1] if hasattr(self.model, 'model') else None
+        if not hasattr(detect, 'conf_thres'):
+            raise ValueError('candidate_conf requires a model ending in a Detect layer')
+        detect.conf_thres = conf_thres
+        self.candidate_conf = conf_thres
+
+    def fold_input_transform(self):
+        # Fold the 0-255 -> 0-1 scaling and the BGR -> RGB channel swap into the first convolution's weights, so the
+        # model takes raw BGR pixels: conv(flip(x) / 255) == conv'(x) with W' = flip(W, in-channels) / 255
+        if self.input_format != InputFormat('RGB', True):
+            return
+        first = self.model.model[0] if hasattr(self.model, 'model') else None
+        conv = next((m for m in first.modules() if isinstance(m, nn.Conv2d)), None) if first is not None else None
+        if conv is None or conv.groups != 1 or conv.in_channels % 3:
+            raise ValueError('fold_input requires a first layer convolving RGB channel groups (Conv or Focus)')
+        with torch.no_grad():
+            w = conv.weight  # (c2, c1, k, k), c1 = 3 (Conv) or 4 slices x 3 (Focus)
+            folded = w.view(w.shape[0], -1, 3, *w.shape[2:]).flip(2).reshape(w.shape) / 255
+            w.copy_(folded)
+        self.input_format = InputFormat('BGR', False)
 
     def forward(self, im, augment=False, visualize=False, val=False):
         # YOLOv5 MultiBackend inference
         b, ch, h, w = im.shape  # batch, channel, height, width
+        if not self.input_format.normalized and im.dtype == torch.uint8:
+            im = im.float()  # raw 0-255 pixels, scaling is folded into the first convolution
         if self.pt or self.jit:  # PyTorch
             y = self.model(im) if self.jit else self.model(im, augment=augment, visualize=visualize)
             return y if val else y[0]
@@ -7,6 +7,7 @@ Usage:
 """
 
 import argparse
+import math
 import sys
 from copy import deepcopy
 from pathlib import Path
@@ -20,7 +21,7 @@ if str(ROOT) not in sys.path:
 from models.common import *
 from models.experimental import *
 from utils.autoanchor import check_anchor_order
-from utils.general import LOGGER, check_version, check_yaml, make_divisible, print_args
+from utils.general import LOGGER, Candidates, check_version, check_yaml, make_divisible, print_args
 from utils.plots import feature_visualization
 from utils.torch_utils import fuse_conv_and_bn, initialize_weights, model_info, scale_img, select_device, time_sync
 
@@ -33,6 +34,7 @@ except ImportError:
 class Detect(nn.Module):
     stride = None  # strides computed during build
     onnx_dynamic = False  # ONNX export parameter
+    conf_thres = None  # inference-only objectness pre-filter, returns compact Candidates (see candidates())
 
     def __init__(self, nc=80, anchors=(), ch=(), inplace=True):  # detection layer
         super().__init__()
@@ -48,6 +50,8 @@ class Detect(nn.Module):
 
     def forward(self, x):
         z = []  # inference output
+        if not self.training and self.conf_thres is not None:
+            return self.candidates(x), x
         for i in range(self.nl):
             x[i] = self.m[i](x[i])  # conv
             bs, _, ny, nx = x[i].shape  # x(bs,255,20,20) to x(bs,3,20,20,85)
@@ -69,6 +73,27 @@ class Detect(nn.Module):
 
         return x if self.training else (torch.cat(z, 1), x)
 
+    def candidates(self, x):
+        # Inference fast path: non_max_suppression drops every anchor with obj_conf <= conf_thres, so compare the raw
+        # objectness logit against logit(conf_thres) first and only apply sigmoid + grid/anchor decode to survivors
+        c = self.conf_thres
+        logit = math.log(c / (1 - c)) if 0 < c < 1 else (-math.inf if c <= 0 else math.inf)
+        rows, images = [], []
+        for i in range(self.nl):
+            x[i] = self.m[i](x[i])  # conv
+            bs, _, ny, nx = x[i].shape  # x(bs,255,20,20) to x(bs,3,20,20,85)
+            x[i] = x[i].view(bs, self.na, self.no, ny, nx).permute(0, 1, 3, 4, 2).contiguous()
+            if self.onnx_dynamic or self.grid[i].shape[2:4] != x[i].shape[2:4]:
+                self.grid[i], self.anchor_grid[i] = self._make_grid(nx, ny, i)
+
+            b, a, gy, gx = (x[i][..., 4] > logit).nonzero(as_tuple=True)  # ordered like the dense output
+            y = x[i][b, a, gy, gx].sigmoid()  # (k, no)
+            y[:, 0:2] = (y[:, 0:2] * 2 - 0.5 + self.grid[i][0, a, gy, gx]) * self.stride[i]  # xy
+            y[:, 2:4] = (y[:, 2:4] * 2) ** 2 * self.anchor_grid[i][0, a, gy, gx]  # wh
+            rows.append(y)
+            images.append(b)
+        return Candidates(torch.cat(rows), torch.cat(images), x[0].shape[0])
+
     def _make_grid(self, nx=20, ny=20, i=0):
         d = self.anchors[i].device
         if check_version(torch.__version__, '1.10.0'):  # torch>=1.10.0 meshgrid workaround for torch>=0.7 compatibility
@@ -0,0 +1,116 @@
+"""
+运动区域提议：只对画面中有运动 (或已有轨迹) 的窗口做推理。
+
+很多显微视频里精子只占视野的一部分，整帧 letterbox 到 640 推理会把大部分算力花在空白背景上。
+MotionProposer 在下采样的灰度图上维护滑动平均背景 (cv2.accumulateWeighted)，
+与背景差超过 diff_thres 的像素构成运动掩码；现存轨迹的位置同样加入掩码，
+使停止运动的精子仍被检测。掩码膨胀 margin 后，与之相交的 tiling.grid_windows 窗口即为提议。
+
+以下情况回退为整帧推理 (propose 返回 None)：
+- 背景尚未稳定 (前 warmup 帧)；
+- 每 full_every 帧一次，用于发现从未运动过的目标；
+- 提议窗口的总面积超过整帧面积的 max_area，裁剪推理不再划算。
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from frame_ops import GrayThumbnail
+from tiling import grid_windows
+
+
+class MotionProposer:
+    """基于背景差分的推理窗口提议。窗口尺寸与重叠均为原图像素。"""
+
+    def __init__(
+        self,
+        tile: int,
+        overlap: int,
+        width: int = 320,
+        diff_thres: float = 12.0,
+        margin: int = 32,
+        alpha: float = 0.05,
+        warmup: int = 10,
+        full_every: int = 30,
+        max_area: float = 0.5,
+    ) -> None:
+        self.tile = tile
+        self.overlap = overlap
+        self.width = width
+        self.diff_thres = diff_thres
+        self.margin = margin
+        self.alpha = alpha
+        self.warmup = warmup
+        self.full_every = full_every
+        self.max_area = max_area
+        self.frames = 0
+        self.roi_frames = 0
+        self.tiles = 0
+        self._thumb = GrayThumbnail(width)
+
+    def _allocate(self, shape: Tuple[int, int]) -> None:
+        h, w = shape
+        self._thumb.allocate(shape)
+        self._gray = self._thumb.empty()
+        self._background = self._thumb.empty(np.float32)
+        self._background8 = self._thumb.empty()
+        self._mask = self._thumb.empty()
+        radius = max(1, round(self.margin * self._thumb.scale))
+        self._kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (2 * radius + 1, 2 * radius + 1))
+        self.windows = grid_windows(shape, self.tile, self.overlap)
+        # 各窗口在缩略图上的范围
+        self._thumb_windows = np.concatenate(
+            [np.floor(self.windows * self._thumb.scale), np.ceil((self.windows + self.tile) * self._thumb.scale)], axis=1
+        ).astype(np.int64)
+        self._frame_area = h * w
+
+    def propose(self, frame: np.ndarray, points: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        """
+        更新背景并返回需要推理的窗口 (k, 2)；应整帧推理时返回 None。
+
+        points 为需要保持覆盖的原图坐标 (如现存轨迹中心)。
+        """
+        if self._thumb.size is None:
+            self._allocate(frame.shape[:2])
+        self._thumb.update(frame, self._gray)
+        self.frames += 1
+        if self.frames == 1:
+            self._background[:] = self._gray
+            return None
+
+        self._background8[:] = self._background
+        cv2.absdiff(self._gray, self._background8, dst=self._mask)
+        cv2.accumulateWeighted(self._gray, self._background, self.alpha)
+        if self.frames <= self.warmup or (self.full_every and self.frames % self.full_every == 0):
+            return None
+
+        cv2.threshold(self._mask, self.diff_thres, 1, cv2.THRESH_BINARY, dst=self._mask)
+        if points is not None and len(points):
+            thumb = np.clip(np.round(points * self._thumb.scale).astype(np.int64), 0, [self._thumb.size[0] - 1, self._thumb.size[1] - 1])
+            self._mask[thumb[:, 1], thumb[:, 0]] = 1
+        cv2.dilate(self._mask, self._kernel, dst=self._mask)
+
+        integral = cv2.integral(self._mask)
+        x0, y0, x1, y1 = self._thumb_windows.T
+        x1 = np.minimum(x1, self._thumb.size[0])
+        y1 = np.minimum(y1, self._thumb.size[1])
+        active = (integral[y1, x1] - integral[y0, x1] - integral[y1, x0] + integral[y0, x0]) > 0
+        windows = self.windows[active]
+        if len(windows) * self.tile * self.tile > self.max_area * self._frame_area:
+            return None
+        self.roi_frames += 1
+        self.tiles += len(windows)
+        return windows
+
+    def report(self) -> Dict[str, Optional[float]]:
+        return {
+            "frames": self.frames,
+            "roi_frames": self.roi_frames,
+            "full_frames": self.frames - self.roi_frames,
+            "mean_tiles": self.tiles / self.roi_frames if self.roi_frames else None,
+            "grid_tiles": len(self.windows) if self._thumb.size is not None else None,
+        }
@@ -0,0 +1,83 @@
+"""
+按内容寻址的速度分析结果缓存。
+
+同一视频被重复上传 (重试、分享、对战) 时无需重新推理：以视频字节哈希与影响结果的
+分析参数组成键，把 SpeedAnalyzer.run 的结果字典存为磁盘上的 JSON 文件。
+文件的 mtime 记录最近访问时间，总大小超过上限时按 LRU 淘汰最久未用的条目。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+_CHUNK_SIZE = 1 << 20
+
+
+def file_digest(path: Path | str) -> str:
+    """返回文件内容的 sha256 十六进制摘要。"""
+    h = hashlib.sha256()
+    with Path(path).open("rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ResultCache:
+    """
+    有容量上限的磁盘 LRU 缓存，键为任意字符串 (通常是哈希)，值为可 JSON 序列化的字典。
+    """
+
+    def __init__(self, root: Path | str, max_bytes: int = 512 * 1024 * 1024) -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.json"
+
+    def get(self, key: str) -> Optional[dict]:
+        path = self._path(key)
+        try:
+            payload = json.loads(path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        try:
+            os.utime(path)  # 标记为最近使用
+        except FileNotFoundError:
+            pass
+        return payload
+
+    def put(self, key: str, payload: dict) -> None:
+        path = self._path(key)
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)  # 原子替换，读者不会看到写了一半的文件
+        self._evict()
+
+    def discard(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+
+    def _evict(self) -> None:
+        with self._lock:
+            entries = []
+            total = 0
+            for path in self.root.glob("*.json"):
+                try:
+                    st = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+            if total <= self.max_bytes:
+                return
+            for _, size, path in sorted(entries):
+                path.unlink(missing_ok=True)
+                total -= size
+                if total <= self.max_bytes:
+                    break
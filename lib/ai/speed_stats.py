@@ -0,0 +1,178 @@
+"""
+流式速度统计：count / min / max / mean 在线更新，median / p90 / p99 由可合并的分位数草图估计。
+
+草图采用对数分桶 (DDSketch 思路)：正值 x 落入下标 ceil(log_gamma(x)) 的桶，
+gamma = (1 + a) / (1 - a)，桶代表值与桶内任意样本的相对误差不超过 a；
+小于 MIN_VALUE 的样本 (含 0，即静止) 计入单独的零桶。两个草图合并只需逐桶相加，
+因此每条轨迹的草图可以直接并入全局草图，无需保留或重新遍历原始样本。
+
+SpeedStatsTable 与 track_store.TrackTable 一样按列存储，每行对应一条轨迹 (或一个汇总)。
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Optional
+
+import numpy as np
+
+RELATIVE_ACCURACY = 0.01
+MIN_VALUE = 1e-3
+MAX_VALUE = 1e6
+QUANTILES = {"median": 0.5, "p90": 0.9, "p99": 0.99}
+
+_GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = np.log(_GAMMA)
+_KEY_OFFSET = int(np.ceil(np.log(MIN_VALUE) / _LOG_GAMMA)) - 1
+# 桶 0 为零桶，其余桶依次对应对数键
+N_BUCKETS = int(np.ceil(np.log(MAX_VALUE) / _LOG_GAMMA)) - _KEY_OFFSET + 1
+
+
+def bucket_index(values: np.ndarray) -> np.ndarray:
+    """样本所在桶的下标；超出 MAX_VALUE 的样本计入最后一个桶。"""
+    values = np.asarray(values, dtype=np.float64)
+    index = np.zeros(values.shape, dtype=np.int64)
+    positive = values >= MIN_VALUE
+    keys = np.ceil(np.log(values[positive]) / _LOG_GAMMA).astype(np.int64)
+    index[positive] = np.minimum(keys - _KEY_OFFSET, N_BUCKETS - 1)
+    return index
+
+
+def bucket_value(index: np.ndarray) -> np.ndarray:
+    """桶的代表值 (零桶为 0)。"""
+    index = np.asarray(index, dtype=np.int64)
+    keys = index + _KEY_OFFSET
+    values = 2.0 * np.power(_GAMMA, keys.astype(np.float64)) / (_GAMMA + 1.0)
+    return np.where(index == 0, 0.0, values)
+
+
+def grow_rows(array: np.ndarray, needed: int) -> np.ndarray:
+    """容量不足时按倍增扩容，返回可容纳 needed 行的数组 (保留已有数据)。"""
+    capacity = len(array)
+    if needed <= capacity:
+        return array
+    grown = np.empty((max(needed, capacity * 2, 16),) + array.shape[1:], dtype=array.dtype)
+    grown[:capacity] = array
+    return grown
+
+
+class SpeedStatsTable:
+    """
+    列式流式统计：每行一组 count / min / max / mean 与一行草图桶计数。
+
+    行号由调用方维护 (与 TrackTable 的行一一对应)，compact 与其同步压缩。
+    """
+
+    __slots__ = ("size", "count", "min", "max", "mean", "sketch")
+
+    _COLUMNS = ("count", "min", "max", "mean", "sketch")
+
+    def __init__(self, capacity: int = 64) -> None:
+        self.size = 0
+        self.count = np.empty(capacity, dtype=np.int64)
+        self.min = np.empty(capacity, dtype=np.float64)
+        self.max = np.empty(capacity, dtype=np.float64)
+        self.mean = np.empty(capacity, dtype=np.float64)
+        self.sketch = np.empty((capacity, N_BUCKETS), dtype=np.int32)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, n: int) -> None:
+        """追加 n 个空行。"""
+        if not n:
+            return
+        end = self.size + n
+        for name in self._COLUMNS:
+            setattr(self, name, grow_rows(getattr(self, name), end))
+        self.count[self.size : end] = 0
+        self.min[self.size : end] = np.inf
+        self.max[self.size : end] = -np.inf
+        self.mean[self.size : end] = 0.0
+        self.sketch[self.size : end] = 0
+        self.size = end
+
+    def update(self, rows: np.ndarray, values: np.ndarray) -> None:
+        """每行追加一个样本 (rows 不重复)，Welford 方式更新均值。"""
+        if not len(rows):
+            return
+        self.count[rows] += 1
+        self.min[rows] = np.minimum(self.min[rows], values)
+        self.max[rows] = np.maximum(self.max[rows], values)
+        self.mean[rows] += (values - self.mean[rows]) / self.count[rows]
+        self.sketch[rows, bucket_index(values)] += 1
+
+    def merge(self, row: int, other: "SpeedStatsTable", rows: np.ndarray) -> None:
+        """把 other 的若干行合并进本表第 row 行，不需要原始样本。"""
+        if not len(rows):
+            return
+        counts = other.count[rows]
+        total = int(self.count[row] + counts.sum())
+        if not total:
+            return
+        self.mean[row] = (self.mean[row] * self.count[row] + (other.mean[rows] * counts).sum()) / total
+        self.count[row] = total
+        self.min[row] = min(self.min[row], other.min[rows].min())
+        self.max[row] = max(self.max[row], other.max[rows].max())
+        self.sketch[row] += other.sketch[rows].sum(axis=0, dtype=np.int64).astype(np.int32)
+
+    def compact(self, keep: np.ndarray) -> None:
+        """只保留 keep 选中的行，顺序不变。"""
+        n = int(keep.sum())
+        for name in self._COLUMNS:
+            column = getattr(self, name)
+            column[:n] = column[: self.size][keep]
+        self.size = n
+
+    def quantiles(self, rows: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """
+        由草图估计各行的分位数 (与 np.percentile 默认的线性插值一致)；空行为 NaN。
+
+        位置 q * (count - 1) 落在两个秩之间时，在这两个秩的估计值之间线性插值；
+        秩 0 与秩 count - 1 分别取该行精确的 min 与 max，其余秩取所在桶的代表值并夹在 [min, max] 内。
+        """
+        if rows is None:
+            rows = np.arange(self.size)
+        sketch = self.sketch[rows]
+        count = self.count[rows]
+        empty = count == 0
+        # 空行的 min / max 为 ±inf，置 0 以免插值产生无效运算
+        lo_value, hi_value = np.where(empty, 0.0, self.min[rows]), np.where(empty, 0.0, self.max[rows])
+        cumulative = np.cumsum(sketch, axis=1, dtype=np.int64)
+
+        def ranked(rank: np.ndarray) -> np.ndarray:
+            index = np.argmax(cumulative > rank[:, None], axis=1)
+            value = np.clip(bucket_value(index), lo_value, hi_value)
+            value = np.where(rank <= 0, lo_value, value)
+            return np.where(rank >= count - 1, hi_value, value)
+
+        result = {}
+        for name, q in QUANTILES.items():
+            position = q * (count - 1)
+            lower = np.floor(position)
+            low, high = ranked(lower), ranked(np.ceil(position))
+            value = low + (position - lower) * (high - low)
+            result[name] = np.where(empty, np.nan, value)
+        return result
+
+    def summaries(self, rows: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """各行的 count / min / max / mean / median / p90 / p99 列。"""
+        if rows is None:
+            rows = np.arange(self.size)
+        return {
+            "count": self.count[rows].copy(),
+            "min": self.min[rows].copy(),
+            "max": self.max[rows].copy(),
+            "mean": self.mean[rows].copy(),
+            **self.quantiles(rows),
+        }
+
+
+def stats_dict(summary: Dict[str, np.ndarray], index: int, scale: float = 1.0) -> Optional[Dict[str, float]]:
+    """summaries() 第 index 行转为输出字典，速度乘以 scale；无样本时返回 None。"""
+    count = int(summary["count"][index])
+    if not count:
+        return None
+    stats: Dict[str, float] = {"count": count}
+    for name in ("min", "max", "mean", *QUANTILES):
+        stats[name] = float(summary[name][index]) * scale
+    return stats
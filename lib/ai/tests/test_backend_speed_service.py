@@ -0,0 +1,58 @@
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("cv2")
+
+from backend_speed_service import SpeedAnalyzer  # noqa: E402
+
+
+@pytest.fixture
+def weights(tmp_path):
+    path = tmp_path / "best.pt"
+    path.write_bytes(b"weights")
+    return path
+
+
+def test_config_rebuilds_analyzer(weights, tmp_path):
+    analyzer = SpeedAnalyzer(weights=weights, output_dir=tmp_path, dynamic_batch_size=8, target_fps=10.0)
+    rebuilt = SpeedAnalyzer(**analyzer.config())
+    assert rebuilt.config() == analyzer.config()
+    assert rebuilt.cache_key("video") == analyzer.cache_key("video")
+
+
+def test_cache_key_depends_on_batching_mode(weights, tmp_path):
+    single = SpeedAnalyzer(weights=weights, output_dir=tmp_path)
+    batched = SpeedAnalyzer(weights=weights, output_dir=tmp_path, dynamic_batch_size=8)
+    also_batched = SpeedAnalyzer(weights=weights, output_dir=tmp_path, dynamic_batch_size=4)
+    assert single.cache_key("video") != batched.cache_key("video")
+    # 合批大小只影响执行方式，两种合批配置的网络输入相同
+    assert batched.cache_key("video") == also_batched.cache_key("video")
+
+
+def test_progress_throttle_with_frame_stride():
+    from backend_speed_service import _PROGRESS_INTERVAL, _throttle_progress
+
+    sent = []
+    progress = _throttle_progress(lambda done, total: sent.append(done))
+    stride, total = 2, 200
+    progress(0, total)
+    for step in range(total // stride):
+        progress(step * stride + 1, total)  # 与 detect_and_track 跳帧时回报的帧号一致
+
+    steps = total // stride + 1
+    assert sent[0] == 0
+    assert len(sent) == -(-steps // _PROGRESS_INTERVAL)
+    assert all(0 < done < total for done in sent[1:])
+
+
+def test_worker_pool_spawns_without_loading_in_parent(weights, tmp_path):
+    from backend_speed_service import SpeedWorkerPool
+
+    # 占位权重无法加载；默认 spawn 模式不应在父进程中加载模型
+    pool = SpeedWorkerPool(SpeedAnalyzer(weights=weights, output_dir=tmp_path), workers=1)
+    try:
+        assert pool.start_method == "spawn"
+    finally:
+        pool.shutdown()
+    with pytest.raises(ValueError):
+        SpeedWorkerPool(SpeedAnalyzer(weights=weights, output_dir=tmp_path), start_method="bogus")
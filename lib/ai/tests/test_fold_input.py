@@ -0,0 +1,40 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+yaml = pytest.importorskip("yaml")
+
+from models.common import DetectMultiBackend, Focus  # noqa: E402
+from models.yolo import Model  # noqa: E402
+
+
+def _checkpoint(tmp_path, focus):
+    """随机初始化的 yolov5n 检查点；focus 为 True 时首层换成 Focus (12 个输入通道的卷积)。"""
+    with open("models/yolov5n.yaml", encoding="ascii", errors="ignore") as f:
+        cfg = yaml.safe_load(f)
+    if focus:
+        cfg["backbone"][0] = [-1, 1, "Focus", [64, 3]]
+    torch.manual_seed(0)
+    model = Model(cfg, ch=3, nc=3)
+    path = tmp_path / ("focus.pt" if focus else "conv.pt")
+    torch.save({"model": model, "epoch": 0}, path)
+    return path
+
+
+@pytest.mark.parametrize("focus", [False, True], ids=["conv", "focus"])
+def test_folded_first_layer_matches(tmp_path, focus):
+    weights = _checkpoint(tmp_path, focus)
+    plain = DetectMultiBackend(weights, device=torch.device("cpu"))
+    folded = DetectMultiBackend(weights, device=torch.device("cpu"), fold_input=True)
+    assert isinstance(folded.model.model[0], Focus) == focus
+    assert folded.input_format.channels == "BGR" and not folded.input_format.normalized
+
+    gen = torch.Generator().manual_seed(0)
+    bgr = torch.randint(0, 256, (2, 3, 64, 64), dtype=torch.uint8, generator=gen)
+    rgb = bgr.flip(1).float() / 255
+
+    with torch.no_grad():
+        expected = plain.model.model[0](rgb)
+        actual = folded.model.model[0](bgr.float())
+        torch.testing.assert_close(actual, expected, rtol=1e-4, atol=1e-4)
+        # 整个模型：uint8 输入由 forward 转成 float，不再缩放
+        torch.testing.assert_close(folded(bgr), plain(rgb), rtol=1e-3, atol=1e-3)
@@ -0,0 +1,130 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from utils.matching import linear_sum_assignment
+
+
+def _brute_force(cost):
+    """枚举所有指派，返回 (允许配对的最大数量, 该数量下的最小总代价)。"""
+    if cost.shape[0] > cost.shape[1]:
+        cost = cost.T
+    rows, cols = cost.shape
+    best = (0, 0.0)
+    for perm in itertools.permutations(range(cols), rows):
+        values = cost[np.arange(rows), perm]
+        ok = np.isfinite(values)
+        key = (int(ok.sum()), float(values[ok].sum()))
+        if key[0] > best[0] or (key[0] == best[0] and key[1] < best[1]):
+            best = key
+    return best
+
+
+def _check(cost):
+    row_ind, col_ind = linear_sum_assignment(cost)
+    assert len(np.unique(row_ind)) == len(row_ind) and len(np.unique(col_ind)) == len(col_ind)
+    assert np.all(np.diff(row_ind) > 0)
+    assert np.isfinite(cost[row_ind, col_ind]).all()
+    count, total = _brute_force(cost)
+    assert len(row_ind) == count
+    assert cost[row_ind, col_ind].sum() == pytest.approx(total)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_square_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(1, 7))
+    _check(rng.random((n, n)) * 10)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_rectangular_matches_brute_force(seed):
+    rng = np.random.default_rng(100 + seed)
+    rows, cols = (int(v) for v in rng.integers(1, 7, size=2))
+    # 整数代价制造大量并列最优解
+    _check(rng.integers(0, 10, size=(rows, cols)).astype(np.float64))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_infeasible_entries_match_brute_force(seed):
+    rng = np.random.default_rng(200 + seed)
+    rows, cols = (int(v) for v in rng.integers(1, 7, size=2))
+    cost = rng.random((rows, cols)) * 10
+    cost[rng.random((rows, cols)) < 0.4] = np.inf
+    _check(cost)
+
+
+def test_all_infeasible_and_empty():
+    for cost in (np.full((3, 4), np.inf), np.empty((0, 0)), np.empty((0, 3)), np.empty((2, 0))):
+        row_ind, col_ind = linear_sum_assignment(cost)
+        assert row_ind.shape == col_ind.shape == (0,)
+
+
+def test_invalid_input():
+    with pytest.raises(ValueError):
+        linear_sum_assignment(np.zeros(3))
+    with pytest.raises(ValueError):
+        linear_sum_assignment(np.array([[0.0, -np.inf]]))
+
+
+def _scene(rng, n_tracks, n_dets, extent):
+    return rng.random((n_tracks, 2)) * extent, rng.random((n_dets, 2)) * extent
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_gated_association_matches_dense_on_separated_scene(seed):
+    pytest.importorskip("torch")
+    from video_speed_tracking import _associate_dense, _associate_gated, associate_detections_to_tracks
+
+    rng = np.random.default_rng(seed)
+    max_distance = 20.0
+    # 目标间距远大于 max_distance，检测在轨迹附近抖动。只丢检或只出现新目标时，
+    # 稠密指派的最优解就是各自的近邻配对，与门控结果一致；两者同时出现时稠密指派
+    # 可能为了让远处的新检测配上轨迹而放弃近邻配对，门控求解不受影响，见下一个测试
+    grid = np.stack(np.meshgrid(np.arange(6), np.arange(6)), -1).reshape(-1, 2) * 100.0
+    cells = rng.permutation(len(grid))
+    track_xy = grid[cells[:20]]
+    det_xy = track_xy + np.clip(rng.normal(0, 4.0, track_xy.shape), -8.0, 8.0)
+    if seed % 2:
+        det_xy = det_xy[rng.random(20) < 0.8]
+    else:
+        det_xy = np.concatenate([det_xy, grid[cells[20:24]]])
+    det_xy = det_xy[rng.permutation(len(det_xy))]
+
+    dense = _associate_dense(track_xy, det_xy, max_distance)
+    # 小规模时默认求解屏蔽超距配对的稠密矩阵，_associate_gated 为大规模时的网格 + 连通分量路径
+    for gated in (associate_detections_to_tracks(track_xy, det_xy, max_distance, gated=True),
+                  _associate_gated(track_xy, det_xy, max_distance)):
+        assert sorted(gated[0]) == sorted((int(t), int(d)) for t, d in dense[0])
+        assert sorted(gated[1]) == sorted(dense[1])
+        assert sorted(gated[2]) == sorted(dense[2])
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_gated_association_is_optimal_on_crowded_scene(seed):
+    pytest.importorskip("torch")
+    from video_speed_tracking import (
+        _associate_dense,
+        _associate_gated,
+        associate_detections_to_tracks,
+        pairwise_distances,
+    )
+
+    rng = np.random.default_rng(seed)
+    max_distance = 15.0
+    track_xy, det_xy = _scene(rng, 30, 25, 100.0)
+    dense = _associate_dense(track_xy, det_xy, max_distance)
+
+    cost = pairwise_distances(track_xy, det_xy).astype(np.float64)
+    cost[cost > max_distance] = np.inf
+    row_ind, col_ind = linear_sum_assignment(cost)
+    for gated, unmatched_tracks, unmatched_dets in (
+        associate_detections_to_tracks(track_xy, det_xy, max_distance),
+        _associate_gated(track_xy, det_xy, max_distance),
+    ):
+        pairs = np.array(gated, dtype=np.int64).reshape(-1, 2)
+        assert len(pairs) == len(row_ind) >= len(dense[0])
+        assert cost[pairs[:, 0], pairs[:, 1]].sum() == pytest.approx(cost[row_ind, col_ind].sum(), rel=1e-5)
+        assert sorted(unmatched_tracks + pairs[:, 0].tolist()) == list(range(len(track_xy)))
+        assert sorted(unmatched_dets + pairs[:, 1].tolist()) == list(range(len(det_xy)))
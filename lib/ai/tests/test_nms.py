@@ -0,0 +1,83 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("torchvision")
+
+from models.yolo import Detect  # noqa: E402
+from utils.general import Candidates, batched_non_max_suppression, non_max_suppression  # noqa: E402
+
+
+def _predictions(batch, n, nc, gen, saturated=False):
+    """(batch, n, 5+nc) 的模拟检测头输出；saturated 时置信度全为 1，大量分数并列。"""
+    pred = torch.empty(batch, n, 5 + nc)
+    pred[..., :2] = torch.rand(batch, n, 2, generator=gen) * 320
+    pred[..., 2:4] = 8 + torch.rand(batch, n, 2, generator=gen) * 24
+    if saturated:
+        pred[..., 4:] = 1.0
+    else:
+        pred[..., 4] = torch.rand(batch, n, generator=gen)
+        pred[..., 5:] = torch.rand(batch, n, nc, generator=gen)
+    return pred
+
+
+def _as_candidates(pred, conf_thres):
+    """按 Detect 的输出顺序 (逐层、层内按图像分组) 构造紧凑候选。"""
+    rows, images = [], []
+    for part in pred.chunk(3, dim=1):
+        b, a = (part[..., 4] > conf_thres).nonzero(as_tuple=True)
+        rows.append(part[b, a])
+        images.append(b)
+    return Candidates(torch.cat(rows), torch.cat(images), pred.shape[0])
+
+
+def _assert_same(expected, actual):
+    assert len(expected) == len(actual)
+    for e, a in zip(expected, actual):
+        assert torch.equal(e, a)
+
+
+@pytest.mark.parametrize("single_nms_pairs", [0, 10**9], ids=["per_image", "single"])
+@pytest.mark.parametrize("saturated", [False, True])
+@pytest.mark.parametrize("kwargs", [{}, {"multi_label": True}, {"classes": [0, 2]}, {"agnostic": True}])
+def test_batched_nms_matches_loop(saturated, kwargs, single_nms_pairs):
+    gen = torch.Generator().manual_seed(0)
+    pred = _predictions(6, 900, 3, gen, saturated)
+    pred[2, :, 4] = 0  # 没有候选的图像
+    # max_det 小于保留数量时，并列分数按 non_max_suppression 的顺序截断
+    expected = non_max_suppression(pred.clone(), 0.25, 0.45, max_det=20, **kwargs)
+    _assert_same(expected, non_max_suppression(_as_candidates(pred, 0.25), 0.25, 0.45, max_det=20, **kwargs))
+    kwargs = dict(kwargs, max_det=20, single_nms_pairs=single_nms_pairs)
+    _assert_same(expected, batched_non_max_suppression(pred, 0.25, 0.45, **kwargs))
+    _assert_same(expected, batched_non_max_suppression(_as_candidates(pred, 0.25), 0.25, 0.45, **kwargs))
+
+
+def test_batched_nms_empty():
+    pred = torch.zeros(3, 100, 8)
+    out = batched_non_max_suppression(pred, 0.25, 0.45)
+    assert len(out) == 3 and all(d.shape == (0, 6) for d in out)
+
+
+@pytest.mark.parametrize("nms", [non_max_suppression, batched_non_max_suppression])
+def test_detect_candidates_match_dense(nms):
+    torch.manual_seed(0)
+    anchors = [[10, 13, 16, 30, 33, 23], [30, 61, 62, 45, 59, 119], [116, 90, 156, 198, 373, 326]]
+    channels, strides = (16, 32, 64), (8, 16, 32)
+    head = Detect(3, anchors, channels).eval()
+    head.stride = torch.tensor(strides, dtype=torch.float32)
+    features = [torch.randn(4, c, 160 // s, 160 // s) for c, s in zip(channels, strides)]
+    with torch.no_grad():
+        for conv in head.m:
+            bias = conv.bias.view(head.na, -1)
+            bias[:, 4] = -0.5  # 约三分之一的锚框越过阈值
+            bias[:, 5:] = 3.0
+
+        head.conf_thres = None
+        expected = nms(head([f.clone() for f in features])[0], 0.25, 0.45)
+        head.conf_thres = 0.25
+        candidates = head([f.clone() for f in features])[0]
+        actual = nms(candidates, 0.25, 0.45)
+
+    assert isinstance(candidates, Candidates) and len(candidates.rows) > 100
+    assert all(len(e) for e in expected)
+    for e, a in zip(expected, actual):
+        assert e.shape == a.shape and torch.allclose(e, a, atol=1e-4)
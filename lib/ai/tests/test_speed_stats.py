@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from speed_stats import QUANTILES, RELATIVE_ACCURACY, SpeedStatsTable
+
+
+def _table(samples):
+    table = SpeedStatsTable(1)
+    table.add(1)
+    row = np.array([0])
+    for value in samples:
+        table.update(row, np.array([value]))
+    return table
+
+
+@pytest.mark.parametrize("n", range(2, 11))
+def test_quantiles_match_numpy(n):
+    samples = np.random.default_rng(n).uniform(1.0, 100.0, n)
+    quantiles = _table(samples).quantiles()
+    np.testing.assert_allclose(quantiles["median"][0], np.median(samples), rtol=RELATIVE_ACCURACY)
+    for name, q in QUANTILES.items():
+        np.testing.assert_allclose(quantiles[name][0], np.percentile(samples, 100 * q), rtol=RELATIVE_ACCURACY)
+
+
+def test_quantiles_of_two_samples_interpolate_exactly():
+    quantiles = _table([10.0, 30.0]).quantiles()
+    assert quantiles["median"][0] == pytest.approx(20.0)
+    assert quantiles["p90"][0] == pytest.approx(28.0)
+
+
+def test_merged_quantiles_and_empty_rows():
+    rng = np.random.default_rng(0)
+    first, second = rng.uniform(0.0, 50.0, 40), rng.uniform(5.0, 80.0, 60)
+    table = SpeedStatsTable(4)
+    table.add(4)
+    for value_a, value_b in zip(first, second):
+        table.update(np.array([0, 1]), np.array([value_a, value_b]))
+    for value in second[len(first) :]:
+        table.update(np.array([1]), np.array([value]))
+    table.merge(2, table, np.array([0, 1]))
+
+    quantiles = table.quantiles()
+    both = np.concatenate([first, second])
+    for name, q in QUANTILES.items():
+        np.testing.assert_allclose(quantiles[name][2], np.percentile(both, 100 * q), rtol=2 * RELATIVE_ACCURACY)
+        assert np.isnan(quantiles[name][3])
@@ -0,0 +1,75 @@
+import tracemalloc
+
+import numpy as np
+
+from speed_stats import SpeedStatsTable
+from track_store import SEGMENT_DTYPE, TrackArchive, load_segments, save_segments
+
+SPILLED_ROWS = 200_000
+CHUNK_ROWS = 4096
+
+
+def _archive(tmp_path, rows=SPILLED_ROWS, tail=10):
+    """归档 rows 个段 (全部溢出到临时文件) 再加 tail 个留在内存中的段。"""
+    archive = TrackArchive(spill_after=rows, spill_dir=tmp_path)
+    stats = SpeedStatsTable(2)
+    stats.add(2)
+    for n, track in ((rows, 0), (tail, 1)):
+        archive.add(
+            np.array([track]),
+            np.array([0]),
+            stats,
+            np.array([track]),
+            {
+                "track_id": np.full(n, track, dtype=np.int64),
+                "start_frame": np.arange(n, dtype=np.int64),
+                "end_frame": np.arange(1, n + 1, dtype=np.int64),
+                "speed_px": np.linspace(0.0, 1.0, n),
+            },
+        )
+    return archive
+
+
+def test_iter_segments_streams_spilled_rows(tmp_path):
+    archive = _archive(tmp_path)
+    assert archive.segment_count == SPILLED_ROWS + 10 and len(archive.segments) == 10
+    spilled_bytes = SPILLED_ROWS * SEGMENT_DTYPE.itemsize
+
+    tracemalloc.start()
+    rows, speed_sum = 0, 0.0
+    for chunk in archive.iter_segments(CHUNK_ROWS):
+        assert len(chunk["track_id"]) <= CHUNK_ROWS
+        rows += len(chunk["track_id"])
+        speed_sum += float(chunk["speed_px"].sum())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert rows == SPILLED_ROWS + 10
+    np.testing.assert_allclose(speed_sum, np.linspace(0.0, 1.0, SPILLED_ROWS).sum() + 5.0)
+    assert peak < spilled_bytes / 10
+    archive.close()
+
+
+def test_save_segments_streams_spilled_rows(tmp_path):
+    archive = _archive(tmp_path)
+    spilled_bytes = SPILLED_ROWS * SEGMENT_DTYPE.itemsize
+
+    tracemalloc.start()
+    path = save_segments(tmp_path / "segments.npz", lambda: archive.iter_segments(CHUNK_ROWS))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert peak < spilled_bytes / 10
+
+    columns = load_segments(path)
+    assert len(columns["track_id"]) == SPILLED_ROWS + 10
+    np.testing.assert_array_equal(columns["start_frame"][:SPILLED_ROWS], np.arange(SPILLED_ROWS))
+    np.testing.assert_array_equal(columns["track_id"][SPILLED_ROWS:], 1)
+    np.testing.assert_array_equal(load_segments(path, mmap=False)["end_frame"], columns["end_frame"])
+    archive.close()
+
+
+def test_save_segments_accepts_columns(tmp_path):
+    columns = {name: np.arange(5).astype(SEGMENT_DTYPE[name]) for name in SEGMENT_DTYPE.names}
+    loaded = load_segments(save_segments(tmp_path / "segments.npz", columns))
+    for name in SEGMENT_DTYPE.names:
+        np.testing.assert_array_equal(loaded[name], columns[name])
@@ -0,0 +1,117 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+from frame_batcher import FrameBatcher  # noqa: E402
+from models.yolo import Model  # noqa: E402
+from video_speed_tracking import detect_and_track, load_model  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def weights(tmp_path_factory):
+    """随机初始化的 yolov5n 原始检查点：只有 model 条目 (无 ema)，参数仍需要梯度。"""
+    torch.manual_seed(0)
+    model = Model("models/yolov5n.yaml", ch=3, nc=3)
+    model.names = ["sperm", "cluster", "small_or_pinhead"]
+    with torch.no_grad():
+        for conv in model.model[-1].m:
+            bias = conv.bias.view(model.model[-1].na, -1)
+            bias[:, 4:] = 1.0  # 目标与类别置信度约 0.73，随机权重也能产生检测
+    path = tmp_path_factory.mktemp("weights") / "random.pt"
+    torch.save({"model": model, "epoch": 0}, path)
+    return path
+
+
+@pytest.fixture(scope="module")
+def video(tmp_path_factory):
+    """12 帧 160x128 的合成视频，几个亮斑匀速移动。"""
+    path = tmp_path_factory.mktemp("video") / "clip.avi"
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 10.0, (160, 128))
+    for t in range(12):
+        frame = np.full((128, 160, 3), 40, dtype=np.uint8)
+        for k in range(4):
+            cv2.circle(frame, (20 + 30 * k + 2 * t, 30 + 20 * k), 6, (230, 230, 230), -1)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def _run(weights, video, tmp_path, model=None, **kwargs):
+    return detect_and_track(
+        weights=weights,
+        source=video,
+        imgsz=128,
+        conf_thres=0.25,
+        iou_thres=0.45,
+        device="cpu",
+        pixel_size=1.0,
+        max_distance=40.0,
+        max_age=5,
+        class_filter=None,
+        output=tmp_path / "speed.json",
+        emit_segments=True,
+        model=model,
+        **kwargs,
+    )
+
+
+def _tracks(payload):
+    return [(t["id"], t["class_id"], t["sample_count"], t["speed_px_stats"]) for t in payload["tracks"]]
+
+
+def test_checkpoint_requires_grad(weights):
+    loaded = load_model(weights, "cpu", 128)
+    assert any(p.requires_grad for p in loaded.model.parameters())
+
+
+@pytest.mark.parametrize(
+    "mode",
+    [
+        {"batch_size": 4},
+        {"pipeline": True},
+        {"pipeline": True, "batch_size": 4},
+        {"preallocate": True},
+        {"preallocate": True, "batch_size": 4},
+        {"early_filter": True},
+        {"fold_input": True},
+        {"fold_input": True, "pipeline": True},
+        {"fold_input": True, "preallocate": True, "batch_size": 4},
+    ],
+)
+def test_batched_modes_match_per_frame(weights, video, tmp_path, mode):
+    base = _run(weights, video, tmp_path)
+    assert base["frames_analyzed"] == 12
+    assert base["tracks"], "随机检查点在合成视频上应产生轨迹"
+    assert _tracks(_run(weights, video, tmp_path, **mode)) == _tracks(base)
+
+
+@pytest.mark.parametrize(
+    "mode",
+    [
+        {"keyframe_interval": 3},
+        {"motion_roi": True},
+        {"tiled": True, "tile_overlap": 32},
+        {"static_threshold": 1.0},
+        {"frame_stride": 2},
+    ],
+)
+def test_approximate_modes_run(weights, video, tmp_path, mode):
+    payload = _run(weights, video, tmp_path, **mode)
+    assert payload["frames_used"] == 12 - (1 if mode.get("frame_stride") == 2 else 0)
+    assert (tmp_path / "speed.json").exists()
+
+
+@pytest.mark.parametrize("mode", [{}, {"pipeline": True}, {"preallocate": True}])
+def test_frame_batcher_modes_match(weights, video, tmp_path, mode):
+    # 合批的帧按固定的 imgsz x imgsz letterbox，与最小填充的逐帧推理输入不同，这里只比较各合批路径
+    loaded = load_model(weights, "cpu", 128)
+    results = []
+    for batch_size in (1, 4):
+        batcher = FrameBatcher(loaded.model, conf_thres=0.25, iou_thres=0.45, max_batch_size=batch_size)
+        try:
+            results.append(_tracks(_run(weights, video, tmp_path, model=loaded, batcher=batcher, **mode)))
+        finally:
+            batcher.close()
+    assert results[0] and results[0] == results[1]
@@ -0,0 +1,127 @@
+"""
+按固定尺寸的窗口 (tile) 裁剪原图做推理，并把各窗口的检测合并回原图坐标。
+
+窗口为 tile x tile 的正方形，左上角 (x0, y0) 位于原图像素坐标；相邻窗口重叠 overlap 像素，
+尺寸不超过 overlap 的目标至少完整落在一个窗口内。窗口缩放到 imgsz x imgsz 后整批前向一次，
+各窗口的检测经 scale_coords 映射回窗口坐标，再平移到原图。与整帧推理混用时，
+scale_matched_tile 给出与整帧 letterbox 缩放比例一致的窗口与输入尺寸。
+
+同一目标可能出现在多个重叠窗口中，或在窗口边界处被截成半个框，普通 IoU 难以去重，
+因此合并时按 "交集 / 较小框面积" (IoS) 抑制来自其他窗口的低分框。
+"""
+
+from __future__ import annotations
+
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+import torch
+
+from frame_ops import PAD_COLOR
+from utils.general import scale_coords
+
+
+def tile_origins(length: int, tile: int, overlap: int) -> np.ndarray:
+    """一维上覆盖 [0, length) 的窗口起点，步长 tile - overlap，最后一个窗口贴齐末端。"""
+    if length <= tile:
+        return np.zeros(1, dtype=np.int64)
+    step = max(1, tile - overlap)
+    origins = np.arange(0, length - tile, step, dtype=np.int64)
+    return np.append(origins, length - tile)
+
+
+def grid_windows(shape: tuple, tile: int, overlap: int) -> np.ndarray:
+    """覆盖整幅 (h, w) 图像的窗口网格，返回 (n, 2) 的 (x0, y0)。"""
+    h, w = shape[:2]
+    xs, ys = tile_origins(w, tile, overlap), tile_origins(h, tile, overlap)
+    grid = np.stack(np.meshgrid(xs, ys), axis=-1)
+    return grid.reshape(-1, 2)
+
+
+def scale_matched_tile(frame_shape: tuple, imgsz: int, stride: int, tile: Optional[int] = None) -> Tuple[int, int]:
+    """
+    与整帧 letterbox 同一缩放比例的窗口：返回 (原图窗口边长, 网络输入边长)。
+
+    整帧推理按 gain = imgsz / max(h, w) 缩放；窗口缩放到 round(tile * gain) (取 stride 的倍数)，
+    使裁剪推理与整帧推理中的目标尺寸一致。tile 为 None 时网络输入取 imgsz 的一半。
+    """
+    h, w = frame_shape[:2]
+    gain = imgsz / max(h, w)
+    if tile is None:
+        size = max(stride, imgsz // 2 // stride * stride)
+    else:
+        size = max(stride, int(round(tile * gain / stride)) * stride)
+    return int(round(size / gain)), size
+
+
+def crop_tiles(frame: np.ndarray, windows: np.ndarray, tile: int, imgsz: int, channels: str = "RGB") -> np.ndarray:
+    """
+    裁剪各窗口并缩放到 imgsz，返回 (n, 3, imgsz, imgsz) 的 uint8 连续数组。
+
+    窗口超出图像的部分 (图像小于 tile 时) 以 PAD_COLOR 填充；channels 为 "RGB" 时翻转 BGR 通道。
+    """
+    h, w = frame.shape[:2]
+    batch = np.empty((len(windows), imgsz, imgsz, 3), dtype=np.uint8)
+    padded = np.empty((tile, tile, 3), dtype=np.uint8) if h < tile or w < tile else None
+    for i, (x0, y0) in enumerate(windows.tolist()):
+        crop = frame[y0 : y0 + tile, x0 : x0 + tile]
+        if padded is not None:
+            padded.fill(PAD_COLOR)
+            padded[: crop.shape[0], : crop.shape[1]] = crop
+            crop = padded
+        if tile == imgsz:
+            batch[i] = crop
+        else:
+            cv2.resize(crop, (imgsz, imgsz), dst=batch[i], interpolation=cv2.INTER_AREA)
+    chw = batch.transpose(0, 3, 1, 2)
+    if channels == "RGB":
+        chw = chw[:, ::-1]
+    return np.ascontiguousarray(chw)
+
+
+def merge_tile_detections(
+    dets: List[torch.Tensor],
+    windows: np.ndarray,
+    tile: int,
+    imgsz: int,
+    frame_shape: tuple,
+    overlap_thres: float = 0.6,
+) -> torch.Tensor:
+    """
+    把各窗口 NMS 后的检测 (n, 6) 映射回原图并跨窗口去重。
+
+    同类且来自不同窗口的两个框，IoS 超过 overlap_thres 时只保留分数较高的一个
+    (Fast NMS：与任何更高分的框重叠即被抑制)。
+    """
+    h, w = frame_shape[:2]
+    boxes, tile_ids = [], []
+    for i, (det, (x0, y0)) in enumerate(zip(dets, windows.tolist())):
+        if not len(det):
+            continue
+        det = det.clone()
+        if tile != imgsz:
+            scale_coords((imgsz, imgsz), det[:, :4], (tile, tile))
+        det[:, [0, 2]] += x0
+        det[:, [1, 3]] += y0
+        boxes.append(det)
+        tile_ids.append(torch.full((len(det),), i, device=det.device))
+    if not boxes:
+        return dets[0].new_zeros((0, 6)) if dets else torch.zeros((0, 6))
+    det = torch.cat(boxes)
+    det[:, [0, 2]] = det[:, [0, 2]].clamp(0, w)
+    det[:, [1, 3]] = det[:, [1, 3]].clamp(0, h)
+    tile_id = torch.cat(tile_ids)
+    if len(boxes) == 1:
+        return det
+
+    order = det[:, 4].argsort(descending=True)
+    det, tile_id = det[order], tile_id[order]
+    lt = torch.max(det[:, None, :2], det[None, :, :2])
+    rb = torch.min(det[:, None, 2:4], det[None, :, 2:4])
+    inter = (rb - lt).clamp(min=0).prod(2)
+    area = (det[:, 2:4] - det[:, :2]).prod(1)
+    ios = inter / torch.min(area[:, None], area[None, :]).clamp(min=1e-6)
+    overlap = (ios > overlap_thres) & (det[:, None, 5] == det[None, :, 5]) & (tile_id[:, None] != tile_id[None, :])
+    keep = ~overlap.triu(1).any(0)
+    return det[keep]
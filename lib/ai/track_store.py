@@ -0,0 +1,410 @@
+"""
+列式 (struct-of-arrays) 轨迹存储。
+
+每条轨迹不再是一个持有 Python float 列表的对象：活跃轨迹的 id、类别、最后帧、最后中心
+与未更新帧数各占一列可增长的 NumPy 数组，所有轨迹的逐段速度写入共享的只追加缓冲区。
+每帧的更新、老化与清理都是对整列的一次向量化操作。
+
+每条轨迹的速度统计随 update 在线累积 (见 speed_stats.SpeedStatsTable)，不需要保留样本；
+逐段速度只在需要输出时才记录。
+
+被清理的轨迹不会丢弃，而是移入 TrackArchive：归档只保存每条轨迹的 id、类别与统计摘要，
+其草图并入全局汇总；若记录了速度段，段数据超过阈值后可写入临时文件，
+读取时按块映射 (TrackArchive.iter_segments)，处理长视频时常驻内存不随视频长度增长。
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+import weakref
+import zipfile
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+from speed_stats import SpeedStatsTable, grow_rows
+
+# 速度段写入临时文件时的记录格式，也是 .npz 产物中各列的名称与类型
+SEGMENT_DTYPE = np.dtype(
+    [("track_id", "<i8"), ("start_frame", "<i8"), ("end_frame", "<i8"), ("speed_px", "<f8")]
+)
+# 分块读取归档段时每块的行数 (每行 32 字节，约 2 MB)
+SEGMENT_CHUNK_ROWS = 65536
+
+
+def group_segments(
+    segment_track_ids: np.ndarray, track_ids: Optional[np.ndarray] = None
+) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    按 track_id 升序产出 (track_id, 该轨迹的段下标)，段按写入顺序排列。
+
+    track_ids 若提供，只产出其中的轨迹。
+    """
+    ids = np.asarray(segment_track_ids)
+    index = np.arange(len(ids))
+    if track_ids is not None:
+        keep = np.isin(ids, track_ids)
+        ids, index = ids[keep], index[keep]
+    order = np.argsort(ids, kind="stable")
+    ids, index = ids[order], index[order]
+    bounds = np.flatnonzero(np.diff(ids)) + 1
+    for start, stop in zip(np.r_[0, bounds], np.r_[bounds, len(ids)]):
+        if stop > start:
+            yield int(ids[start]), index[start:stop]
+
+
+class SegmentBuffer:
+    """
+    所有轨迹共享的只追加速度段缓冲区。
+
+    每段记录 (track_id, start_frame, end_frame, speed_px)，物理速度输出时按 pixel_size 换算。
+    """
+
+    __slots__ = ("size", "track_id", "start_frame", "end_frame", "speed_px")
+
+    def __init__(self, capacity: int = 1024) -> None:
+        self.size = 0
+        self.track_id = np.empty(capacity, dtype=np.int64)
+        self.start_frame = np.empty(capacity, dtype=np.int64)
+        self.end_frame = np.empty(capacity, dtype=np.int64)
+        self.speed_px = np.empty(capacity, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def extend(
+        self,
+        track_id: np.ndarray,
+        start_frame: np.ndarray,
+        end_frame: np.ndarray,
+        speed_px: np.ndarray,
+    ) -> None:
+        n = len(track_id)
+        if not n:
+            return
+        end = self.size + n
+        for name, values in (
+            ("track_id", track_id),
+            ("start_frame", start_frame),
+            ("end_frame", end_frame),
+            ("speed_px", speed_px),
+        ):
+            column = grow_rows(getattr(self, name), end)
+            column[self.size : end] = values
+            setattr(self, name, column)
+        self.size = end
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """已写入部分的只读视图。"""
+        return {
+            "track_id": self.track_id[: self.size],
+            "start_frame": self.start_frame[: self.size],
+            "end_frame": self.end_frame[: self.size],
+            "speed_px": self.speed_px[: self.size],
+        }
+
+    def take(self, mask: np.ndarray) -> Dict[str, np.ndarray]:
+        """取出 mask 选中的段 (返回副本)，其余段原地压缩保留。"""
+        taken = {name: values[mask] for name, values in self.columns().items()}
+        keep = ~mask
+        n = int(keep.sum())
+        for name in SEGMENT_DTYPE.names:
+            column = getattr(self, name)
+            column[:n] = column[: self.size][keep]
+        self.size = n
+        return taken
+
+    def clear(self) -> None:
+        self.size = 0
+
+    def groups(self, track_ids: Optional[np.ndarray] = None) -> Iterator[Tuple[int, np.ndarray]]:
+        """按 track_id 分组产出段下标，见 group_segments。"""
+        return group_segments(self.track_id[: self.size], track_ids)
+
+
+class TrackTable:
+    """
+    活跃轨迹表：每个属性一列，行号即关联时的轨迹下标。
+
+    清理 (prune) 会压缩各列，行号随之变化；track_id 列保存稳定的轨迹编号。
+    record_segments 为 False 时不记录逐段速度，只累积统计。
+    """
+
+    __slots__ = (
+        "size",
+        "next_id",
+        "track_id",
+        "class_id",
+        "last_frame",
+        "center",
+        "time_since_update",
+        "stats",
+        "segments",
+        "record_segments",
+    )
+
+    def __init__(self, capacity: int = 64, record_segments: bool = True) -> None:
+        self.size = 0
+        self.next_id = 0
+        self.track_id = np.empty(capacity, dtype=np.int64)
+        self.class_id = np.empty(capacity, dtype=np.int64)
+        self.last_frame = np.empty(capacity, dtype=np.int64)
+        self.center = np.empty((capacity, 2), dtype=np.float64)
+        self.time_since_update = np.empty(capacity, dtype=np.int64)
+        self.stats = SpeedStatsTable(capacity)
+        self.segments = SegmentBuffer()
+        self.record_segments = record_segments
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def centers(self) -> np.ndarray:
+        """活跃轨迹最后位置的 (n, 2) 连续视图。"""
+        return self.center[: self.size]
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self.track_id[: self.size]
+
+    def add(self, class_id: np.ndarray, centers: np.ndarray, frame_idx: int) -> None:
+        """为未匹配的检测批量新建轨迹。"""
+        n = len(class_id)
+        if not n:
+            return
+        end = self.size + n
+        for name in ("track_id", "class_id", "last_frame", "center", "time_since_update"):
+            setattr(self, name, grow_rows(getattr(self, name), end))
+        self.track_id[self.size : end] = np.arange(self.next_id, self.next_id + n)
+        self.class_id[self.size : end] = class_id
+        self.last_frame[self.size : end] = frame_idx
+        self.center[self.size : end] = centers
+        self.time_since_update[self.size : end] = 0
+        self.stats.add(n)
+        self.size = end
+        self.next_id += n
+
+    def update(self, rows: np.ndarray, centers: np.ndarray, frame_idx: int, fps: float) -> np.ndarray:
+        """用匹配到的检测中心更新轨迹，累积这一段的像素速度统计，按需追加到段缓冲区；返回这些像素速度。"""
+        if not len(rows):
+            return np.empty(0, dtype=np.float64)
+        dt = frame_idx - self.last_frame[rows]
+        dt[dt <= 0] = 1  # 避免异常
+        delta = centers - self.center[rows]
+        speed_px = np.hypot(delta[:, 0], delta[:, 1]) * fps / dt
+        self.stats.update(rows, speed_px)
+        if self.record_segments:
+            self.segments.extend(
+                self.track_id[rows],
+                self.last_frame[rows],
+                np.full(len(rows), frame_idx, dtype=np.int64),
+                speed_px,
+            )
+        self.last_frame[rows] = frame_idx
+        self.center[rows] = centers
+        self.time_since_update[rows] = 0
+        return speed_px
+
+    def age(self, rows: np.ndarray) -> None:
+        """未匹配到检测的轨迹未更新帧数加一。"""
+        self.time_since_update[rows] += 1
+
+    def prune(self, max_age: int, archive: Optional["TrackArchive"] = None) -> np.ndarray:
+        """
+        移除超过 max_age 帧未更新的轨迹并压缩各列，返回被移除轨迹的 track_id。
+
+        archive 若提供，被移除的轨迹及其统计、速度段移入归档，活跃段缓冲区同时压缩。
+        """
+        tsu = self.time_since_update[: self.size]
+        keep = tsu <= max_age
+        if keep.all():
+            return np.empty(0, dtype=np.int64)
+        removed = self.track_id[: self.size][~keep].copy()
+        if archive is not None:
+            finished = self.segments.take(np.isin(self.segments.track_id[: self.segments.size], removed))
+            archive.add(removed, self.class_id[: self.size][~keep], self.stats, np.flatnonzero(~keep), finished)
+        n = int(keep.sum())
+        for name in ("track_id", "class_id", "last_frame", "center", "time_since_update"):
+            column = getattr(self, name)
+            column[:n] = column[: self.size][keep]
+        self.stats.compact(keep)
+        self.size = n
+        return removed
+
+
+class TrackArchive:
+    """
+    已结束轨迹的列式归档：每条轨迹一行 (track_id, class_id 与像素速度统计摘要)，
+    其统计并入 totals 的唯一一行作为全局汇总，速度段 (若有) 追加到归档段缓冲区。
+
+    spill_after 不为 None 时，内存中的归档段达到该数量就追加写入临时文件并清空，
+    读取时以 np.memmap 映射，不占用常驻堆内存。
+    """
+
+    def __init__(self, spill_after: Optional[int] = None, spill_dir: Optional[Path | str] = None) -> None:
+        self.spill_after = spill_after
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        self.size = 0
+        self.track_id = np.empty(64, dtype=np.int64)
+        self.class_id = np.empty(64, dtype=np.int64)
+        self.summary: Dict[str, np.ndarray] = {}
+        self.totals = SpeedStatsTable(1)
+        self.totals.add(1)
+        self.segments = SegmentBuffer()
+        self._spill_path: Optional[Path] = None
+        self._spilled = 0
+        self._finalizer: Optional[weakref.finalize] = None
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self.track_id[: self.size]
+
+    @property
+    def classes(self) -> np.ndarray:
+        return self.class_id[: self.size]
+
+    def track_summary(self) -> Dict[str, np.ndarray]:
+        """已写入部分的逐轨迹统计摘要列。"""
+        return {name: values[: self.size] for name, values in self.summary.items()}
+
+    @property
+    def segment_count(self) -> int:
+        return self._spilled + len(self.segments)
+
+    def add(
+        self,
+        track_id: np.ndarray,
+        class_id: np.ndarray,
+        stats: SpeedStatsTable,
+        rows: np.ndarray,
+        segments: Dict[str, np.ndarray],
+    ) -> None:
+        """归档 stats 中 rows 行对应的轨迹；segments 为这些轨迹的速度段 (可为空)。"""
+        n = len(track_id)
+        end = self.size + n
+        self.track_id = grow_rows(self.track_id, end)
+        self.class_id = grow_rows(self.class_id, end)
+        self.track_id[self.size : end] = track_id
+        self.class_id[self.size : end] = class_id
+        for name, values in stats.summaries(rows).items():
+            column = grow_rows(self.summary.get(name, np.empty(0, dtype=values.dtype)), end)
+            column[self.size : end] = values
+            self.summary[name] = column
+        self.totals.merge(0, stats, rows)
+        self.size = end
+        self.segments.extend(
+            segments["track_id"], segments["start_frame"], segments["end_frame"], segments["speed_px"]
+        )
+        if self.spill_after is not None and len(self.segments) >= self.spill_after:
+            self._spill()
+
+    def _spill(self) -> None:
+        if self._spill_path is None:
+            if self.spill_dir is not None:
+                self.spill_dir.mkdir(parents=True, exist_ok=True)
+            fd, name = tempfile.mkstemp(prefix="track_archive_", suffix=".bin", dir=self.spill_dir)
+            os.close(fd)
+            self._spill_path = Path(name)
+            # 异常退出未调用 close 时，对象回收后同样删除临时文件
+            self._finalizer = weakref.finalize(self, self._spill_path.unlink, missing_ok=True)
+        records = np.empty(len(self.segments), dtype=SEGMENT_DTYPE)
+        for field, values in self.segments.columns().items():
+            records[field] = values
+        with self._spill_path.open("ab") as f:
+            records.tofile(f)
+        self._spilled += len(records)
+        self.segments.clear()
+
+    def iter_segments(self, chunk_rows: int = SEGMENT_CHUNK_ROWS) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        按写入顺序分块产出全部归档段 (临时文件 + 内存) 的列，每块至多 chunk_rows 行。
+
+        临时文件中的段以 np.memmap 切片产出，不会整体读入内存；调用方应逐块归约或写出。
+        """
+        if self._spilled:
+            mapped = np.memmap(self._spill_path, dtype=SEGMENT_DTYPE, mode="r", shape=(self._spilled,))
+            for start in range(0, self._spilled, chunk_rows):
+                records = mapped[start : start + chunk_rows]
+                yield {name: records[name] for name in SEGMENT_DTYPE.names}
+        if len(self.segments):
+            yield self.segments.columns()
+
+    def finish(self, tracks: TrackTable) -> None:
+        """视频结束时把仍然活跃的轨迹全部移入归档。"""
+        tracks.prune(-1, self)
+
+    def close(self) -> None:
+        """删除临时文件。"""
+        if self._finalizer is not None:
+            self._finalizer()
+            self._finalizer = None
+            self._spill_path = None
+            self._spilled = 0
+
+
+def save_segments(
+    path: Path | str,
+    segments: Dict[str, np.ndarray] | Callable[[], Iterable[Dict[str, np.ndarray]]],
+) -> Path:
+    """
+    把速度段各列写成不压缩的 .npz (每列一个 .npy 成员)，返回写入路径。
+
+    segments 为列字典，或每次调用都从头分块产出列字典的函数 (如 TrackArchive.iter_segments)；
+    后者按列逐块写出，不需要把全部段拼接到内存中。成员不压缩，读者可用 load_segments
+    直接内存映射，无需解析 JSON。
+    """
+    chunks = (lambda: (segments,)) if isinstance(segments, dict) else segments
+    count = sum(len(chunk["track_id"]) for chunk in chunks())
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with zipfile.ZipFile(tmp, "w", zipfile.ZIP_STORED, allowZip64=True) as zf:
+        for name in SEGMENT_DTYPE.names:
+            dtype = SEGMENT_DTYPE[name]
+            header = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (count,)}
+            with zf.open(f"{name}.npy", "w", force_zip64=True) as f:
+                np.lib.format.write_array_header_1_0(f, header)
+                for chunk in chunks():
+                    f.write(np.ascontiguousarray(chunk[name], dtype=dtype).tobytes())
+    os.replace(tmp, path)
+    return path
+
+
+def load_segments(path: Path | str, mmap: bool = True) -> Dict[str, np.ndarray]:
+    """
+    读取 save_segments 写出的 .npz。
+
+    mmap 为 True 时各列为只读 np.memmap (np.load 对 .npz 不支持 mmap_mode，
+    这里按 zip 成员的数据偏移直接映射)；为 False 时整体读入内存。
+    """
+    path = Path(path)
+    if not mmap:
+        with np.load(path) as data:
+            return {name: data[name] for name in SEGMENT_DTYPE.names}
+    columns = {}
+    with zipfile.ZipFile(path) as zf, path.open("rb") as f:
+        for name in SEGMENT_DTYPE.names:
+            info = zf.getinfo(f"{name}.npy")
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{path} 中的 {name} 已压缩，无法内存映射")
+            # 本地文件头：固定 30 字节 + 文件名 + extra 字段
+            f.seek(info.header_offset + 26)
+            name_len, extra_len = np.frombuffer(f.read(4), dtype="<u2")
+            f.seek(info.header_offset + 30 + int(name_len) + int(extra_len))
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            if fortran_order or len(shape) != 1:
+                raise ValueError(f"{path} 中的 {name} 不是一维列")
+            if not shape[0]:
+                columns[name] = np.empty(0, dtype=dtype)  # 空文件段无法映射
+                continue
+            columns[name] = np.memmap(path, dtype=dtype, mode="r", offset=f.tell(), shape=shape)
+    return columns
@@ -15,6 +15,7 @@ import shutil
 import signal
 import time
 import urllib
+from collections import namedtuple
 from itertools import repeat
 from multiprocessing.pool import ThreadPool
 from pathlib import Path
@@ -656,16 +657,33 @@ def clip_coords(boxes, shape):
         boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, shape[0])  # y1, y2
 
 
+# Compact inference output of Detect when its objectness pre-filter is enabled: decoded (k, 5+nc) candidate rows
+# [xywh, obj, cls...], the batch image index of each row and the batch size. Accepted by non_max_suppression().
+Candidates = namedtuple('Candidates', ('rows', 'image', 'batch_size'))
+
+
 def non_max_suppression(prediction, conf_thres=0.25, iou_thres=0.45, classes=None, agnostic=False, multi_label=False,
-                        labels=(), max_det=300):
+                        labels=(), max_det=300, tiles=None, tile_border=2):
     """Runs Non-Maximum Suppression (NMS) on inference results
 
+    prediction: dense (bs,n,5+nc) model output, or the compact Candidates of an objectness-filtered Detect layer
+    tiles: optional (n,4) xyxy windows of the batch images on one larger frame (native-resolution tiles, see
+        tiling.grid_windows). Boxes are shifted to frame coordinates, boxes within tile_border pixels of an
+        interior tile edge are dropped (the overlapping neighbour tile holds the whole object) and a single NMS
+        runs over all tiles, so duplicates from overlapping tiles are removed too.
+
     Returns:
-         list of detections, on (n,6) tensor per image [xyxy, conf, cls]
+         list of detections, on (n,6) tensor per image [xyxy, conf, cls]; a single merged tensor if tiles is given
     """
 
-    nc = prediction.shape[2] - 5  # number of classes
-    xc = prediction[..., 4] > conf_thres  # candidates
+    if isinstance(prediction, Candidates):  # pre-filtered rows, already obj_conf > conf_thres
+        candidates, bs = prediction, prediction.batch_size
+        prediction = candidates.rows
+        nc = prediction.shape[1] - 5  # number of classes
+    else:
+        candidates, bs = None, prediction.shape[0]
+        nc = prediction.shape[2] - 5  # number of classes
+        xc = prediction[..., 4] > conf_thres  # candidates
 
     # Checks
     assert 0 <= conf_thres <= 1, f'Invalid Confidence threshold {conf_thres}, valid values are between 0.0 and 1.0'
@@ -679,12 +697,47 @@ def non_max_suppression(prediction, conf_thres=0.25, iou_thres=0.45, classes=Non
     multi_label &= nc > 1  # multiple labels per box (adds 0.5ms/img)
     merge = False  # use merge-NMS
 
+    def nms(x):
+        # Check shape
+        n = x.shape[0]  # number of boxes
+        if not n:  # no boxes
+            return torch.zeros((0, 6), device=prediction.device)
+        elif n > max_nms:  # excess boxes
+            x = x[x[:, 4].argsort(descending=True)[:max_nms]]  # sort by confidence
+
+        # Batched NMS
+        c = x[:, 5:6] * (0 if agnostic else offset)  # classes
+        boxes, scores = x[:, :4] + c, x[:, 4]  # boxes (offset by class), scores
+        i = torchvision.ops.nms(boxes, scores, iou_thres)  # NMS
+        if i.shape[0] > max_det:  # limit detections
+            i = i[:max_det]
+        if merge and (1 < n < 3E3):  # Merge NMS (boxes merged using weighted mean)
+            # update boxes as boxes(i,4) = weights(i,n) * boxes(n,4)
+            iou = box_iou(boxes[i], boxes) > iou_thres  # iou matrix
+            weights = iou * scores[None]  # box weights
+            x[i, :4] = torch.mm(weights, x[:, :4]).float() / weights.sum(1, keepdim=True)  # merged boxes
+            if redundant:
+                i = i[iou.sum(1) > 1]  # require redundancy
+        return x[i]
+
+    offset = max_wh
+    if tiles is not None:
+        tiles = torch.as_tensor(tiles, dtype=torch.float32, device=prediction.device).view(-1, 4)
+        assert len(tiles) == bs, f'{len(tiles)} tiles for a batch of {bs} images'
+        offset = max(max_wh, int(tiles[:, 2:].max()) + 1)  # class offset must exceed the frame size
+        interior = torch.stack((tiles[:, 0] > tiles[:, 0].min(), tiles[:, 1] > tiles[:, 1].min(),
+                                tiles[:, 2] < tiles[:, 2].max(), tiles[:, 3] < tiles[:, 3].max()), 1)  # x1y1x2y2
+        tiled = []
+
     t = time.time()
-    output = [torch.zeros((0, 6), device=prediction.device)] * prediction.shape[0]
-    for xi, x in enumerate(prediction):  # image index, image inference
+    output = [torch.zeros((0, 6), device=prediction.device)] * bs
+    for xi in range(bs):  # image index
         # Apply constraints
         # x[((x[..., 2:4] < min_wh) | (x[..., 2:4] > max_wh)).any(1), 4] = 0  # width-height
-        x = x[xc[xi]]  # confidence
+        if candidates is not None:
+            x = prediction[candidates.image == xi]
+        else:
+            x = prediction[xi][xc[xi]]  # confidence
 
         # Cat apriori labels if autolabelling
         if labels and len(labels[xi]):
@@ -721,32 +774,102 @@ def non_max_suppression(prediction, conf_thres=0.25, iou_thres=0.45, classes=Non
         # if not torch.isfinite(x).all():
         #     x = x[torch.isfinite(x).all(1)]
 
-        # Check shape
-        n = x.shape[0]  # number of boxes
-        if not n:  # no boxes
+        if tiles is not None:  # tile to frame coordinates, drop boxes cut by an interior tile edge
+            tile = tiles[xi]
+            size = tile[2:] - tile[:2]
+            cut = torch.cat((x[:, :2] <= tile_border, x[:, 2:4] >= size - tile_border), 1) & interior[xi]
+            x = x[~cut.any(1)].float()  # FP16 cannot hold 4K coordinates exactly
+            x[:, :4] += tile[:2].repeat(2)
+            tiled.append(x)
             continue
-        elif n > max_nms:  # excess boxes
-            x = x[x[:, 4].argsort(descending=True)[:max_nms]]  # sort by confidence
 
-        # Batched NMS
-        c = x[:, 5:6] * (0 if agnostic else max_wh)  # classes
-        boxes, scores = x[:, :4] + c, x[:, 4]  # boxes (offset by class), scores
-        i = torchvision.ops.nms(boxes, scores, iou_thres)  # NMS
-        if i.shape[0] > max_det:  # limit detections
-            i = i[:max_det]
-        if merge and (1 < n < 3E3):  # Merge NMS (boxes merged using weighted mean)
-            # update boxes as boxes(i,4) = weights(i,n) * boxes(n,4)
-            iou = box_iou(boxes[i], boxes) > iou_thres  # iou matrix
-            weights = iou * scores[None]  # box weights
-            x[i, :4] = torch.mm(weights, x[:, :4]).float() / weights.sum(1, keepdim=True)  # merged boxes
-            if redundant:
-                i = i[iou.sum(1) > 1]  # require redundancy
-
-        output[xi] = x[i]
+        output[xi] = nms(x)
         if (time.time() - t) > time_limit:
             print(f'WARNING: NMS time limit {time_limit}s exceeded')
             break  # time limit exceeded
 
+    if tiles is not None:
+        return [nms(torch.cat(tiled)) if tiled else output[0]]
+    return output
+
+
+def batched_non_max_suppression(prediction, conf_thres=0.25, iou_thres=0.45, classes=None, agnostic=False,
+                                multi_label=False, max_det=300, single_nms_pairs=20000):
+    """non_max_suppression() for a whole batch (inference only: no autolabels, merge-NMS or time limit)
+
+    Candidate rows of all images are filtered together. Small batches then run a single torchvision.ops.nms with boxes
+    offset by (image, class); its cost grows with the square of the batch's box count, so once total boxes x mean boxes
+    per image exceeds single_nms_pairs each image gets its own nms call on rows split with one torch.split. Both paths
+    see rows in the order non_max_suppression() does and keep max_det per image by a stable sort on (image, score), so
+    results match the per-image loop, including which tied scores survive. A batch of one image goes straight to
+    non_max_suppression(), which is cheaper there. Accepts the dense (bs,n,5+nc) output or compact Candidates.
+
+    Returns:
+         list of detections, on (n,6) tensor per image [xyxy, conf, cls]
+    """
+
+    assert 0 <= conf_thres <= 1, f'Invalid Confidence threshold {conf_thres}, valid values are between 0.0 and 1.0'
+    assert 0 <= iou_thres <= 1, f'Invalid IoU {iou_thres}, valid values are between 0.0 and 1.0'
+    max_wh = 7680  # (pixels) maximum box width and height, as in non_max_suppression()
+    max_nms = 30000  # maximum number of boxes per image into torchvision.ops.nms()
+
+    bs = prediction.batch_size if isinstance(prediction, Candidates) else prediction.shape[0]
+    if bs == 1:
+        return non_max_suppression(prediction, conf_thres, iou_thres, classes, agnostic, multi_label, max_det=max_det)
+
+    if isinstance(prediction, Candidates):  # pre-filtered rows, already obj_conf > conf_thres
+        x, image = prediction.rows, prediction.image
+        order = torch.sort(image, stable=True)[1]  # rows come level by level; group by image, anchor order kept
+        x, image = x[order], image[order]
+    else:
+        image, anchor = (prediction[..., 4] > conf_thres).nonzero(as_tuple=True)  # candidates, grouped by image
+        x = prediction[image, anchor]
+    nc = x.shape[1] - 5  # number of classes
+    multi_label &= nc > 1  # multiple labels per box
+    output = [torch.zeros((0, 6), device=x.device)] * bs
+    if not x.shape[0]:
+        return output
+
+    # Compute conf, box and the (n,6) detections matrix [xyxy, conf, cls] for all images at once
+    x = x.clone()
+    x[:, 5:] *= x[:, 4:5]  # conf = obj_conf * cls_conf
+    box = xywh2xyxy(x[:, :4])
+    if multi_label:
+        i, j = (x[:, 5:] > conf_thres).nonzero(as_tuple=False).T
+        x, image = torch.cat((box[i], x[i, j + 5, None], j[:, None].float()), 1), image[i]
+    else:  # best class only
+        conf, j = x[:, 5:].max(1, keepdim=True)
+        keep = conf.view(-1) > conf_thres
+        x, image = torch.cat((box, conf, j.float()), 1)[keep], image[keep]
+    if classes is not None:  # filter by class
+        keep = (x[:, 5:6] == torch.tensor(classes, device=x.device)).any(1)
+        x, image = x[keep], image[keep]
+    n = x.shape[0]
+    if not n:
+        return output
+    counts = torch.bincount(image, minlength=bs)
+
+    if n * n <= single_nms_pairs * bs and int(counts.max()) <= max_nms:
+        # One NMS for the batch: class offsets exactly as in the loop, then image offsets past every class in float64
+        c = x[:, 5:6] * (0 if agnostic else max_wh)  # classes
+        boxes = (x[:, :4] + c).double() + (image.double() * (nc + 1) * max_wh)[:, None]
+        i = torchvision.ops.nms(boxes, x[:, 4].double(), iou_thres)  # score order, ties by row (stable sort)
+        i = i[torch.sort(image[i], stable=True)[1]]  # back to image order, score order kept within each image
+        kept = torch.bincount(image[i], minlength=bs)
+        rank = torch.arange(len(i), device=x.device) - (kept.cumsum(0) - kept)[image[i]]
+        i = i[rank < max_det]
+        return list(torch.split(x[i], kept.clamp(max=max_det).tolist()))
+
+    # Per-image NMS on the already split rows
+    counts = counts.tolist()
+    for xi, xs in enumerate(torch.split(x, counts)):
+        if not counts[xi]:
+            continue
+        if counts[xi] > max_nms:  # excess boxes
+            xs = xs[xs[:, 4].argsort(descending=True)[:max_nms]]  # sort by confidence
+        c = xs[:, 5:6] * (0 if agnostic else max_wh)  # classes
+        i = torchvision.ops.nms(xs[:, :4] + c, xs[:, 4], iou_thres)  # NMS
+        output[xi] = xs[i[:max_det]]
     return output
 
 
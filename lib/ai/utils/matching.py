@@ -7,10 +7,124 @@ import numpy as np
 
 def linear_sum_assignment(cost_matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
     """
-    Lightweight greedy matcher used as a drop-in for scipy.optimize.linear_sum_assignment.
+    Exact drop-in for scipy.optimize.linear_sum_assignment (minimisation).
 
-    This is not a full Hungarian implementation but is sufficient for associating the
-    modest-sized cost matrices produced by the sperm tracker (number of tracks vs detections).
+    Uses the Jonker-Volgenant style shortest augmenting path algorithm (as in
+    Crouse, "On implementing 2D rectangular assignment algorithms", 2016), with the
+    per-column relaxation and minimum search vectorised in NumPy.
+
+    Rectangular matrices are supported. Infinite or NaN entries mark forbidden pairs:
+    unlike scipy, such matrices do not raise; the result is a minimum-cost assignment
+    among the maximum number of allowed pairs and forbidden pairs are omitted.
+    Returned row indices are sorted ascending.
+    """
+    cost = np.array(cost_matrix, dtype=np.float64)
+    if cost.ndim != 2:
+        raise ValueError("cost_matrix must be 2-dimensional")
+    if np.isneginf(cost).any():
+        raise ValueError("cost_matrix contains -inf")
+
+    rows, cols = cost.shape
+    empty = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    if rows == 0 or cols == 0:
+        return empty
+
+    allowed = np.isfinite(cost)
+    if not allowed.any():
+        return empty
+    if rows == 1 or cols == 1:
+        # A single row or column: the optimum is simply the cheapest allowed pair
+        flat = np.where(allowed, cost, np.inf).ravel()
+        k = int(np.argmin(flat))
+        return np.array([k // cols], dtype=np.int64), np.array([k % cols], dtype=np.int64)
+    if not allowed.all():
+        # Replace forbidden pairs by a finite "big" cost larger than any possible difference
+        # in the finite part, so the solver first maximises the number of allowed pairs and
+        # then minimises their total cost
+        finite = cost[allowed]
+        big = finite.max() + (finite.max() - finite.min() + 1.0) * min(rows, cols)
+        cost[~allowed] = big
+
+    transposed = rows > cols
+    if transposed:
+        cost = cost.T
+    row_ind, col_ind = _shortest_augmenting_path(cost)
+    if transposed:
+        row_ind, col_ind = col_ind, row_ind
+        order = np.argsort(row_ind)
+        row_ind, col_ind = row_ind[order], col_ind[order]
+
+    keep = allowed[row_ind, col_ind]
+    return row_ind[keep], col_ind[keep]
+
+
+def _shortest_augmenting_path(cost: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Optimal assignment for a finite cost matrix with rows <= cols, one augmenting path per row."""
+    nr, nc = cost.shape
+    u = np.zeros(nr)
+    v = np.zeros(nc)
+    col4row = np.full(nr, -1, dtype=np.int64)
+    row4col = np.full(nc, -1, dtype=np.int64)
+    all_cols = np.arange(nc)
+
+    for cur_row in range(nr):
+        shortest = np.full(nc, np.inf)
+        path = np.full(nc, -1, dtype=np.int64)
+        visited_rows = np.zeros(nr, dtype=bool)
+        visited_cols = np.zeros(nc, dtype=bool)
+
+        min_val = 0.0
+        i = cur_row
+        sink = -1
+        while sink == -1:
+            visited_rows[i] = True
+
+            # Relax reduced path lengths to every unvisited column through row i
+            reduced = min_val + cost[i] - u[i] - v
+            better = ~visited_cols & (reduced < shortest)
+            path[better] = i
+            shortest[better] = reduced[better]
+
+            candidates = np.where(visited_cols, np.inf, shortest)
+            lowest = candidates.min()
+            if not np.isfinite(lowest):
+                raise ValueError("cost matrix is infeasible")
+            ties = all_cols[candidates == lowest]
+            free = ties[row4col[ties] == -1]
+            j = int(free[0]) if len(free) else int(ties[0])
+
+            min_val = lowest
+            visited_cols[j] = True
+            if row4col[j] == -1:
+                sink = j
+            else:
+                i = int(row4col[j])
+
+        # Update dual variables
+        u[cur_row] += min_val
+        others = visited_rows.copy()
+        others[cur_row] = False
+        u[others] += min_val - shortest[col4row[others]]
+        v[visited_cols] -= min_val - shortest[visited_cols]
+
+        # Augment along the alternating path back to cur_row
+        j = sink
+        while True:
+            i = int(path[j])
+            row4col[j] = i
+            col4row[i], j = j, int(col4row[i])
+            if i == cur_row:
+                break
+
+    return np.arange(nr, dtype=np.int64), col4row
+
+
+def greedy_assignment(cost_matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Greedy matcher: repeatedly takes the globally cheapest remaining pair.
+
+    Kept as a baseline for benchmarks; it is not optimal and can swap identities
+    when objects are close together.
     """
     cost = np.asarray(cost_matrix, dtype=np.float64)
     if cost.ndim != 2:
@@ -46,4 +160,3 @@ def linear_sum_assignment(cost_matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarr
         remaining_cols.remove(c)
 
     return np.array(row_ind, dtype=np.int64), np.array(col_ind, dtype=np.int64)
-
@@ -0,0 +1,229 @@
+"""
+流水线化的视频推理：解码 / 预处理 / 推理 / 跟踪分阶段并行。
+
+逐帧模式下 cap.read() 解码、letterbox、前向、NMS 与 Python 跟踪器依次在一个线程里执行，
+解码时其余核心空闲。FramePipeline 把它们拆成：
+- 解码线程：顺序读取视频帧；
+- 预处理线程池：letterbox + HWC->CHW，模型要求 RGB 输入时再做 BGR->RGB；
+- 推理线程：按 batch_size 堆叠、前向、NMS；
+- 跟踪消费者：调用方线程按帧序迭代结果。
+各阶段之间使用有界队列做背压，帧序始终保持不变。
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import torch
+
+from frame_preprocess import StaticFrameGate
+from models.common import InputFormat
+from utils.augmentations import letterbox
+
+# 队列结束标记
+_DONE = object()
+
+
+def grab_frames(cap: cv2.VideoCapture, count: int) -> int:
+    """用 cap.grab() 跳过 count 帧 (只解复用、不解码)，返回实际跳过的帧数。"""
+    for skipped in range(count):
+        if not cap.grab():
+            return skipped
+    return count
+
+
+class StageStats:
+    """单个阶段的处理帧数与忙碌时间，用于找出瓶颈阶段。"""
+
+    def __init__(self) -> None:
+        self.frames = 0
+        self.busy_s = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, frames: int, seconds: float) -> None:
+        with self._lock:
+            self.frames += frames
+            self.busy_s += seconds
+
+    def as_dict(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "frames": self.frames,
+                "busy_s": round(self.busy_s, 4),
+                "fps": round(self.frames / self.busy_s, 2) if self.busy_s > 0 else 0.0,
+            }
+
+
+class FramePipeline:
+    """
+    以流水线方式遍历一个视频的检测结果。
+
+    迭代产出 (frame_idx, 网络输入 HW 尺寸, 原图, NMS 后检测张量)，顺序与视频帧序一致。
+    infer 接收 (B, 3, H, W) 的 uint8 张量，返回长度为 B 的检测列表。
+    input_format 为模型的输入约定 (DetectMultiBackend.input_format)，决定送入 infer 的通道顺序；
+    是否除以 255 由 infer 按同一约定处理。
+    frame_stride > 1 时每 frame_stride 帧只解码一帧，其余用 grab 跳过；产出的 frame_idx 为原视频帧号。
+    static_gate 若提供，解码线程判定为静止的帧不做预处理与推理，产出的输入尺寸与检测均为 None。
+    """
+
+    def __init__(
+        self,
+        cap: cv2.VideoCapture,
+        infer: Callable[[torch.Tensor], List[torch.Tensor]],
+        imgsz: int,
+        stride: int,
+        auto: bool,
+        batch_size: int = 1,
+        preprocess_workers: int = 2,
+        queue_size: int = 32,
+        input_format: InputFormat = InputFormat("RGB", True),
+        frame_stride: int = 1,
+        static_gate: Optional[StaticFrameGate] = None,
+    ) -> None:
+        if input_format.channels not in ("RGB", "BGR"):
+            raise ValueError(f"不支持的模型输入通道顺序：{input_format.channels!r}")
+        self.cap = cap
+        self.infer = infer
+        self.imgsz = imgsz
+        self.stride = stride
+        self.auto = auto
+        self.batch_size = max(1, batch_size)
+        self.preprocess_workers = max(1, preprocess_workers)
+        self.queue_size = max(self.batch_size, queue_size)
+        self.input_format = input_format
+        self.frame_stride = max(1, frame_stride)
+        self.static_gate = static_gate
+        self.stats: Dict[str, StageStats] = {
+            name: StageStats() for name in ("decode", "preprocess", "inference", "tracking")
+        }
+        self._stop = threading.Event()
+
+    def _preprocess(self, im0: np.ndarray) -> np.ndarray:
+        t0 = time.perf_counter()
+        im = letterbox(im0, self.imgsz, stride=self.stride, auto=self.auto)[0]
+        im = im.transpose((2, 0, 1))  # HWC to CHW
+        if self.input_format.channels == "RGB":
+            im = im[::-1]  # BGR to RGB
+        im = np.ascontiguousarray(im)
+        self.stats["preprocess"].record(1, time.perf_counter() - t0)
+        return im
+
+    def _put(self, q: queue.Queue, item) -> bool:
+        """带停止检查的阻塞 put，消费者提前退出时不会卡死生产者。"""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue):
+        """带停止检查的阻塞 get，停止时返回 None。"""
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return None
+
+    def _decode(self, pool: ThreadPoolExecutor, out: queue.Queue) -> None:
+        frame_idx = 0
+        try:
+            while not self._stop.is_set():
+                t0 = time.perf_counter()
+                ok, im0 = self.cap.read()
+                if not ok:
+                    break
+                grab_frames(self.cap, self.frame_stride - 1)
+                self.stats["decode"].record(1, time.perf_counter() - t0)
+                if self.static_gate is not None and self.static_gate.is_static(im0):
+                    future = None
+                else:
+                    future = pool.submit(self._preprocess, im0)
+                if not self._put(out, (frame_idx, future, im0)):
+                    return
+                frame_idx += self.frame_stride
+        except Exception as exc:
+            self._put(out, exc)
+            return
+        self._put(out, _DONE)
+
+    def _inference(self, inp: queue.Queue, out: queue.Queue) -> None:
+        pending: List[Tuple[int, np.ndarray, np.ndarray]] = []
+
+        def flush() -> bool:
+            if not pending:
+                return True
+            t0 = time.perf_counter()
+            images = torch.from_numpy(np.stack([im for _, im, _ in pending]))
+            dets = self.infer(images)
+            self.stats["inference"].record(len(pending), time.perf_counter() - t0)
+            shape = images.shape[2:]
+            for (frame_idx, _, im0), det in zip(pending, dets):
+                if not self._put(out, (frame_idx, shape, im0, det)):
+                    return False
+            pending.clear()
+            return True
+
+        try:
+            while True:
+                item = self._get(inp)
+                if item is None:
+                    return
+                if item is _DONE or isinstance(item, Exception):
+                    if flush():
+                        self._put(out, item)
+                    return
+                frame_idx, future, im0 = item
+                if future is None:
+                    # 静止帧：先交出之前缓冲的帧以保持帧序
+                    if not flush() or not self._put(out, (frame_idx, None, im0, None)):
+                        return
+                    continue
+                im = future.result()
+                if pending and pending[0][1].shape != im.shape:
+                    if not flush():
+                        return
+                pending.append((frame_idx, im, im0))
+                if len(pending) >= self.batch_size and not flush():
+                    return
+        except Exception as exc:
+            self._put(out, exc)
+
+    def __iter__(self) -> Iterator[Tuple[int, torch.Size, np.ndarray, torch.Tensor]]:
+        decoded: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        detected: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        pool = ThreadPoolExecutor(max_workers=self.preprocess_workers, thread_name_prefix="pipeline-pre")
+        threads = [
+            threading.Thread(target=self._decode, args=(pool, decoded), name="pipeline-decode", daemon=True),
+            threading.Thread(target=self._inference, args=(decoded, detected), name="pipeline-infer", daemon=True),
+        ]
+        for t in threads:
+            t.start()
+
+        try:
+            while True:
+                item = detected.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                t0 = time.perf_counter()
+                yield item
+                self.stats["tracking"].record(1, time.perf_counter() - t0)
+        finally:
+            self._stop.set()
+            for t in threads:
+                t.join()
+            pool.shutdown(wait=True)
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """各阶段吞吐；fps 最低的阶段即瓶颈。"""
+        return {name: stats.as_dict() for name, stats in self.stats.items()}
@@ -4,7 +4,13 @@
 实现思路：
 - 使用 YOLOv5 (DetectMultiBackend) 对视频逐帧检测。
 - 基于检测到的框中心，通过匈牙利算法 (内部实现的 linear_sum_assignment) 将相邻帧目标关联成轨迹。
-- 轨迹允许短暂的丢失 (max_age)，超过阈值自动终止。
+- 轨迹以列式表 (track_store.TrackTable) 保存，逐帧更新 / 老化 / 清理均为向量化操作。
+- 轨迹允许短暂的丢失 (max_age)，超过阈值自动终止并移入归档。
+- 速度统计随轨迹更新在线累积 (speed_stats)，中位数 / p90 / p99 由可合并的分位数草图估计。
+- 可选只在关键帧上检测，关键帧之间用光流传播检测中心 (keyframe_flow)。
+- 可选只对运动区域与现存轨迹附近的窗口推理 (motion_roi)，运动面积过大时回退整帧推理。
+- 高分辨率视频可按原分辨率切成重叠窗口整批推理 (tiled)，避免小目标被缩小到只剩几个像素。
+- 画面静止的帧 (与上次推理的帧差很小) 可跳过推理，轨迹保持不变。
 - 依据视频帧率计算像素速度，可选像素尺寸换算物理速度。
 - 结果输出为 JSON，包含每条轨迹的速度片段以及整体统计。
 
@@ -16,93 +22,209 @@ from __future__ import annotations
 import argparse
 import json
 import math
-from dataclasses import dataclass, field, asdict
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 
 import cv2
 import numpy as np
 import torch
 from tqdm import tqdm
 
+from early_stop import END_OF_VIDEO, ConvergenceMonitor, EarlyStop
+from frame_batcher import FrameBatcher
+from frame_preprocess import StaticFrameGate, VideoPreprocessor
+from keyframe_flow import KeyframePropagator
+from motion_roi import MotionProposer
 from models.common import DetectMultiBackend
 from utils.datasets import LoadImages
-from utils.general import LOGGER, check_img_size, non_max_suppression, scale_coords
+from utils.general import (
+    LOGGER,
+    batched_non_max_suppression,
+    check_img_size,
+    clip_coords,
+    non_max_suppression,
+    scale_coords,
+)
 from utils.matching import linear_sum_assignment
+from speed_stats import stats_dict
+from tiling import crop_tiles, grid_windows, merge_tile_detections, scale_matched_tile
+from track_store import TrackArchive, TrackTable, group_segments, save_segments
 from utils.torch_utils import select_device
+from video_pipeline import FramePipeline, grab_frames
 
 
-@dataclass
-class Track:
-    track_id: int
-    class_id: int
-    class_name: str
-    last_frame: int
-    last_center: Tuple[float, float]
-    segments: List[Dict[str, float]] = field(default_factory=list)
-    speed_px_history: List[float] = field(default_factory=list)
-    speed_physical_history: List[float] = field(default_factory=list)
-    time_since_update: int = 0
-    emit_segments: bool = False
-
-    def update(
-        self,
-        frame_idx: int,
-        center: Tuple[float, float],
-        fps: float,
-        pixel_size: float,
-    ) -> None:
-        dt = frame_idx - self.last_frame
-        if dt <= 0:
-            dt = 1  # 避免异常
-        distance = math.hypot(center[0] - self.last_center[0], center[1] - self.last_center[1])
-        speed_px = distance * fps / dt
-        speed_phys = speed_px * pixel_size
-        if self.emit_segments:
-            self.segments.append(
-                {
-                    "start_frame": self.last_frame,
-                    "end_frame": frame_idx,
-                    "speed_px_per_s": speed_px,
-                    "speed_physical_per_s": speed_phys,
-                }
-            )
-        self.speed_px_history.append(speed_px)
-        self.speed_physical_history.append(speed_phys)
-        self.last_frame = frame_idx
-        self.last_center = center
-        self.time_since_update = 0
+def detection_centers(boxes: np.ndarray) -> np.ndarray:
+    """(m, 4) xyxy 检测框的中心组成的 (m, 2) 连续数组，保持检测框原有精度。"""
+    boxes = np.asarray(boxes).reshape(-1, 4)
+    return np.ascontiguousarray((boxes[:, :2] + boxes[:, 2:4]) / 2.0)
+
+
+def pairwise_distances(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """一次广播计算 (n, 2) 与 (m, 2) 点集之间的欧氏距离矩阵，返回 float32 (n, m)。"""
+    diff = a[:, None, :].astype(np.float64) - b[None, :, :]
+    return np.hypot(diff[..., 0], diff[..., 1]).astype(np.float32)
+
+
+def gated_pairs(
+    track_xy: np.ndarray,
+    det_xy: np.ndarray,
+    max_distance: float,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    用边长为 max_distance 的均匀网格索引检测中心，只为每条轨迹评估相邻 3x3 网格内的检测。
+
+    返回距离不超过 max_distance 的 (轨迹下标, 检测下标, 距离) 三个等长数组。
+    """
+    det_cells = np.floor(det_xy / max_distance).astype(np.int64)
+    trk_cells = np.floor(track_xy / max_distance).astype(np.int64)
+    lo = np.minimum(det_cells.min(0), trk_cells.min(0)) - 1
+    span = np.maximum(det_cells.max(0), trk_cells.max(0)) - lo + 2
+
+    def cell_key(cells: np.ndarray) -> np.ndarray:
+        return (cells[:, 0] - lo[0]) * span[1] + (cells[:, 1] - lo[1])
+
+    det_keys = cell_key(det_cells)
+    order = np.argsort(det_keys, kind="stable")
+    sorted_keys = det_keys[order]
+
+    t_parts, d_parts = [], []
+    track_ids = np.arange(len(track_xy))
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            keys = cell_key(trk_cells + np.array([dx, dy]))
+            start = np.searchsorted(sorted_keys, keys, side="left")
+            counts = np.searchsorted(sorted_keys, keys, side="right") - start
+            total = int(counts.sum())
+            if not total:
+                continue
+            offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            t_parts.append(np.repeat(track_ids, counts))
+            d_parts.append(order[np.repeat(start, counts) + offsets])
+
+    if not t_parts:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0, dtype=np.float32)
+    t_idx = np.concatenate(t_parts)
+    d_idx = np.concatenate(d_parts)
+    diff = track_xy[t_idx].astype(np.float64) - det_xy[d_idx]
+    dist = np.hypot(diff[:, 0], diff[:, 1]).astype(np.float32)
+    keep = dist <= max_distance
+    return t_idx[keep], d_idx[keep], dist[keep]
+
+
+def connected_components(n_tracks: int, n_dets: int, t_idx: np.ndarray, d_idx: np.ndarray) -> np.ndarray:
+    """
+    轨迹-检测二部图的连通分量，返回每条边所属分量的标签。
+
+    节点编号：轨迹为 [0, n_tracks)，检测为 [n_tracks, n_tracks + n_dets)。
+    采用向量化的最小标签传播 + 指针跳跃，迭代次数与分量直径的对数同阶。
+    """
+    labels = np.arange(n_tracks + n_dets)
+    d_nodes = d_idx + n_tracks
+    while True:
+        edge_min = np.minimum(labels[t_idx], labels[d_nodes])
+        new = labels.copy()
+        np.minimum.at(new, t_idx, edge_min)
+        np.minimum.at(new, d_nodes, edge_min)
+        new = new[new]
+        if np.array_equal(new, labels):
+            return labels[t_idx]
+        labels = new
+
+
+# 轨迹数 x 检测数不超过该值时，门控关联直接求解一次屏蔽了超距配对的稠密代价矩阵：
+# 网格索引、连通分量与逐分量求解的固定开销在约 300 个目标以内高于一次稠密求解 (见 benchmarks.py gating)
+GATED_MIN_PAIRS = 300 * 300
 
 
 def associate_detections_to_tracks(
-    tracks: List[Track],
-    detections: List[Tuple[np.ndarray, int]],
+    track_xy: np.ndarray,
+    det_xy: np.ndarray,
     max_distance: float,
+    gated: bool = True,
 ) -> Tuple[List[Tuple[int, int]], List[int], List[int]]:
     """
-    按检测结果与现有轨迹计算匹配。
+    按检测中心与现有轨迹最后位置计算匹配。
 
-    detections: list of (bbox_xyxy, class_id)
+    track_xy: (n, 2) 轨迹中心；det_xy: (m, 2) 检测中心。
+    gated 为 True 时只允许距离不超过 max_distance 的配对：规模较大时 (n * m > GATED_MIN_PAIRS)
+    用网格空间索引建边，把稀疏二部图拆成连通分量分别求最优指派，否则把超距配对设为不可行后
+    一次求解；gated 为 False 时求解完整的稠密代价矩阵，再丢弃超距的配对。
     """
-    if not tracks or not detections:
+    n_tracks, n_dets = len(track_xy), len(det_xy)
+    if not n_tracks or not n_dets:
         matched = []
-        unmatched_tracks = list(range(len(tracks)))
-        unmatched_dets = list(range(len(detections)))
+        unmatched_tracks = list(range(n_tracks))
+        unmatched_dets = list(range(n_dets))
         return matched, unmatched_tracks, unmatched_dets
 
-    cost = np.full((len(tracks), len(detections)), fill_value=max_distance + 1, dtype=np.float32)
-    det_centers = [
-        ((bbox[0] + bbox[2]) / 2.0, (bbox[1] + bbox[3]) / 2.0) for bbox, _ in detections
-    ]
+    if not gated or max_distance <= 0:
+        return _associate_dense(track_xy, det_xy, max_distance)
+    if n_tracks * n_dets <= GATED_MIN_PAIRS:
+        return _associate_masked(track_xy, det_xy, max_distance)
+    return _associate_gated(track_xy, det_xy, max_distance)
+
+
+def _unmatched(
+    n_tracks: int, n_dets: int, matched: List[Tuple[int, int]]
+) -> Tuple[List[Tuple[int, int]], List[int], List[int]]:
+    matched_tracks = {t for t, _ in matched}
+    matched_dets = {d for _, d in matched}
+    unmatched_tracks = [i for i in range(n_tracks) if i not in matched_tracks]
+    unmatched_dets = [i for i in range(n_dets) if i not in matched_dets]
+    return matched, unmatched_tracks, unmatched_dets
+
+
+def _associate_gated(
+    track_xy: np.ndarray,
+    det_xy: np.ndarray,
+    max_distance: float,
+) -> Tuple[List[Tuple[int, int]], List[int], List[int]]:
+    n_tracks, n_dets = len(track_xy), len(det_xy)
+    t_idx, d_idx, dist = gated_pairs(track_xy, det_xy, max_distance)
+    matched: List[Tuple[int, int]] = []
+    if len(t_idx):
+        labels = connected_components(n_tracks, n_dets, t_idx, d_idx)
+        order = np.argsort(labels, kind="stable")
+        t_idx, d_idx, dist, labels = t_idx[order], d_idx[order], dist[order], labels[order]
+        bounds = np.flatnonzero(np.diff(labels)) + 1
+        for start, end in zip(np.r_[0, bounds], np.r_[bounds, len(labels)]):
+            if end - start == 1:
+                # 孤立的单条边无需求解
+                matched.append((int(t_idx[start]), int(d_idx[start])))
+                continue
+            rows, t_local = np.unique(t_idx[start:end], return_inverse=True)
+            cols, d_local = np.unique(d_idx[start:end], return_inverse=True)
+            cost = np.full((len(rows), len(cols)), np.inf, dtype=np.float32)
+            cost[t_local, d_local] = dist[start:end]
+            r, c = linear_sum_assignment(cost)
+            matched.extend((int(rows[i]), int(cols[j])) for i, j in zip(r, c))
+    return _unmatched(n_tracks, n_dets, matched)
 
-    for t_idx, track in enumerate(tracks):
-        for d_idx, center in enumerate(det_centers):
-            dist = math.hypot(center[0] - track.last_center[0], center[1] - track.last_center[1])
-            cost[t_idx, d_idx] = dist
 
+def _associate_masked(
+    track_xy: np.ndarray,
+    det_xy: np.ndarray,
+    max_distance: float,
+) -> Tuple[List[Tuple[int, int]], List[int], List[int]]:
+    cost = pairwise_distances(track_xy, det_xy)
+    cost[cost > max_distance] = np.inf
     row_ind, col_ind = linear_sum_assignment(cost)
+    matched = [(int(r), int(c)) for r, c in zip(row_ind, col_ind)]
+    return _unmatched(len(track_xy), len(det_xy), matched)
+
+
+def _associate_dense(
+    track_xy: np.ndarray,
+    det_xy: np.ndarray,
+    max_distance: float,
+) -> Tuple[List[Tuple[int, int]], List[int], List[int]]:
+    cost = pairwise_distances(track_xy, det_xy)
 
-    matched, unmatched_tracks, unmatched_dets = [], set(range(len(tracks))), set(range(len(detections)))
+    row_ind, col_ind = linear_sum_assignment(cost)
+
+    matched, unmatched_tracks, unmatched_dets = [], set(range(len(track_xy))), set(range(len(det_xy)))
     for r, c in zip(row_ind, col_ind):
         if cost[r, c] <= max_distance:
             matched.append((r, c))
@@ -112,30 +234,89 @@ def associate_detections_to_tracks(
     return matched, list(unmatched_tracks), list(unmatched_dets)
 
 
-def summarize_tracks(tracks: List[Track]) -> Dict[str, float]:
-    pixel_speeds = [s for t in tracks for s in t.speed_px_history]
-    physical_speeds = [s for t in tracks for s in t.speed_physical_history]
-    if not pixel_speeds:
+def summarize_tracks(summary: Dict[str, np.ndarray], index: int, pixel_size: float) -> Dict[str, Dict[str, float]]:
+    """
+    由流式统计摘要 (SpeedStatsTable.summaries 的第 index 行) 给出像素与物理速度统计；
+    无样本时返回空字典。min/max/mean/分位数均随 pixel_size 线性缩放。
+    """
+    pixel_stats = stats_dict(summary, index)
+    if pixel_stats is None:
         return {}
-
-    def _stats(values: List[float]) -> Dict[str, float]:
-        vals = sorted(values)
-        n = len(vals)
-        median = vals[n // 2] if n % 2 == 1 else (vals[n // 2 - 1] + vals[n // 2]) / 2
-        return {
-            "count": n,
-            "min": vals[0],
-            "max": vals[-1],
-            "mean": float(sum(vals) / n),
-            "median": float(median),
-        }
-
     return {
-        "pixel_speed_stats": _stats(pixel_speeds),
-        "physical_speed_stats": _stats(physical_speeds),
+        "pixel_speed_stats": pixel_stats,
+        "physical_speed_stats": stats_dict(summary, index, pixel_size),
     }
 
 
+def rescale_payload(payload: Dict, pixel_size: float) -> Dict:
+    """
+    按新的 pixel_size 重新换算 detect_and_track 输出中的物理速度，无需重新推理。
+
+    物理速度 = 像素速度 * pixel_size，min/max/mean/median 均随之线性缩放，
+    因此直接由像素空间的统计与逐段速度推导。返回新字典，不修改入参。
+    """
+    if not pixel_size > 0:
+        raise ValueError(f"pixel_size 必须为正数，当前为 {pixel_size}")
+
+    def _scaled(stats: Optional[Dict[str, float]]) -> Optional[Dict[str, float]]:
+        if stats is None:
+            return None
+        return {k: (v if k == "count" else v * pixel_size) for k, v in stats.items()}
+
+    result = dict(payload)
+    result["pixel_size"] = pixel_size
+    summary = payload.get("summary") or {}
+    if summary:
+        result["summary"] = dict(summary, physical_speed_stats=_scaled(summary.get("pixel_speed_stats")))
+
+    tracks = []
+    for track in payload.get("tracks") or []:
+        track = dict(track, speed_physical_stats=_scaled(track.get("speed_px_stats")))
+        if "segments" in track:
+            track["segments"] = [
+                dict(seg, speed_physical_per_s=seg["speed_px_per_s"] * pixel_size) for seg in track["segments"]
+            ]
+        tracks.append(track)
+    result["tracks"] = tracks
+    return result
+
+
+@dataclass
+class LoadedModel:
+    """
+    已加载、完成融合与输入尺寸校验的检测模型。
+
+    可在多次 detect_and_track 调用之间复用，避免重复 torch.load / Conv+BN 融合。
+    """
+
+    model: DetectMultiBackend
+    device: torch.device
+    imgsz: int
+    stride: int
+    names: List[str]
+    pt: bool
+
+
+def load_model(
+    weights: Path, device: str, imgsz: int, fold_input: bool = False, candidate_conf: Optional[float] = None
+) -> LoadedModel:
+    """
+    加载并预热模型。
+
+    fold_input 为 True 时把 1/255 缩放与 BGR->RGB 折叠进首层卷积权重，
+    模型直接接收 BGR 原始像素 (见 DetectMultiBackend.input_format)。
+    candidate_conf 若提供，检测头先按目标置信度的 logit 过滤锚框，只解码留下的候选
+    (见 DetectMultiBackend.set_candidate_conf)；之后的 NMS 置信度阈值不能低于该值。
+    """
+    torch_device = select_device(device)
+    model = DetectMultiBackend(weights, device=torch_device, fold_input=fold_input, candidate_conf=candidate_conf)
+    stride, names, pt = model.stride, model.names, model.pt
+    imgsz = check_img_size(imgsz, s=stride)
+    model.warmup(imgsz=(1, 3, imgsz, imgsz))
+    return LoadedModel(model=model, device=torch_device, imgsz=imgsz, stride=stride, names=names, pt=pt)
+
+
+@torch.inference_mode()
 def detect_and_track(
     weights: Path,
     source: Path,
@@ -150,12 +331,96 @@ def detect_and_track(
     output: Path,
     emit_segments: bool,
     preview_path: Optional[Path] = None,
-) -> None:
-    device = select_device(device)
-    model = DetectMultiBackend(weights, device=device)
-    stride, names, pt = model.stride, model.names, model.pt
-    imgsz = check_img_size(imgsz, s=stride)
-    
+    model: Optional[LoadedModel] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+    batcher: Optional[FrameBatcher] = None,
+    batch_size: int = 1,
+    pipeline: bool = False,
+    preprocess_workers: int = 2,
+    spill_after: Optional[int] = None,
+    spill_dir: Optional[Path] = None,
+    segments_path: Optional[Path] = None,
+    preallocate: bool = False,
+    fold_input: bool = False,
+    frame_stride: int = 1,
+    target_fps: Optional[float] = None,
+    early_stop: Optional[EarlyStop] = None,
+    static_threshold: Optional[float] = None,
+    keyframe_interval: Optional[int] = None,
+    motion_roi: bool = False,
+    roi_tile: Optional[int] = None,
+    roi_overlap: int = 64,
+    roi_native: bool = False,
+    tiled: bool = False,
+    tile_overlap: int = 128,
+    early_filter: bool = False,
+) -> Dict:
+    """
+    逐帧检测并跟踪，结果写入 output 并返回同一字典。
+
+    传入已加载的 model 时直接复用，weights/imgsz/device/fold_input 以 model 为准。
+    推理不记录梯度 (torch.inference_mode，流水线的推理线程同样如此)，未剥离优化器的原始检查点也可直接使用。
+    early_filter 为 True 时按 conf_thres 加载模型 (见 load_model 的 candidate_conf)：检测头只解码
+    目标置信度超过阈值的锚框，NMS 直接处理紧凑的候选张量，结果不变。
+    各路径的预处理都按模型的输入约定 (model.input_format) 决定通道顺序与是否除以 255。
+    frame_stride > 1 时每 frame_stride 帧只分析一帧，其余帧用 cap.grab() 跳过而不解码；
+    target_fps 若提供，按视频帧率换算出 frame_stride (覆盖 frame_stride)。
+    速度按真实帧号之差计算，仍为每秒物理速度；max_age (单位为原视频帧) 换算为被分析帧数，
+    max_distance 按步长放大。输出记录 frame_stride 与实际采样率 analysis_fps。
+    early_stop 若提供，平均速度与类别比例的置信区间收敛或预算用尽时停止解码 (见 early_stop)；
+    输出的 stop_reason / frames_used / frames_analyzed 记录停止原因与实际使用的帧，
+    stopped_early 标记是否在视频结束前停止 (消费方据此外推计数，无需比较 stop_reason 字符串)。
+    static_threshold 若提供，各路径在推理前把帧缩成灰度缩略图，与上次推理的帧平均绝对差低于
+    该值 (0-255) 时跳过推理 (见 frame_preprocess.StaticFrameGate)：上一次的检测仍然有效，
+    轨迹保持不动也不老化，下次推理时按真实帧号之差计算速度；输出的 static_skip 记录节省的推理次数。
+    keyframe_interval 若提供，只在关键帧上推理，关键帧之间由下采样灰度图上的 Lucas-Kanade 光流
+    传播上一帧的检测中心交给跟踪 (见 keyframe_flow)；关键帧间隔在 [1, keyframe_interval] 内
+    随光流误差自适应，输出的 keyframes 记录关键帧比例与传播误差。该模式逐帧推理，
+    不能与 pipeline / preallocate / batch_size > 1 同时使用。
+    motion_roi 为 True 时由滑动平均背景提议运动区域 (见 motion_roi)，只把与运动区域或现存轨迹
+    相交的 roi_tile x roi_tile 窗口 (原图像素，相邻重叠 roi_overlap) 整批推理，检测经 scale_coords
+    映射回原图并跨窗口去重 (见 tiling)；背景未稳定、定期刷新或运动面积过大时整帧推理。
+    窗口默认按整帧 letterbox 的比例缩放 (见 tiling.scale_matched_tile)，两种推理中目标尺寸一致，
+    切换时检测与速度不会跳变；roi_tile 默认对应 imgsz / 2 的网络输入。roi_native 为 True 时
+    窗口按原分辨率推理 (roi_tile 默认 imgsz)，小目标召回更高，但与整帧推理中的目标尺寸不同，
+    仅在视频分辨率接近 imgsz 或能接受该差异时使用。输出的 motion_roi 记录裁剪推理的帧数、
+    平均窗口数与窗口尺寸。同样逐帧推理，且不能与 batcher 同时使用。
+    tiled 为 True 时整帧按原分辨率切成 imgsz x imgsz、相邻重叠 tile_overlap 的窗口，一次前向处理
+    全部窗口；non_max_suppression 把检测平移回原图，丢弃贴着窗口内部边界的截断框并统一去重
+    (tile_overlap 应大于最大目标尺寸)。适合 4K 显微视频，限制与 motion_roi 相同，且二者互斥。
+    progress 若提供，开始处理时以 (0, 总帧数) 调用一次，之后每处理完一帧以 (已处理帧数, 总帧数) 调用一次。
+    batcher 若提供，推理与 NMS 交由其与其他视频的帧合批执行，帧按固定尺寸 letterbox。
+    batch_size > 1 时本视频每攒够 batch_size 帧做一次前向与 NMS，跟踪仍按帧序进行，
+    输出与逐帧模式一致。
+    pipeline 为 True 时解码、预处理、推理与跟踪分线程流水执行 (见 video_pipeline)，
+    各阶段吞吐写入输出的 pipeline_stats。
+    preallocate 为 True 时 (非流水线模式) 直接从视频解码，预处理写入按首帧尺寸预分配的缓冲区
+    与输入张量 (见 frame_preprocess.VideoPreprocessor)，预热后每帧不再分配内存。
+    超过 max_age 的轨迹移入列式归档 (见 track_store.TrackArchive)，最终统计覆盖全部轨迹；
+    逐段速度只在 emit_segments 时记录；spill_after 若提供，归档段数达到该值即写入
+    spill_dir (默认系统临时目录) 下的临时文件。
+    segments_path 若与 emit_segments 同时提供，逐段速度以列式 .npz 写入该路径
+    (见 track_store.save_segments，可内存映射读取)，JSON 中只记录 segments_file。
+    """
+    if keyframe_interval is not None and (pipeline or preallocate or batch_size > 1):
+        raise ValueError("keyframe_interval 需要逐帧推理，不能与 pipeline / preallocate / batch_size > 1 同时使用")
+    for name, enabled in (("motion_roi", motion_roi), ("tiled", tiled)):
+        if enabled and (pipeline or preallocate or batch_size > 1 or batcher is not None):
+            raise ValueError(f"{name} 需要逐帧推理，不能与 pipeline / preallocate / batch_size > 1 / batcher 同时使用")
+    if motion_roi and tiled:
+        raise ValueError("motion_roi 与 tiled 不能同时使用")
+    candidate_conf = conf_thres if early_filter else None
+    loaded = (
+        model
+        if model is not None
+        else load_model(weights, device, imgsz, fold_input=fold_input, candidate_conf=candidate_conf)
+    )
+    if loaded.model.candidate_conf is not None and loaded.model.candidate_conf > conf_thres:
+        raise ValueError(f"模型已按 {loaded.model.candidate_conf} 过滤候选，conf_thres={conf_thres} 不能更低")
+    model, device, imgsz = loaded.model, loaded.device, loaded.imgsz
+    stride, names, pt = loaded.stride, loaded.names, loaded.pt
+    input_format = model.input_format
+
     # 调试：输出模型类别名称
     print("\n" + "="*60)
     print("=== DEBUG: 模型类别信息 ===")
@@ -163,7 +428,9 @@ def detect_and_track(
     print(f"类别数量: {len(names)}")
     print("="*60 + "\n")
 
-    dataset = LoadImages(str(source), img_size=imgsz, stride=stride, auto=pt)
+    # 合批推理要求各视频帧形状一致，关闭按视频长宽比的最小填充
+    auto = pt and batcher is None
+    dataset = LoadImages(str(source), img_size=imgsz, stride=stride, auto=auto, channels=input_format.channels)
     if not any(dataset.video_flag):
         raise ValueError("当前脚本仅支持单个视频源。请提供视频文件路径。")
 
@@ -172,12 +439,46 @@ def detect_and_track(
         LOGGER.warning("视频 FPS 未获取到，使用默认 30.")
         fps = 30.0
 
-    tracks: List[Track] = []
-    next_track_id = 0
+    if target_fps is not None:
+        if not target_fps > 0:
+            raise ValueError(f"target_fps 必须为正数，当前为 {target_fps}")
+        frame_stride = round(fps / target_fps)
+    frame_stride = max(1, int(frame_stride))
+    # 相邻被分析帧相隔 frame_stride 帧：允许丢失的帧数按被分析帧计，匹配距离随间隔放大
+    track_max_age = max(1, math.ceil(max_age / frame_stride)) if frame_stride > 1 else max_age
+    track_max_distance = max_distance * frame_stride
+    total_steps = -(-dataset.frames // frame_stride)
+
+    static_gate = StaticFrameGate(static_threshold) if static_threshold is not None else None
+    propagator = KeyframePropagator(keyframe_interval) if keyframe_interval is not None else None
+    proposer: Optional[MotionProposer] = None
+    roi_input: Optional[int] = None
 
-    model.warmup(imgsz=(1 if pt else 1, 3, imgsz, imgsz))
+    def start_motion_roi(frame_shape: Tuple[int, int]) -> MotionProposer:
+        """按帧尺寸确定 ROI 窗口与网络输入尺寸，创建运动区域提议器。"""
+        nonlocal roi_tile, roi_input
+        if roi_native:
+            roi_tile = roi_input = roi_tile or imgsz
+        else:
+            roi_tile, roi_input = scale_matched_tile(frame_shape, imgsz, stride, roi_tile)
+        return MotionProposer(roi_tile, roi_overlap)
+
+    if motion_roi:
+        frame_shape = (int(dataset.cap.get(4)), int(dataset.cap.get(3)))  # CAP_PROP_FRAME_HEIGHT / WIDTH
+        if all(frame_shape):
+            proposer = start_motion_roi(frame_shape)
+        # 容器未报告帧尺寸时在首帧解码后再创建
+    tile_windows: Optional[np.ndarray] = None  # tiled 模式的窗口 (x1, y1, x2, y2)，按首帧尺寸生成
+    tracks = TrackTable(record_segments=emit_segments)
+    archive = TrackArchive(spill_after=spill_after, spill_dir=spill_dir)
 
     preview_written = False
+    monitor = ConvergenceMonitor(early_stop) if early_stop is not None else None
+    stop_reason: Optional[str] = None
+    frames_used = 0
+    frames_analyzed = 0
+    if progress is not None:
+        progress(0, dataset.frames)  # 视频已打开，开始处理
 
     # OpenCV expects BGR color tuples.
     class_colors = {
@@ -188,35 +489,27 @@ def detect_and_track(
         "pinhead": (255, 0, 0),
     }
     fallback_color = (68, 87, 255)  # default to a red-ish tone (BGR)
-    for frame_idx, (_, im, im0, _, _) in enumerate(tqdm(dataset, desc="Detecting"), start=0):
-        if dataset.mode != "video":
-            continue
-
-        im_tensor = torch.from_numpy(im).to(device)
-        im_tensor = im_tensor.float()
-        im_tensor /= 255.0
-        if im_tensor.ndim == 3:
-            im_tensor = im_tensor.unsqueeze(0)
-
-        pred = model(im_tensor, augment=False, visualize=False)
-        pred = non_max_suppression(pred, conf_thres, iou_thres, classes=class_filter)
 
-        detections: List[Tuple[np.ndarray, int]] = []
-        det = pred[0]
-        if len(det):
-            det[:, :4] = scale_coords(im_tensor.shape[2:], det[:, :4], im0.shape).round()
-            for *xyxy, conf, cls in det:
-                cls_id = int(cls.item())
-                detections.append((torch.tensor(xyxy).cpu().numpy(), cls_id))
+    def detected_points(input_shape: torch.Size, im0: np.ndarray, det: torch.Tensor) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        把一帧 NMS 后的检测框映射回原图坐标 (input_shape 为 None 表示已是原图坐标)，
+        返回检测中心与类别；首个有检测的帧写预览图。
+        """
+        nonlocal preview_written
+        if len(det) and input_shape is not None:
+            det[:, :4] = scale_coords(input_shape, det[:, :4], im0.shape).round()
+        det_np = det.cpu().numpy()
+        boxes = det_np[:, :4]
+        det_classes = det_np[:, 5].astype(np.int64)
 
-        if preview_path and not preview_written and len(detections):
+        if preview_path and not preview_written and len(boxes):
             annotated = im0.copy()
             # 调试：预览图生成时的类别和颜色信息
             print("\n" + "="*60)
             print("=== DEBUG: 预览图生成 ===")
-            print(f"第一帧检测到的框数量: {len(detections)}")
+            print(f"第一帧检测到的框数量: {len(boxes)}")
             color_count = {"red": 0, "green": 0, "blue": 0, "other": 0}
-            for bbox, cls_id in detections:
+            for bbox, cls_id in zip(boxes, det_classes.tolist()):
                 x1, y1, x2, y2 = bbox.astype(int)
                 name = names[cls_id] if cls_id < len(names) else str(cls_id)
                 color = class_colors.get(name.lower(), fallback_color)
@@ -236,72 +529,323 @@ def detect_and_track(
             preview_path.parent.mkdir(parents=True, exist_ok=True)
             cv2.imwrite(str(preview_path), annotated)
             preview_written = True
+        return detection_centers(boxes), det_classes
 
+    def track(frame_idx: int, det_xy: np.ndarray, det_classes: np.ndarray) -> None:
+        """用一帧的检测中心推进跟踪。"""
         # 匹配
         matched, unmatched_tracks, unmatched_dets = associate_detections_to_tracks(
-            tracks, detections, max_distance=max_distance
+            tracks.centers, det_xy, max_distance=track_max_distance
         )
 
         # 更新已匹配轨迹
-        for t_idx, d_idx in matched:
-            bbox, cls_id = detections[d_idx]
-            cx = float((bbox[0] + bbox[2]) / 2.0)
-            cy = float((bbox[1] + bbox[3]) / 2.0)
-            tracks[t_idx].update(frame_idx, (cx, cy), fps=fps, pixel_size=pixel_size)
+        if matched:
+            t_rows, d_rows = np.asarray(matched, dtype=np.int64).T
+            speed_px = tracks.update(t_rows, det_xy[d_rows], frame_idx, fps=fps)
+            if monitor is not None:
+                monitor.add_speeds(speed_px)
 
         # 未匹配轨迹更新时间
-        for t_idx in unmatched_tracks:
-            tracks[t_idx].time_since_update += 1
+        tracks.age(np.asarray(unmatched_tracks, dtype=np.int64))
 
         # 新建轨迹
-        for d_idx in unmatched_dets:
-            bbox, cls_id = detections[d_idx]
-            cx = float((bbox[0] + bbox[2]) / 2.0)
-            cy = float((bbox[1] + bbox[3]) / 2.0)
-            track = Track(
-                track_id=next_track_id,
-                class_id=cls_id,
-                class_name=names[cls_id],
-                last_frame=frame_idx,
-                last_center=(cx, cy),
-                emit_segments=emit_segments,
-            )
-            tracks.append(track)
-            next_track_id += 1
-
-        # 移除长时间未更新的轨迹
-        tracks = [t for t in tracks if t.time_since_update <= max_age]
+        new_dets = np.asarray(unmatched_dets, dtype=np.int64)
+        tracks.add(det_classes[new_dets], det_xy[new_dets], frame_idx)
+        if monitor is not None:
+            monitor.add_tracks(det_classes[new_dets])
+
+        # 长时间未更新的轨迹移入归档
+        tracks.prune(track_max_age, archive)
+
+    def consume(
+        frame_idx: int,
+        input_shape: Optional[torch.Size],
+        im0: np.ndarray,
+        det: Optional[torch.Tensor],
+        propagate: bool = False,
+    ) -> None:
+        """
+        处理一帧的检测结果；det 为 None 表示未推理：propagate 为 True 时由光流传播上一帧的
+        检测中心，否则为静止帧，轨迹保持不变。已决定停止时忽略后续帧。
+        """
+        nonlocal stop_reason, frames_used, frames_analyzed
+        if stop_reason is not None:
+            return
+        if det is not None:
+            det_xy, det_classes = detected_points(input_shape, im0, det)
+            if propagator is not None:
+                propagator.keyframe(im0, det_xy, det_classes)
+            track(frame_idx, det_xy, det_classes)
+        elif propagate:
+            track(frame_idx, *propagator.propagate(im0))
+
+        frames_used = frame_idx + 1
+        frames_analyzed += 1
+        if monitor is not None:
+            stop_reason = monitor.step()
+
+        if progress is not None:
+            progress(frame_idx + 1, dataset.frames)
+
+    def prepare(images: torch.Tensor) -> torch.Tensor:
+        """uint8 CHW 图像移到推理设备；模型未折叠输入归一化时转 float 并除以 255。"""
+        images = images.to(device)
+        if input_format.normalized:
+            images = images.float()
+            images /= 255.0
+        return images
+
+    def infer_tiles(im0: np.ndarray, windows: np.ndarray) -> torch.Tensor:
+        """裁剪各窗口整批推理，返回原图坐标下跨窗口去重后的检测。"""
+        if not len(windows):
+            return torch.zeros((0, 6))
+        images = prepare(torch.from_numpy(crop_tiles(im0, windows, roi_tile, roi_input, input_format.channels)))
+        pred = model(images, augment=False, visualize=False)
+        dets = batched_non_max_suppression(pred, conf_thres, iou_thres, classes=class_filter)
+        return merge_tile_detections(dets, windows, roi_tile, roi_input, im0.shape)
+
+    def infer_grid(im0: np.ndarray) -> torch.Tensor:
+        """按原分辨率把整帧切成重叠窗口一次前向，返回原图坐标下合并去重后的检测。"""
+        nonlocal tile_windows
+        if tile_windows is None:
+            origins = grid_windows(im0.shape, imgsz, tile_overlap)
+            tile_windows = np.concatenate([origins, origins + imgsz], axis=1)
+            LOGGER.info(f"分块推理：{im0.shape[1]}x{im0.shape[0]} 切为 {len(origins)} 个 {imgsz}x{imgsz} 窗口")
+        images = prepare(torch.from_numpy(crop_tiles(im0, tile_windows[:, :2], imgsz, imgsz, input_format.channels)))
+        pred = model(images, augment=False, visualize=False)
+        det = non_max_suppression(
+            pred, conf_thres, iou_thres, classes=class_filter, max_det=300 * len(tile_windows), tiles=tile_windows
+        )[0]
+        clip_coords(det, im0.shape)
+        return det
+
+    # 待推理的帧缓冲：(frame_idx, 预处理后的 CHW uint8, 原图)
+    pending: List[Tuple[int, np.ndarray, np.ndarray]] = []
+
+    def flush() -> None:
+        """对缓冲中的帧做一次批量前向与 NMS，再按帧序交给跟踪。"""
+        if not pending:
+            return
+        im_tensor = prepare(torch.from_numpy(np.stack([im for _, im, _ in pending])))
+        pred = model(im_tensor, augment=False, visualize=False)
+        dets = batched_non_max_suppression(pred, conf_thres, iou_thres, classes=class_filter)
+        for (frame_idx, _, im0), det in zip(pending, dets):
+            consume(frame_idx, im_tensor.shape[2:], im0, det)
+        pending.clear()
+
+    pipeline_stats: Optional[Dict[str, Dict[str, float]]] = None
+    if pipeline:
+
+        @torch.inference_mode()  # 在流水线的推理线程中执行，推理模式按线程生效
+        def infer(images: torch.Tensor) -> List[torch.Tensor]:
+            images = prepare(images)
+            if batcher is not None:
+                return [batcher.infer(images[i : i + 1], class_filter) for i in range(images.shape[0])]
+            pred = model(images, augment=False, visualize=False)
+            return batched_non_max_suppression(pred, conf_thres, iou_thres, classes=class_filter)
+
+        frame_pipeline = FramePipeline(
+            dataset.cap,
+            infer,
+            imgsz=imgsz,
+            stride=stride,
+            auto=auto,
+            batch_size=batch_size,
+            preprocess_workers=preprocess_workers,
+            input_format=input_format,
+            frame_stride=frame_stride,
+            static_gate=static_gate,
+        )
+        results = iter(frame_pipeline)
+        try:
+            for frame_idx, input_shape, im0, det in tqdm(results, total=total_steps, desc="Detecting"):
+                consume(frame_idx, input_shape, im0, det)
+                if stop_reason is not None:
+                    break
+        finally:
+            results.close()  # 提前停止时结束解码与推理线程
+        pipeline_stats = frame_pipeline.report()
+        LOGGER.info(f"流水线各阶段吞吐: {pipeline_stats}")
+    elif preallocate:
+        cap = dataset.cap
+        ok, first = cap.read()
+        slots = batch_size if batcher is None else 1
+        preprocessor = (
+            VideoPreprocessor(first.shape[:2], imgsz, stride, auto, device, batch_size=slots, input_format=input_format)
+            if ok
+            else None
+        )
+        frame = None
+        if ok:
+            np.copyto(preprocessor.frames[0], first)
+            frame = preprocessor.frames[0]
+        step, filled = 0, 0  # step：已分析帧数，帧号 = step * frame_stride；filled：已 letterbox 的帧数
+
+        with tqdm(total=total_steps, desc="Detecting") as bar:
+
+            def infer_filled() -> None:
+                """对已填充的帧做一次前向与 NMS 并按帧序交给跟踪。"""
+                nonlocal step, filled
+                if not filled:
+                    return
+                images = preprocessor.tensor(filled)
+                if batcher is not None:
+                    dets = [batcher.infer(images, class_filter)]
+                else:
+                    pred = model(images, augment=False, visualize=False)
+                    dets = batched_non_max_suppression(pred, conf_thres, iou_thres, classes=class_filter)
+                for k, det in enumerate(dets):
+                    consume((step + k) * frame_stride, preprocessor.input_shape, preprocessor.frames[k], det)
+                step += filled
+                bar.update(filled)
+                filled = 0
+
+            # frame 位于第 filled 个帧缓冲
+            while frame is not None and stop_reason is None:
+                grab_frames(cap, frame_stride - 1)
+                if static_gate is not None and static_gate.is_static(frame):
+                    # 先交出之前的帧以保持帧序；静止帧所在缓冲在读下一帧前不会被覆盖
+                    infer_filled()
+                    consume(step * frame_stride, None, frame, None)
+                    step += 1
+                    bar.update(1)
+                else:
+                    preprocessor.load(filled)
+                    filled += 1
+                    if filled == slots:
+                        infer_filled()
+                if stop_reason is None:
+                    frame = preprocessor.read(cap, filled)
+            infer_filled()
+    else:
+        for step, (_, im, im0, _, _) in enumerate(tqdm(dataset, total=total_steps, desc="Detecting"), start=0):
+            if dataset.mode != "video":
+                continue
+            if stop_reason is not None:
+                break
+            frame_idx = step * frame_stride
+            grab_frames(dataset.cap, frame_stride - 1)
+
+            if static_gate is not None and static_gate.is_static(im0):
+                flush()
+                consume(frame_idx, None, im0, None)
+                if propagator is not None:
+                    propagator.skip()
+                continue
+            if propagator is not None and not propagator.due():
+                consume(frame_idx, None, im0, None, propagate=True)
+                continue
+            if motion_roi:
+                if proposer is None:
+                    proposer = start_motion_roi(im0.shape[:2])
+                windows = proposer.propose(im0, tracks.centers)
+                if windows is not None:
+                    consume(frame_idx, None, im0, infer_tiles(im0, windows))
+                    continue
+            if tiled:
+                consume(frame_idx, None, im0, infer_grid(im0))
+                continue
+
+            if batch_size > 1 and batcher is None:
+                # 同一视频各帧 letterbox 尺寸相同，可直接堆叠；尺寸意外变化时先清空缓冲
+                if pending and pending[0][1].shape != im.shape:
+                    flush()
+                pending.append((frame_idx, im, im0))
+                if len(pending) >= batch_size:
+                    flush()
+                continue
+
+            im_tensor = prepare(torch.from_numpy(im))
+            if im_tensor.ndim == 3:
+                im_tensor = im_tensor.unsqueeze(0)
+
+            if batcher is not None:
+                det = batcher.infer(im_tensor, class_filter)
+            else:
+                pred = model(im_tensor, augment=False, visualize=False)
+                det = non_max_suppression(pred, conf_thres, iou_thres, classes=class_filter)[0]
+
+            consume(frame_idx, im_tensor.shape[2:], im0, det)
+
+        flush()
 
     output.parent.mkdir(parents=True, exist_ok=True)
-    summary = summarize_tracks(tracks)
+    archive.finish(tracks)
+    summary = summarize_tracks(archive.totals.summaries(), 0, pixel_size)
     payload = {
         "video": str(source),
         "fps": fps,
         "pixel_size": pixel_size,
         "max_distance": max_distance,
         "max_age": max_age,
+        "frame_stride": frame_stride,
+        "analysis_fps": fps / frame_stride,
+        "total_frames": dataset.frames,
+        "frames_used": frames_used,
+        "frames_analyzed": frames_analyzed,
+        "stop_reason": stop_reason or END_OF_VIDEO,
+        "stopped_early": stop_reason is not None,
         "tracks": [],
         "summary": summary,
     }
     if preview_path and preview_written:
         payload["preview_image"] = str(preview_path)
-    for t in tracks:
-        stats = summarize_tracks([t])
+    if pipeline_stats is not None:
+        payload["pipeline_stats"] = pipeline_stats
+    if monitor is not None:
+        payload["early_stop"] = monitor.report()
+    if propagator is not None:
+        payload["keyframes"] = propagator.report()
+        LOGGER.info(f"关键帧比例: {payload['keyframes']['keyframe_ratio']}")
+    if proposer is not None:
+        payload["motion_roi"] = dict(proposer.report(), tile=roi_tile, tile_input=roi_input, native=roi_native)
+    if tile_windows is not None:
+        payload["tiles"] = {"tile": imgsz, "overlap": tile_overlap, "count": len(tile_windows)}
+    if static_gate is not None:
+        payload["static_skip"] = static_gate.report()
+        LOGGER.info(f"静止帧跳过推理 {static_gate.skipped}/{static_gate.checked} 帧")
+    track_summary = archive.track_summary()
+    inline_segments = emit_segments and segments_path is None
+    track_segments: Dict[int, List[dict]] = {}
+    if inline_segments:
+        # 逐块归约，临时文件中的段不会整体读入内存
+        for chunk in archive.iter_segments():
+            for track_id, index in group_segments(chunk["track_id"]):
+                track_segments.setdefault(track_id, []).extend(
+                    {
+                        "start_frame": start,
+                        "end_frame": end,
+                        "speed_px_per_s": speed,
+                        "speed_physical_per_s": speed * pixel_size,
+                    }
+                    for start, end, speed in zip(
+                        chunk["start_frame"][index].tolist(),
+                        chunk["end_frame"][index].tolist(),
+                        chunk["speed_px"][index].tolist(),
+                    )
+                )
+    elif emit_segments:
+        payload["segments_file"] = str(save_segments(segments_path, archive.iter_segments))
+    for i in np.argsort(archive.ids, kind="stable").tolist():
+        track_id, class_id = int(archive.ids[i]), int(archive.classes[i])
+        stats = summarize_tracks(track_summary, i, pixel_size)
         track_info = {
-            "id": t.track_id,
-            "class_id": t.class_id,
-            "class_name": t.class_name,
-            "sample_count": len(t.speed_px_history),
+            "id": track_id,
+            "class_id": class_id,
+            "class_name": names[class_id],
+            "sample_count": int(track_summary["count"][i]),
             "speed_px_stats": stats.get("pixel_speed_stats") if stats else None,
             "speed_physical_stats": stats.get("physical_speed_stats") if stats else None,
         }
-        if emit_segments:
-            track_info["segments"] = t.segments
+        if inline_segments:
+            track_info["segments"] = track_segments.get(track_id, [])
         payload["tracks"].append(track_info)
+    archive.close()
 
     with output.open("w", encoding="utf-8") as f:
         json.dump(payload, f, ensure_ascii=False, indent=2)
     print(f"速度统计已写入 {output}")
+    return payload
 
 
 def parse_args() -> argparse.Namespace:
@@ -343,6 +887,136 @@ def parse_args() -> argparse.Namespace:
         default=Path("runs/speed/speed_summary.json"),
         help="速度统计输出路径 (JSON)",
     )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1,
+        help="每次前向合并的帧数，>1 时在 CPU 上通常更快，结果与逐帧一致",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="解码 / 预处理 / 推理 / 跟踪分线程流水执行，并输出各阶段吞吐",
+    )
+    parser.add_argument(
+        "--frame-stride",
+        type=int,
+        default=1,
+        help="每 N 帧分析一帧，其余帧跳过不解码；速度仍按真实时间计算",
+    )
+    parser.add_argument(
+        "--target-fps",
+        type=float,
+        default=None,
+        help="目标分析帧率，按视频帧率换算为 --frame-stride (优先于 --frame-stride)",
+    )
+    parser.add_argument(
+        "--early-stop",
+        action="store_true",
+        help="平均速度与类别比例的置信区间收敛后提前停止",
+    )
+    parser.add_argument(
+        "--speed-rtol",
+        type=float,
+        default=0.05,
+        help="提前停止：平均速度置信区间半宽相对均值的容差",
+    )
+    parser.add_argument(
+        "--class-atol",
+        type=float,
+        default=0.05,
+        help="提前停止：各类别比例置信区间半宽的容差",
+    )
+    parser.add_argument(
+        "--max-frames",
+        type=int,
+        default=None,
+        help="最多分析的帧数 (预算用尽即停止)",
+    )
+    parser.add_argument(
+        "--max-seconds",
+        type=float,
+        default=None,
+        help="分析的墙钟时间预算 (秒)",
+    )
+    parser.add_argument(
+        "--static-threshold",
+        type=float,
+        default=None,
+        help="与上次推理帧的平均灰度差 (0-255) 低于该值时视为静止帧并跳过推理，如 1.5",
+    )
+    parser.add_argument(
+        "--keyframe-interval",
+        type=int,
+        default=None,
+        help="最多每 N 帧检测一次，其间用光流传播检测中心；间隔随光流误差自适应",
+    )
+    parser.add_argument(
+        "--motion-roi",
+        action="store_true",
+        help="只对运动区域与现存轨迹附近的窗口推理，运动面积过大时回退整帧推理",
+    )
+    parser.add_argument(
+        "--roi-tile",
+        type=int,
+        default=None,
+        help="--motion-roi 的窗口边长 (原图像素)，默认与整帧推理同比例、网络输入为 --imgsz 的一半",
+    )
+    parser.add_argument(
+        "--roi-native",
+        action="store_true",
+        help="--motion-roi 窗口按原分辨率推理 (与整帧推理的目标尺寸不同)",
+    )
+    parser.add_argument(
+        "--tiled",
+        action="store_true",
+        help="按原分辨率切成重叠的 --imgsz 窗口整批推理，适合 4K 视频中的小目标",
+    )
+    parser.add_argument(
+        "--tile-overlap",
+        type=int,
+        default=128,
+        help="--tiled 相邻窗口的重叠像素，应大于最大目标尺寸",
+    )
+    parser.add_argument(
+        "--early-filter",
+        action="store_true",
+        help="检测头先按置信度阈值过滤锚框再解码，减少后处理开销 (仅 PyTorch 权重，结果不变)",
+    )
+    parser.add_argument(
+        "--fold-input",
+        action="store_true",
+        help="把 1/255 归一化与 BGR->RGB 折叠进首层卷积，预处理只剩布局变换 (仅 PyTorch 权重)",
+    )
+    parser.add_argument(
+        "--preallocate",
+        action="store_true",
+        help="预分配预处理缓冲区与输入张量，预热后逐帧推理不再分配内存 (非流水线模式)",
+    )
+    parser.add_argument(
+        "--preprocess-workers",
+        type=int,
+        default=2,
+        help="流水线模式下 letterbox 预处理线程数",
+    )
+    parser.add_argument(
+        "--segments-npz",
+        type=Path,
+        default=None,
+        help="配合 --emit-segments，逐段速度写入该列式 .npz 文件而不是内嵌在 JSON 中",
+    )
+    parser.add_argument(
+        "--spill-after",
+        type=int,
+        default=None,
+        help="已结束轨迹的速度段累计达到该数量后写入临时文件，长视频可限制内存占用",
+    )
+    parser.add_argument(
+        "--spill-dir",
+        type=Path,
+        default=None,
+        help="归档临时文件目录，默认系统临时目录",
+    )
     parser.add_argument(
         "--emit-segments",
         action="store_true",
@@ -353,6 +1027,15 @@ def parse_args() -> argparse.Namespace:
 
 def main() -> None:
     args = parse_args()
+    early_stop = None
+    if args.early_stop or args.max_frames is not None or args.max_seconds is not None:
+        early_stop = EarlyStop(
+            converge=args.early_stop,
+            speed_rtol=args.speed_rtol,
+            class_atol=args.class_atol,
+            max_frames=args.max_frames,
+            max_seconds=args.max_seconds,
+        )
     detect_and_track(
         weights=args.weights,
         source=args.source,
@@ -366,6 +1049,25 @@ def main() -> None:
         class_filter=args.classes,
         output=args.output,
         emit_segments=args.emit_segments,
+        batch_size=args.batch_size,
+        pipeline=args.pipeline,
+        preprocess_workers=args.preprocess_workers,
+        preallocate=args.preallocate,
+        fold_input=args.fold_input,
+        frame_stride=args.frame_stride,
+        target_fps=args.target_fps,
+        early_stop=early_stop,
+        static_threshold=args.static_threshold,
+        keyframe_interval=args.keyframe_interval,
+        motion_roi=args.motion_roi,
+        roi_tile=args.roi_tile,
+        roi_native=args.roi_native,
+        tiled=args.tiled,
+        tile_overlap=args.tile_overlap,
+        early_filter=args.early_filter,
+        spill_after=args.spill_after,
+        spill_dir=args.spill_dir,
+        segments_path=args.segments_npz,
     )
 
 